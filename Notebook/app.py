@@ -1,7 +1,13 @@
+import os
 import pickle
+import sys
 import numpy as np
 import streamlit as st
 
+# The shared modules live in the repository root, one level up.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from conditional_medians import get_conditional_medians
+
 # ============================== Page Config ==============================
 st.set_page_config(page_title="Diabetes Risk Predictor", layout="centered")
 
@@ -36,11 +42,18 @@ def t(eng, hin):
     return hin if language == "Hindi" else eng
 
 # ============================== Load Model and Scaler ==============================
-try:
+# st.cache_resource keeps one copy per server process, shared by all sessions,
+# instead of unpickling both files again on every widget interaction.
+@st.cache_resource
+def load_artifacts():
     with open('ModelForPrediction.pkl', 'rb') as model_file:
         model = pickle.load(model_file)
     with open('Standard_Scaler.pkl', 'rb') as scaler_file:
         scaler = pickle.load(scaler_file)
+    return model, scaler
+
+try:
+    model, scaler = load_artifacts()
     st.success("✅ Model and scaler loaded successfully!")
 except FileNotFoundError:
     model = None
@@ -91,6 +104,16 @@ def estimate_skin_thickness(bmi, age):
     estimated_skin = max(5, min(estimated_skin, 99))
     return round(estimated_skin, 2)
 
+# Medians of the measured values per age x BMI x pregnancies bin of the dataset,
+# from ../conditional_medians.py. Used for skin thickness and insulin, where
+# they are closer to the measurements than the formulas here.
+def median_estimate(name, age, bmi, pregnancies):
+    """The bin median for one user, or None if the table cannot be loaded or built."""
+    try:
+        return float(get_conditional_medians().estimate(name, age, bmi, pregnancies))
+    except (OSError, ValueError, KeyError):
+        return None
+
 def estimate_insulin(glucose, bmi, pregnancies):
     base = 50
     if glucose > 140:
@@ -138,12 +161,16 @@ know_insulin = st.radio("Do you know your Insulin level?", ["Yes", "No"])
 if know_skin == "Yes":
     SkinThickness = st.number_input("Skin Thickness (mm)", 0.0, 100.0, 20.0)
 else:
-    SkinThickness = estimate_skin_thickness(bmi_result, Age)
+    SkinThickness = median_estimate("SkinThickness", Age, bmi_result, Pregnancies)
+    if SkinThickness is None:
+        SkinThickness = estimate_skin_thickness(bmi_result, Age)
     st.success(f"Estimated Skin Thickness: {SkinThickness} mm")
 if know_insulin == "Yes":
     Insulin = st.number_input("Insulin (mu U/ml)", 0.0, 1000.0, 80.0)
 else:
-    Insulin = estimate_insulin(100, bmi_result, Pregnancies)
+    Insulin = median_estimate("Insulin", Age, bmi_result, Pregnancies)
+    if Insulin is None:
+        Insulin = estimate_insulin(100, bmi_result, Pregnancies)
     st.success(f"Estimated Insulin: {Insulin} mu U/ml")
 
 st.markdown("<h4>🩸 Glucose Level</h4>", unsafe_allow_html=True)
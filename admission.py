@@ -0,0 +1,143 @@
+# admission.py
+"""Admission control for the prediction path.
+
+At most `max_concurrency` requests score at once; the rest wait in a FIFO
+queue of at most `max_queue`. A request is turned away instead of queued
+when
+
+    * the queue is full,
+    * the expected wait (queue position x mean service time / concurrency)
+      already exceeds the latency target, or
+    * it has waited for the whole latency target without getting a slot.
+
+so an overloaded process answers quickly with "busy" (or a cached result)
+rather than letting every request slow down together. Runs on the asyncio
+event loop; not thread-safe.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+DEFAULT_MAX_CONCURRENCY = 256
+DEFAULT_MAX_QUEUE = 1024
+DEFAULT_LATENCY_TARGET_SECONDS = 0.25
+
+# Recent end-to-end latencies kept for the p99 estimate.
+LATENCY_WINDOW = 2048
+# Weight of the newest sample in the mean service time.
+SERVICE_TIME_ALPHA = 0.05
+
+
+class Overloaded(Exception):
+    def __init__(self, reason):
+        super().__init__(f"server busy ({reason})")
+        self.reason = reason
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, max_queue=DEFAULT_MAX_QUEUE,
+                 latency_target=DEFAULT_LATENCY_TARGET_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.latency_target = latency_target
+        self.inflight = 0
+        self._waiters = deque()
+        self._service_time = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0,
+                       "rejected_latency": 0, "rejected_timeout": 0,
+                       "queue_wait_seconds_total": 0.0, "queue_wait_seconds_max": 0.0}
+
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+
+    def expected_wait(self, position):
+        return position * self._service_time / self.max_concurrency
+
+    async def acquire(self):
+        """Wait for a slot; raises Overloaded instead of waiting too long."""
+        if self.inflight < self.max_concurrency and not self._waiters:
+            self.inflight += 1
+            self._stats["admitted"] += 1
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue:
+            self._stats["rejected_queue_full"] += 1
+            raise Overloaded("queue full")
+        if self.expected_wait(len(self._waiters) + 1) > self.latency_target:
+            self._stats["rejected_latency"] += 1
+            raise Overloaded("latency target")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._stats["queued"] += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.latency_target)
+        except asyncio.TimeoutError:
+            self._discard(future)
+            self._stats["rejected_timeout"] += 1
+            raise Overloaded("queue timeout")
+        except BaseException:
+            # Cancelled (client went away). If release() already handed us the
+            # slot, pass it on; otherwise just leave the queue.
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._discard(future)
+            raise
+        waited = time.perf_counter() - start
+        self._stats["admitted"] += 1
+        self._stats["queue_wait_seconds_total"] += waited
+        if waited > self._stats["queue_wait_seconds_max"]:
+            self._stats["queue_wait_seconds_max"] = waited
+        return waited
+
+    def _discard(self, future):
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    def release(self):
+        # Hand the slot straight to the oldest live waiter; inflight stays the same.
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.inflight -= 1
+
+    @asynccontextmanager
+    async def admit(self):
+        start = time.perf_counter()
+        waited = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+            latency = time.perf_counter() - start
+            self._latencies.append(latency)
+            self._service_time += SERVICE_TIME_ALPHA * (latency - waited - self._service_time)
+
+    def latency_quantile(self, q):
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self):
+        stats = dict(self._stats, inflight=self.inflight, queue_depth=len(self._waiters),
+                     max_concurrency=self.max_concurrency, max_queue=self.max_queue,
+                     latency_target_seconds=self.latency_target,
+                     service_seconds_mean=self._service_time,
+                     latency_seconds_p50=self.latency_quantile(0.50),
+                     latency_seconds_p99=self.latency_quantile(0.99))
+        stats["rejected"] = (stats["rejected_queue_full"] + stats["rejected_latency"]
+                             + stats["rejected_timeout"])
+        queued = self._stats["queued"] - self._stats["rejected_timeout"] - len(self._waiters)
+        stats["queue_wait_seconds_mean"] = (self._stats["queue_wait_seconds_total"] / queued
+                                            if queued > 0 else 0.0)
+        return stats
@@ -1,7 +1,18 @@
-import pickle
-import numpy as np
+import os
+import time
+
 import streamlit as st
 
+import metrics
+import warmup
+from derived_inputs import build_input_graph
+from estimators import diabetes_pedigree_function, interpret_bp
+
+rerun_start = time.perf_counter()
+
+# Load numpy and the model on a background thread while the page renders.
+warmup.start()
+
 st.set_page_config(page_title="Diabetes Risk Predictor", layout="centered")
 st.title("🩺 Diabetes Risk Prediction App")
 st.image("Image.jpeg")
@@ -13,79 +24,25 @@ def t(eng,hin):
   return hin if language=="Hindi" else eng
 
 # ============================== Load Model and Scaler ==============================
-try:
-    with open('Model/ModelForPrediction.pkl', 'rb') as model_file:
-        model = pickle.load(model_file)
-    with open('Model/Standard_Scaler.pkl', 'rb') as scaler_file:
-        scaler = pickle.load(scaler_file)
+# Loaded once per server process and shared by every session; reruns hit the cache.
+# Uses Model/diabetes_model.{npy,json} when present, so sklearn is not needed to serve.
+# The registry watches Model/ and swaps in retrained artifacts without a restart.
+if warmup.is_ready():
     st.success("✅ Model and scaler loaded successfully!")
-except FileNotFoundError:
-    model = None
-    scaler = None
+    st.caption(f"Model version: {warmup.wait().active_version}")
+elif isinstance(warmup.failed(), FileNotFoundError):
     st.error("❌ Model or scaler file not found. Please check the files.")
-
-# ============================== Helper Functions ==============================
-def calculate_bmi(weight_kg, height_cm):
-    height_m = height_cm / 100
-    return round(weight_kg / (height_m ** 2), 2) if height_m > 0 else 0
-
-def diabetes_pedigree_function(num_relatives, weights):
-    return round(sum(weights), 2) if num_relatives else 0.0
-
-def interpret_bp(systolic, diastolic):
-    if systolic < 90 or diastolic < 60:
-        return "Low (Hypotension)"
-    elif 90 <= systolic < 120 and 60 <= diastolic < 80:
-        return "Normal"
-    elif 120 <= systolic < 130 and diastolic < 80:
-        return "Elevated"
-    elif 130 <= systolic < 140 or 80 <= diastolic < 90:
-        return "High (Stage 1)"
-    elif 140 <= systolic < 180 or 90 <= diastolic < 120:
-        return "High (Stage 2)"
-    elif systolic >= 180 or diastolic >= 120:
-        return "Hypertensive Crisis"
-    else:
-        return "Unknown"
-
-def estimate_bp(age, bmi, smoker=False, active=True, stress=False):
-    systolic = 100 + (0.5 * age) + (0.3 * bmi)
-    diastolic = 60 + (0.2 * age) + (0.2 * bmi)
-    if smoker: systolic += 5; diastolic += 3
-    if not active: systolic += 5; diastolic += 2
-    if stress: systolic += 4; diastolic += 3
-    return round(systolic, 1), round(diastolic, 1)
-
-def estimate_skin_thickness(bmi, age):
-    if bmi < 18.5:
-        return 10
-    elif 18.5 <= bmi < 25:
-        return 20
-    elif 25 <= bmi < 30:
-        return 25
-    else:
-        return 35
-
-def estimate_insulin(glucose, bmi, pregnancies):
-    base = 50
-    if glucose > 140:
-        base += 40
-    elif glucose > 100:
-        base += 20
-    if bmi > 30:
-        base += 30
-    base += pregnancies * 2
-    return round(base, 1)
-
-def estimate_glucose(age, bmi, insulin, active=True):
-    glucose = 85 + (0.6 * age) + (0.4 * bmi)
-    if insulin > 150:
-        glucose += 20
-    if not active:
-        glucose += 15
-    return round(glucose, 1)
+elif warmup.failed() is not None:
+    st.error(f"❌ Could not load the model: {warmup.failed()}")
+else:
+    st.info("⏳ Loading model in the background...")
 
 # ============================== Input Section ==============================
+# Calculated and estimated values live in a per-session dependency graph
+# (derived_inputs.py): a rerun only recomputes what the changed widget feeds.
+if "derived_inputs" not in st.session_state:
+    st.session_state["derived_inputs"] = build_input_graph()
+derived = st.session_state["derived_inputs"]
 
 st.markdown("<h4>👤 Basic Details</h4>", unsafe_allow_html=True)
 col1, col2 = st.columns(2)
@@ -99,17 +56,21 @@ if gender == "Female":
 else:
     Pregnancies = 0
     st.info("Pregnancy count is automatically set to 0 for male.")
+derived.set("age", Age)
+derived.set("pregnancies", Pregnancies)
 
 # BMI
 st.markdown("<h4>⚖️ Body Mass Index (BMI)</h4>", unsafe_allow_html=True)
 know_bmi = st.radio("Do you know your BMI?", ["No, calculate it", "Yes, I know it"], index=0)
 
 if know_bmi == "Yes, I know it":
-    bmi_result = st.number_input("BMI (kg/m²)", 10.0, 60.0, 24.0)
+    derived.set("bmi_known", st.number_input("BMI (kg/m²)", 10.0, 60.0, 24.0))
+    bmi_result = derived.get("bmi")
 else:
-    weight = st.number_input("Weight (kg)", 10.0, 200.0, 70.0)
-    height = st.number_input("Height (cm)", 100.0, 250.0, 170.0)
-    bmi_result = calculate_bmi(weight, height)
+    derived.set("bmi_known", None)
+    derived.set("weight", st.number_input("Weight (kg)", 10.0, 200.0, 70.0))
+    derived.set("height", st.number_input("Height (cm)", 100.0, 250.0, 170.0))
+    bmi_result = derived.get("bmi")
     st.success(f"Calculated BMI: {bmi_result}")
 
 # Skin Thickness and Insulin
@@ -117,17 +78,18 @@ st.markdown("<h4>🧪 Skin Thickness and Insulin</h4>", unsafe_allow_html=True)
 know_skin = st.radio("Do you know your Skin Thickness?", ["Yes", "No"])
 know_insulin = st.radio("Do you know your Insulin level?", ["Yes", "No"])
 
+# The estimates use the glucose reading when there is one, so they are
+# filled in below, once the glucose section has run.
 if know_skin == "Yes":
     SkinThickness = st.number_input("Skin Thickness (mm)", 0.0, 100.0, 20.0)
 else:
-    SkinThickness = estimate_skin_thickness(bmi_result, Age)
-    st.success(f"Estimated Skin Thickness: {SkinThickness} mm")
+    skin_estimate = st.empty()
 
 if know_insulin == "Yes":
-    Insulin = st.number_input("Insulin (mu U/ml)", 0.0, 1000.0, 80.0)
+    derived.set("insulin_known", st.number_input("Insulin (mu U/ml)", 0.0, 1000.0, 80.0))
 else:
-    Insulin = estimate_insulin(100, bmi_result, Pregnancies)
-    st.success(f"Estimated Insulin: {Insulin} mu U/ml")
+    derived.set("insulin_known", None)
+    insulin_estimate = st.empty()
 
 # Glucose
 st.markdown("<h4>🩸 Glucose Level</h4>", unsafe_allow_html=True)
@@ -135,11 +97,22 @@ know_glucose = st.radio("Do you know your Glucose level?", ["Yes", "No"], index=
 
 if know_glucose == "Yes":
     Glucose = st.number_input("Fasting Glucose (mg/dL)", 0.0, 300.0, 100.0)
+    derived.set("glucose_known", Glucose)
 else:
-    active_glucose = st.checkbox("Are you physically active?", value=True)
-    Glucose = estimate_glucose(Age, bmi_result, Insulin, active_glucose)
+    derived.set("glucose_known", None)
+    active_glucose = st.checkbox("Are you physically active?", value=True, key="glucose_active")
+    derived.set("active_glucose", active_glucose)
+    Glucose = derived.get("glucose_estimate")
     st.success(f"Estimated Glucose Level: {Glucose} mg/dL")
 
+# Entered glucose: nearest-neighbour estimates; otherwise the dataset's bin medians.
+if know_skin == "No":
+    SkinThickness = derived.get("skin_thickness")
+    skin_estimate.success(f"Estimated Skin Thickness: {SkinThickness} mm")
+Insulin = derived.get("insulin")
+if know_insulin == "No":
+    insulin_estimate.success(f"Estimated Insulin: {Insulin} mu U/ml")
+
 # Blood Pressure
 st.markdown("<h4>🩺 Blood Pressure (BP)</h4>", unsafe_allow_html=True)
 know_bp = st.radio("Do you know your BP?", ["No, calculate it", "Yes, I know it"], index=0)
@@ -157,9 +130,12 @@ if know_bp == "Yes, I know it":
 else:
     st.write("Let's estimate your BP.")
     smoker = st.checkbox("Do you smoke?", value=False)
-    active = st.checkbox("Are you physically active?", value=True)
+    active = st.checkbox("Are you physically active?", value=True, key="bp_active")
     stress = st.checkbox("Do you feel high stress?", value=False)
-    systolic, diastolic = estimate_bp(Age, bmi_result, smoker, active, stress)
+    derived.set("smoker", smoker)
+    derived.set("active", active)
+    derived.set("stress", stress)
+    systolic, diastolic = derived.get("bp_estimate")
     BloodPressure = (systolic + diastolic) / 2
     st.success(f"Estimated Systolic: {systolic} mmHg")
     st.success(f"Estimated Diastolic: {diastolic} mmHg")
@@ -205,35 +181,104 @@ if st.button("🧮 Calculate Inputs"):
     st.success("✅ You can now proceed to prediction if you're ready.")
 
 # ============================== Prediction ==============================
-if model and scaler:
+if warmup.failed() is None:
     if st.button("🔍 Predict Diabetes Risk"):
-        input_data = [[Pregnancies, Glucose, BloodPressure, SkinThickness, Insulin,
-                       bmi_result, DiabetesPedigreeFunction, Age]]
-        scaled_input = scaler.transform(input_data)
-        prediction = model.predict(scaled_input)[0]
-        probability = model.predict_proba(scaled_input)[0][1]
-
-        st.markdown("<h4>📊 Prediction Result</h4>", unsafe_allow_html=True)
-        st.success(f"Risk Score: {round(probability * 100, 2)}%")
-        st.progress(min(int(probability * 100), 100))
-
-        if prediction == 1:
-            st.error("🚨 Prediction: Person is Diabetic.")
-            st.warning("Please consult a healthcare provider.")
-        else:
-            st.success("✅ Prediction: Person is Non-Diabetic.")
-            st.info("No immediate risk detected.")
-
-        st.markdown("""
-        ### 📝 Next Steps:
-        - Maintain a balanced diet and healthy weight  
-        - Exercise regularly  
-        - Schedule regular health checkups  
-        - Monitor blood sugar if at risk
-        """)
+        with st.spinner("Loading model..."):
+            registry = warmup.wait()
+        start_time = time.perf_counter()
+        import numpy as np
+        from audit_log import get_audit_log, make_entry
+        from conditional_medians import get_conditional_medians
+        from imputation import impute_with_estimators
+        from inference import FEATURES
+        from knn_imputer import knn_imputer_if_available
+        from prediction_cache import get_prediction_cache
+
+        # Everything the user did not type in directly.
+        estimated = [name for name, was_estimated in [
+            ("BMI", know_bmi == "No, calculate it"),
+            ("SkinThickness", know_skin == "No"),
+            ("Insulin", know_insulin == "No"),
+            ("Glucose", know_glucose == "No"),
+            ("BloodPressure", know_bp == "No, calculate it"),
+            ("DiabetesPedigreeFunction", know_dpf == "No, calculate it"),
+        ] if was_estimated]
+        # Vitals left to estimation go through the shared imputation stage (as
+        # batch_score.py --impute estimators, but with skin thickness and
+        # insulin from the nearest neighbours when glucose was entered, else
+        # the dataset medians); it reproduces the estimates shown above
+        # exactly. Only those cells are filled: an entered 0 is the user's
+        # value here, not "not measured" as in the dataset.
+        entered = dict(zip(FEATURES, [Pregnancies, Glucose, BloodPressure, SkinThickness, Insulin,
+                                      bmi_result, DiabetesPedigreeFunction, Age]))
+        row = np.array([[np.nan if name in estimated and name not in ("BMI", "DiabetesPedigreeFunction")
+                         else float(entered[name]) for name in FEATURES]])
+        flags = {}
+        if know_glucose == "No":
+            flags["active_glucose"] = active_glucose
+        if know_bp == "No, calculate it":
+            flags.update(smoker=smoker, active=active, stress=stress)
+        with metrics.timed("estimate"):
+            impute_with_estimators(row, mask=np.isnan(row), table=get_conditional_medians(),
+                                   knn=knn_imputer_if_available(), **flags)
+        input_data = row.tolist()
+        # The row is built already, so it is scored exactly even when every
+        # vital was estimated; risk_table.py approximates this path for
+        # callers that do not build rows.
+        with registry.acquire() as predictor:
+            # Identical inputs (defaults, estimated values) are scored once per model version.
+            prediction, probability = get_prediction_cache().predict(predictor, input_data[0])
+            version = predictor.version
+
+        # The app has no login (Notebook/auth.py is not wired in), so its
+        # predictions are logged anonymously and are not in the user index.
+        get_audit_log().record(make_entry(input_data[0], probability, prediction, version,
+                                          time.perf_counter() - start_time, estimated,
+                                          "", "streamlit"))
+
+        with metrics.timed("render"):
+            st.markdown("<h4>📊 Prediction Result</h4>", unsafe_allow_html=True)
+            st.success(f"Risk Score: {round(probability * 100, 2)}%")
+            st.progress(min(int(probability * 100), 100))
+
+            if prediction == 1:
+                st.error("🚨 Prediction: Person is Diabetic.")
+                st.warning("Please consult a healthcare provider.")
+            else:
+                st.success("✅ Prediction: Person is Non-Diabetic.")
+                st.info("No immediate risk detected.")
+
+            st.markdown("""
+            ### 📝 Next Steps:
+            - Maintain a balanced diet and healthy weight  
+            - Exercise regularly  
+            - Schedule regular health checkups  
+            - Monitor blood sugar if at risk
+            """)
 else:
     st.warning("⚠️ Prediction disabled: Model or scaler not loaded.")
 
+# ============================== Admin: Stage Timings ==============================
+# Open the app with ?admin=1 (or set DIABETES_ADMIN=1) to see where rerun time goes.
+# Figures cover every session served by this process, up to the previous rerun.
+if st.query_params.get("admin") == "1" or os.environ.get("DIABETES_ADMIN") == "1":
+    with st.sidebar.expander("⏱️ Stage timings", expanded=True):
+        summary = metrics.stage_summary()
+        if summary:
+            st.dataframe([{key: round(value, 3) if isinstance(value, float) else value
+                           for key, value in row.items()} for row in summary],
+                         hide_index=True)
+        else:
+            st.caption("No stages recorded yet.")
+        if st.button("Reset timings"):
+            metrics.reset()
+    with st.sidebar.expander("🔗 Derived inputs"):
+        # This session's graph: what each estimate reads, and how often it was recomputed.
+        st.caption("Evaluation order: " + " → ".join(derived.order()))
+        st.dataframe(derived.describe(), hide_index=True)
+
+metrics.observe("rerun", time.perf_counter() - rerun_start)
+
 
 
 # import pickle
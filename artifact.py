@@ -0,0 +1,159 @@
+# artifact.py
+"""Compact, versioned model artifact: a float64 .npy blob plus a JSON manifest.
+
+The blob holds the scaler mean/scale and the logistic coefficients/intercept
+back to back; the manifest records the layout, feature order, checksum, the
+sklearn versions that wrote the pickles and the artifact, and training
+metrics. Loading needs only json and numpy.
+"""
+import json
+import os
+import pickletools
+from datetime import datetime, timezone
+
+import numpy as np
+
+from inference import FEATURES, FusedPredictor
+from model_loader import MODEL_DIR, MODEL_FILE, SCALER_FILE, files_digest
+
+FORMAT = "diabetes-linear"
+FORMAT_VERSION = 1
+ARTIFACT_NAME = "diabetes_model"
+MANIFEST_FILE = os.path.join(MODEL_DIR, ARTIFACT_NAME + ".json")
+
+
+def _layout(n):
+    return {"mean": [0, n], "scale": [n, 2 * n], "coef": [2 * n, 3 * n], "intercept": [3 * n, 3 * n + 1]}
+
+
+def export_artifact(model, scaler, out_dir=MODEL_DIR, name=ARTIFACT_NAME, metrics=None,
+                    source_sha256=None, source_sklearn_version=None):
+    """Write <name>.npy and <name>.json for a fitted StandardScaler + LogisticRegression.
+
+    source_sha256 is the files_digest() of the pickles the model and scaler
+    were loaded from; build_predictor() uses it to notice retrained pickles.
+    source_sklearn_version is the sklearn that pickled them (see
+    pickled_sklearn_version()), which need not be the one installed here.
+    Returns the manifest dict.
+    """
+    coef = np.asarray(model.coef_, dtype=np.float64)
+    if coef.shape != (1, len(FEATURES)):
+        raise ValueError(f"expected a binary model over {len(FEATURES)} features, got coef {coef.shape}")
+    n = len(FEATURES)
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    blob = np.concatenate([
+        np.zeros(n) if mean is None else np.asarray(mean, dtype=np.float64),
+        np.ones(n) if scale is None else np.asarray(scale, dtype=np.float64),
+        coef[0],
+        np.asarray(model.intercept_, dtype=np.float64)[:1],
+    ])
+
+    try:
+        import sklearn
+        export_sklearn_version = sklearn.__version__
+    except ImportError:
+        export_sklearn_version = None
+
+    os.makedirs(out_dir, exist_ok=True)
+    blob_path = os.path.join(out_dir, name + ".npy")
+    manifest_path = os.path.join(out_dir, name + ".json")
+    np.save(blob_path, blob, allow_pickle=False)
+
+    manifest = {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "features": FEATURES,
+        "blob": os.path.basename(blob_path),
+        "dtype": "float64",
+        "layout": _layout(n),
+        "sha256": files_digest(blob_path),
+        "model_class": type(model).__name__,
+        "scaler_class": type(scaler).__name__,
+        "source_sklearn_version": source_sklearn_version,
+        "export_sklearn_version": export_sklearn_version,
+        "source_sha256": source_sha256,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "metrics": metrics or {},
+    }
+    # Write the manifest last, via rename, so readers never see a manifest
+    # that points at a half-written blob.
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def read_manifest(manifest_path=MANIFEST_FILE):
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT or manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{manifest_path}: unsupported artifact format "
+                         f"{manifest.get('format')!r} v{manifest.get('format_version')}")
+    if manifest.get("features") != FEATURES:
+        raise ValueError(f"{manifest_path}: feature order {manifest.get('features')} does not match {FEATURES}")
+    return manifest
+
+
+def load_artifact(manifest_path=MANIFEST_FILE, verify=True):
+    """Memory-map the blob and return a FusedPredictor; no sklearn import needed."""
+    manifest = read_manifest(manifest_path)
+    blob_path = os.path.join(os.path.dirname(os.path.abspath(manifest_path)), manifest["blob"])
+    if verify and files_digest(blob_path) != manifest["sha256"]:
+        raise ValueError(f"{blob_path}: checksum does not match manifest")
+
+    blob = np.load(blob_path, mmap_mode="r", allow_pickle=False)
+    parts = {key: blob[start:stop] for key, (start, stop) in manifest["layout"].items()}
+    weights = parts["coef"] / parts["scale"]
+    bias = float(parts["intercept"][0]) - float(np.dot(parts["coef"], parts["mean"] / parts["scale"]))
+
+    predictor = FusedPredictor(weights, bias, means=np.array(parts["mean"]),
+                               version=manifest["sha256"][:12])
+    predictor.manifest = manifest
+    return predictor
+
+
+def artifact_available(manifest_path=MANIFEST_FILE):
+    return os.path.exists(manifest_path)
+
+
+def pickles_digest(model_path=MODEL_FILE, scaler_path=SCALER_FILE):
+    """files_digest() of the source pickles, or None if either is missing."""
+    try:
+        return files_digest(model_path, scaler_path)
+    except FileNotFoundError:
+        return None
+
+
+def pickled_sklearn_version(path=MODEL_FILE):
+    """The sklearn version recorded in a pickled estimator, or None.
+
+    Read from the pickle's opcodes: unpickling with a different sklearn
+    drops the recorded version after warning about it.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    previous = None
+    for _, arg, _ in pickletools.genops(data):
+        if isinstance(arg, str):
+            if previous == "_sklearn_version":
+                return arg
+            previous = arg
+    return None
+
+
+def artifact_matches_pickles(manifest_path=MANIFEST_FILE, model_path=MODEL_FILE, scaler_path=SCALER_FILE):
+    """False when the pickles next to the artifact are not the ones it was exported from.
+
+    That is the case after retrained .pkl files are dropped into Model/
+    without rerunning export_model.py. A manifest without a recorded source
+    digest only counts as current when there are no pickles to compare.
+    """
+    digest = pickles_digest(model_path, scaler_path)
+    if digest is None:
+        return True
+    return read_manifest(manifest_path).get("source_sha256") == digest
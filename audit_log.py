@@ -0,0 +1,250 @@
+# audit_log.py
+"""Buffered audit log of every prediction.
+
+record() appends the entry to an in-memory ring buffer and returns; it never
+touches the disk and only holds a lock for the append. A background thread
+drains the buffer every `flush_seconds` (sooner once it is half full),
+writes the entries as JSON lines and fsyncs once per drain (group commit).
+If the writer falls behind and the buffer fills, the oldest pending entries
+are dropped and counted rather than making requests wait.
+
+Segments live in logs/ (override with AUDIT_LOG_DIR). The segment being
+written is named predictions-<opened UTC>-<pid>.jsonl.active; it is renamed
+to .jsonl once it reaches `max_bytes` or `max_age_seconds`, or when the log is
+closed. Only finished .jsonl segments are read by compaction and indexing, and
+on_rotate callbacks are told about each one. An .active segment left behind by
+a process that died is finished by the next writer once it is older than
+`max_age_seconds`.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from inference import FEATURES
+from model_loader import BASE_DIR
+
+LOG_DIR = os.environ.get("AUDIT_LOG_DIR", os.path.join(BASE_DIR, "logs"))
+SEGMENT_PREFIX = "predictions-"
+ACTIVE_SUFFIX = ".jsonl.active"
+SEGMENT_SUFFIX = ".jsonl"
+
+DEFAULT_CAPACITY = 65_536
+DEFAULT_FLUSH_SECONDS = 0.05
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 3600
+
+
+def make_entry(features, probability, prediction, model_version, latency_seconds,
+               estimated=(), username="", source=""):
+    """One audit record. `features` is the model row in inference.FEATURES order."""
+    return {
+        "ts": time.time(),
+        "user": username or "",
+        "source": source,
+        "inputs": dict(zip(FEATURES, (float(x) for x in features))),
+        "estimated": sorted(estimated),
+        "model_version": model_version,
+        "prediction": int(prediction),
+        "probability": float(probability),
+        "latency_ms": round(latency_seconds * 1000, 3),
+    }
+
+
+def segment_files(directory=LOG_DIR):
+    """Finished segments, oldest first."""
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PREFIX + "*" + SEGMENT_SUFFIX)))
+
+
+class AuditLog:
+    def __init__(self, directory=LOG_DIR, capacity=DEFAULT_CAPACITY, flush_seconds=DEFAULT_FLUSH_SECONDS,
+                 max_bytes=DEFAULT_MAX_BYTES, max_age_seconds=DEFAULT_MAX_AGE_SECONDS, on_rotate=None):
+        self.directory = directory
+        self.capacity = capacity
+        self.flush_seconds = flush_seconds
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.on_rotate = list(on_rotate or [])
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._buffer = deque()
+        self._thread = None
+        self._pid = None
+        self._file = None
+        self._file_path = None
+        self._file_opened = 0.0
+        self._stats = {"recorded": 0, "written": 0, "dropped": 0, "fsyncs": 0, "rotations": 0,
+                       "write_errors": 0, "last_error": None, "last_fsync_seconds": None}
+
+    # ---------------- request side ----------------
+    def record(self, entry):
+        """Queue one entry for writing. Never blocks on I/O.
+
+        The entry is serialized later on the writer thread, so the caller must
+        not modify it afterwards.
+        """
+        if self._pid != os.getpid():
+            self._start()
+        with self._lock:
+            if len(self._buffer) >= self.capacity:
+                self._buffer.popleft()
+                self._stats["dropped"] += 1
+            self._buffer.append(entry)
+            self._stats["recorded"] += 1
+            pending = len(self._buffer)
+        if pending * 2 >= self.capacity:
+            self._wake.set()
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # First use, or first use in a forked child: the parent's thread and
+            # file handle did not come along, and its buffered entries are its own.
+            self._buffer.clear()
+            self._file = None
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+
+    # ---------------- writer thread ----------------
+    def _run(self):
+        self._finish_stale_segments()
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self._drain()
+        self._drain()
+        self._close_segment()
+
+    def _drain(self):
+        with self._lock:
+            if not self._buffer:
+                batch = None
+            else:
+                batch, self._buffer = self._buffer, deque()
+        if batch is None:
+            if self._file is not None and self._segment_expired():
+                self._close_segment()
+            return
+        try:
+            if self._file is None:
+                self._open_segment()
+            data = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in batch)
+            start = time.perf_counter()
+            self._file.write(data.encode("utf-8"))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._stats["last_fsync_seconds"] = time.perf_counter() - start
+            self._stats["fsyncs"] += 1
+            self._stats["written"] += len(batch)
+            if self._file.tell() >= self.max_bytes or self._segment_expired():
+                self._close_segment()
+        except (OSError, TypeError, ValueError) as exc:
+            self._stats["write_errors"] += 1
+            self._stats["dropped"] += len(batch)
+            self._stats["last_error"] = f"{type(exc).__name__}: {exc}"
+
+    def _finish_stale_segments(self):
+        cutoff = time.time() - self.max_age_seconds - 60
+        for path in glob.glob(os.path.join(self.directory, SEGMENT_PREFIX + "*" + ACTIVE_SUFFIX)):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    final_path = path[:-len(ACTIVE_SUFFIX)] + SEGMENT_SUFFIX
+                    os.replace(path, final_path)
+                    self._notify_rotate(final_path)
+            except OSError:
+                pass
+
+    def _notify_rotate(self, path):
+        for callback in self.on_rotate:
+            try:
+                callback(path)
+            except Exception as exc:
+                self._stats["last_error"] = f"on_rotate {type(exc).__name__}: {exc}"
+
+    def _segment_expired(self):
+        return time.time() - self._file_opened >= self.max_age_seconds
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._file_opened = time.time()
+        stamp = datetime.fromtimestamp(self._file_opened, timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        self._file_path = os.path.join(self.directory,
+                                       f"{SEGMENT_PREFIX}{stamp}-{os.getpid()}{ACTIVE_SUFFIX}")
+        self._file = open(self._file_path, "ab")
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        final_path = self._file_path[:-len(ACTIVE_SUFFIX)] + SEGMENT_SUFFIX
+        try:
+            self._file.close()
+            os.replace(self._file_path, final_path)
+        except OSError as exc:
+            self._stats["write_errors"] += 1
+            self._stats["last_error"] = f"{type(exc).__name__}: {exc}"
+            return
+        finally:
+            self._file = None
+        self._stats["rotations"] += 1
+        self._notify_rotate(final_path)
+
+    # ---------------- lifecycle ----------------
+    def flush(self, timeout=5.0):
+        """Wake the writer and wait (up to timeout) until what was queued is on disk."""
+        target = self._stats["recorded"]
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        while (self._stats["written"] + self._stats["dropped"] < target
+               and time.monotonic() < deadline and self._thread is not None and self._thread.is_alive()):
+            time.sleep(0.005)
+
+    def close(self, timeout=5.0):
+        """Write everything still buffered and finish the current segment."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._pid = None
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._buffer)
+        return dict(self._stats, pending=pending, capacity=self.capacity,
+                    segment=os.path.basename(self._file_path) if self._file is not None else None)
+
+
+# ============================== Process-wide log ==============================
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_audit_log():
+    """The process-wide log; finished segments go to the user index and the
+    current one is closed at interpreter exit."""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                from user_index import index_in_background
+                _log = AuditLog(on_rotate=[index_in_background])
+                atexit.register(_log.close)
+    return _log
+
+
+def close_audit_log():
+    """Flush and finish the process-wide log, if this process has one.
+
+    For processes that leave through os._exit() and skip atexit, such as
+    pre-forked workers.
+    """
+    if _log is not None:
+        _log.close()
@@ -0,0 +1,102 @@
+# batch_score.py
+"""Score CSV files shaped like Dataset/diabetes.csv in fixed-size chunks.
+
+    python batch_score.py input.csv output.csv --chunksize 100000 [--workers 4]
+                          [--impute estimators|medians|knn]
+
+Only one chunk is held in memory at a time, so memory use does not grow
+with the size of the input file.
+
+The output is the input with Imputed, Prediction and Probability appended.
+The feature columns are written as read; Imputed lists the features that
+were missing in that row and filled in before scoring (for example
+"SkinThickness;Insulin", or empty when every value was measured).
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from imputation import STRATEGIES, impute, missing_mask
+from inference import FEATURES, get_predictor
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def imputed_labels(mask):
+    """The Imputed column for an (N, 8) missing mask: "SkinThickness;Insulin", "" if none.
+
+    Each row's mask is packed into one integer code, and the label is built
+    once per distinct code rather than once per row.
+    """
+    codes = mask.astype(np.int64) @ (1 << np.arange(len(FEATURES), dtype=np.int64))
+    labels = np.empty(1 << len(FEATURES), dtype=object)
+    for code in np.flatnonzero(np.bincount(codes, minlength=1)).tolist():
+        labels[code] = ";".join(name for bit, name in enumerate(FEATURES) if code >> bit & 1)
+    return np.take(labels, codes)
+
+
+def score_chunk(chunk, predictor, imputation="means"):
+    """Impute and score one DataFrame chunk; returns it with result columns added.
+
+    The feature columns are left as they were; only the scored copy is imputed.
+    """
+    X = chunk[FEATURES].to_numpy(dtype=np.float64, copy=True)
+    mask = missing_mask(X)
+    impute(X, imputation, predictor.means)
+    labels, proba = predictor.predict(X)
+    chunk["Imputed"] = imputed_labels(mask)
+    chunk["Prediction"] = labels
+    chunk["Probability"] = proba
+    return chunk
+
+
+def score_csv(input_path, output_path, chunksize=DEFAULT_CHUNKSIZE, predictor=None, imputation="means"):
+    """Stream input_path through the model into output_path; returns rows scored."""
+    if predictor is None:
+        predictor = get_predictor()
+
+    dtypes = {name: np.float64 for name in FEATURES}
+    reader = pd.read_csv(input_path, chunksize=chunksize, dtype=dtypes)
+    rows = 0
+    with open(output_path, "w", newline="") as out:
+        for i, chunk in enumerate(reader):
+            missing = [name for name in FEATURES if name not in chunk.columns]
+            if missing:
+                raise ValueError(f"{input_path}: missing columns {', '.join(missing)}")
+            scored = score_chunk(chunk, predictor, imputation)
+            scored.to_csv(out, header=(i == 0), index=False)
+            rows += len(scored)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chunked diabetes risk scoring for large CSV files.")
+    parser.add_argument("input", help="CSV with the Dataset/diabetes.csv feature columns")
+    parser.add_argument("output", help="where to write the scored CSV")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"rows per chunk (default {DEFAULT_CHUNKSIZE})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="score chunks in this many processes (0 = one per CPU)")
+    parser.add_argument("--impute", choices=STRATEGIES, default="means",
+                        help="fill missing values with the training means (default), the "
+                             "app's estimators, the dataset's conditional medians, or those "
+                             "plus nearest-neighbour insulin and skin thickness")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.workers == 1:
+        rows = score_csv(args.input, args.output, args.chunksize, imputation=args.impute)
+    else:
+        from parallel_score import score_csv_parallel
+        rows = score_csv_parallel(args.input, args.output, args.workers or None, args.chunksize,
+                                  imputation=args.impute)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} rows in {elapsed:.2f}s -> {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+# columnar_log.py
+"""Columnar copies of the prediction audit log for fast aggregate queries.
+
+    python columnar_log.py compact                  # convert new finished segments
+    python columnar_log.py age-bands --days 7       # mean risk by age band, last week
+
+compact() turns each finished JSONL segment from audit_log.py into one
+compressed .npz "part" under logs/columnar/, with one array per column:
+
+    ts, probability, latency_ms     float64 / float32
+    prediction                      int8
+    <feature>                       float64, one per model feature
+    estimated                       uint8 bitmask over inference.FEATURES
+    user, source, model_version     int32 codes into <column>.dict string arrays
+
+Rows in a part are sorted by ts. index.json records each part's row count
+and time range, so a query opens only the parts that overlap its window,
+decompresses only the columns it names, and slices each one with a binary
+search on ts. The JSONL segments are left in place for audit.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from audit_log import LOG_DIR, SEGMENT_SUFFIX, segment_files
+from inference import FEATURES
+
+COLUMNAR_DIR = os.path.join(LOG_DIR, "columnar")
+INDEX_FILE = "index.json"
+CATEGORICAL = ("user", "source", "model_version")
+NUMERIC = {"ts": np.float64, "probability": np.float64, "latency_ms": np.float32,
+           "prediction": np.int8}
+COLUMNS = list(NUMERIC) + FEATURES + ["estimated"] + list(CATEGORICAL)
+
+DEFAULT_AGE_BANDS = (0, 30, 40, 50, 60, 70, 200)
+
+
+# ============================== Compaction ==============================
+
+def read_segment(path):
+    """Column lists from one JSONL segment; unreadable lines are skipped."""
+    columns = {name: [] for name in COLUMNS}
+    bits = {name: 1 << i for i, name in enumerate(FEATURES)}
+    skipped = 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                inputs = entry["inputs"]
+                row = [entry["ts"], entry["probability"], entry["latency_ms"], entry["prediction"]]
+                row += [inputs[name] for name in FEATURES]
+                row.append(sum(bits[name] for name in entry.get("estimated", ()) if name in bits))
+                row += [str(entry.get(name) or "") for name in CATEGORICAL]
+            except (ValueError, KeyError, TypeError):
+                skipped += 1    # e.g. a torn last line from a crash
+                continue
+            for name, value in zip(COLUMNS, row):
+                columns[name].append(value)
+    return columns, skipped
+
+
+def encode_part(columns):
+    """Arrays for one part, sorted by ts, categoricals dictionary-encoded."""
+    order = np.argsort(np.asarray(columns["ts"], dtype=np.float64), kind="stable")
+    arrays = {}
+    for name, dtype in NUMERIC.items():
+        arrays[name] = np.asarray(columns[name], dtype=dtype)[order]
+    for name in FEATURES:
+        arrays[name] = np.asarray(columns[name], dtype=np.float64)[order]
+    arrays["estimated"] = np.asarray(columns["estimated"], dtype=np.uint8)[order]
+    for name in CATEGORICAL:
+        values, codes = np.unique(np.asarray(columns[name], dtype=str), return_inverse=True)
+        arrays[name] = codes.astype(np.int32)[order]
+        arrays[name + ".dict"] = values
+    return arrays
+
+
+def load_index(directory=COLUMNAR_DIR):
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return {"parts": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_index(index, directory=COLUMNAR_DIR):
+    path = os.path.join(directory, INDEX_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def compact(log_dir=LOG_DIR, directory=COLUMNAR_DIR):
+    """Convert finished segments that have no part yet; returns the new index entries."""
+    os.makedirs(directory, exist_ok=True)
+    index = load_index(directory)
+    done = {part["segment"] for part in index["parts"]}
+    added = []
+    for segment in segment_files(log_dir):
+        name = os.path.basename(segment)
+        if name in done:
+            continue
+        columns, skipped = read_segment(segment)
+        part_file = name[:-len(SEGMENT_SUFFIX)] + ".npz"
+        entry = {"segment": name, "file": part_file, "rows": len(columns["ts"]), "skipped": skipped,
+                 "ts_min": None, "ts_max": None}
+        if entry["rows"]:
+            arrays = encode_part(columns)
+            tmp_path = os.path.join(directory, part_file + ".tmp.npz")
+            np.savez_compressed(tmp_path, **arrays)
+            os.replace(tmp_path, os.path.join(directory, part_file))
+            entry["ts_min"], entry["ts_max"] = float(arrays["ts"][0]), float(arrays["ts"][-1])
+        # Empty segments are recorded too, so they are not re-read every run.
+        index["parts"].append(entry)
+        added.append(entry)
+        save_index(index, directory)
+    return added
+
+
+# ============================== Queries ==============================
+
+class ColumnarLog:
+    def __init__(self, directory=COLUMNAR_DIR):
+        self.directory = directory
+        self.index = load_index(directory)
+
+    def parts(self, start=None, end=None):
+        """Index entries whose time range overlaps [start, end)."""
+        for part in self.index["parts"]:
+            if not part["rows"]:
+                continue
+            if start is not None and part["ts_max"] < start:
+                continue
+            if end is not None and part["ts_min"] >= end:
+                continue
+            yield part
+
+    def columns(self, names, start=None, end=None):
+        """Requested columns over [start, end), concatenated across parts.
+
+        Categorical columns come back decoded, as string arrays.
+        """
+        chunks = {name: [] for name in names}
+        for part in self.parts(start, end):
+            with np.load(os.path.join(self.directory, part["file"]), allow_pickle=False) as data:
+                ts = data["ts"]
+                lo = 0 if start is None else int(np.searchsorted(ts, start, "left"))
+                hi = len(ts) if end is None else int(np.searchsorted(ts, end, "left"))
+                if lo >= hi:
+                    continue
+                for name in names:
+                    values = ts[lo:hi] if name == "ts" else data[name][lo:hi]
+                    if name in CATEGORICAL:
+                        values = data[name + ".dict"][values]
+                    chunks[name].append(values)
+        return {name: np.concatenate(parts) if parts else np.empty(0) for name, parts in chunks.items()}
+
+    def mean_risk_by_age_band(self, start=None, end=None, bands=DEFAULT_AGE_BANDS):
+        """[(low, high, count, mean probability)] for each age band [low, high)."""
+        data = self.columns(["Age", "probability"], start, end)
+        edges = np.asarray(bands, dtype=np.float64)
+        band = np.searchsorted(edges, data["Age"], "right") - 1
+        inside = (band >= 0) & (band < len(edges) - 1)
+        counts = np.bincount(band[inside], minlength=len(edges) - 1)
+        sums = np.bincount(band[inside], weights=data["probability"][inside], minlength=len(edges) - 1)
+        return [(bands[i], bands[i + 1], int(counts[i]),
+                 float(sums[i] / counts[i]) if counts[i] else None) for i in range(len(edges) - 1)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar compaction and queries over the audit log.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("compact", help="convert finished JSONL segments to columnar parts")
+    bands = sub.add_parser("age-bands", help="mean predicted risk by age band")
+    bands.add_argument("--days", type=float, default=7.0, help="look back this many days (0 = all)")
+    args = parser.parse_args(argv)
+
+    if args.command == "compact":
+        start = time.perf_counter()
+        added = compact()
+        rows = sum(part["rows"] for part in added)
+        print(f"Compacted {len(added)} segments ({rows} rows) in {time.perf_counter() - start:.2f}s")
+        return 0
+
+    start = time.time() - args.days * 86400 if args.days > 0 else None
+    since = (datetime.fromtimestamp(start, timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+             if start is not None else "the beginning")
+    print(f"Mean risk by age band since {since}")
+    for low, high, count, mean in ColumnarLog().mean_risk_by_age_band(start):
+        risk = f"{mean * 100:6.2f}%" if mean is not None else "     -"
+        print(f"  {low:>3}-{high - 1:<3} {count:>10} {risk}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+# conditional_medians.py
+"""Conditional medians of the optional vitals, learned from Dataset/diabetes.csv.
+
+    python conditional_medians.py            # rebuild Model/conditional_medians.npz
+    python conditional_medians.py --check    # cross-validated error vs the rule estimators
+
+For each of SkinThickness, Insulin, Glucose and BloodPressure the build takes
+the median of the measured values (zeros are "not measured" and are left
+out) in every age x BMI x pregnancies bin:
+
+    age           <30, 30-39, 40-49, 50-59, 60+
+    BMI           <18.5, 18.5-24.9, 25-29.9, 30-34.9, 35-39.9, 40+
+    pregnancies   0, 1-2, 3-5, 6+
+
+A bin with fewer than MIN_COUNT measurements takes the median of its
+(age, BMI) bin instead, then of its BMI bin, then of the whole column, so
+every cell holds a value and a lookup is three bin searches and an array
+index. The arrays are small enough to commit next to the model; rebuild
+them whenever the dataset changes.
+
+Both Streamlit apps take estimated skin thickness and insulin from here
+(app.py through derived_inputs.py, and the risk table with it); app.py
+switches to knn_imputer.py when the user entered their glucose. Glucose
+and BP stay on the rule estimators. For glucose the medians are no better
+(--check: 23.0 vs 22.8 MAE). The app's BP is a systolic/diastolic estimate
+adjusted for smoking, activity and stress, which a bin median cannot
+replace. Batch scoring can use all four with --impute medians.
+"""
+import argparse
+import bisect
+import hashlib
+import os
+import sys
+import threading
+
+import numpy as np
+
+from inference import FEATURES
+from model_loader import BASE_DIR, MODEL_DIR
+
+DATASET_FILE = os.path.join(BASE_DIR, "Dataset", "diabetes.csv")
+TABLE_FILE = os.path.join(MODEL_DIR, "conditional_medians.npz")
+
+TARGETS = ("SkinThickness", "Insulin", "Glucose", "BloodPressure")
+# Upper-exclusive bin edges; values below the first edge go in bin 0.
+AGE_EDGES = (30, 40, 50, 60)
+BMI_EDGES = (18.5, 25, 30, 35, 40)
+PREGNANCY_EDGES = (1, 3, 6)
+MIN_COUNT = 5
+
+# Which fallback filled a cell; stored with the table.
+LEVEL_FULL, LEVEL_AGE_BMI, LEVEL_BMI, LEVEL_GLOBAL = 0, 1, 2, 3
+
+_I = {name: FEATURES.index(name) for name in FEATURES}
+
+
+def load_dataset(path=DATASET_FILE):
+    """(N, 8) float64 rows in inference.FEATURES order, and the file's sha256."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    header = raw.split(b"\n", 1)[0].decode("utf-8").strip().split(",")
+    data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+    X = data[:, [header.index(name) for name in FEATURES]]
+    return X, hashlib.sha256(raw).hexdigest()
+
+
+def bin_indices(age, bmi, pregnancies):
+    """Vectorized (age, BMI, pregnancies) bin indices. NaN lands in the last bin."""
+    return (np.searchsorted(AGE_EDGES, np.asarray(age, dtype=np.float64), "right"),
+            np.searchsorted(BMI_EDGES, np.asarray(bmi, dtype=np.float64), "right"),
+            np.searchsorted(PREGNANCY_EDGES, np.asarray(pregnancies, dtype=np.float64), "right"))
+
+
+def _grouped_medians(values, keys, n_groups):
+    """(median per group, count per group); NaN where a group is empty."""
+    medians = np.full(n_groups, np.nan)
+    counts = np.bincount(keys, minlength=n_groups)
+    order = np.argsort(keys, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(counts)])
+    ordered = values[order]
+    for group in np.nonzero(counts)[0]:
+        medians[group] = np.median(ordered[starts[group]:starts[group + 1]])
+    return medians, counts
+
+
+class ConditionalMedians:
+    def __init__(self, medians, counts, levels, dataset_sha256=None):
+        # medians/counts/levels: (len(TARGETS), age bins, BMI bins, pregnancy bins)
+        self.medians = np.asarray(medians, dtype=np.float64)
+        self.counts = np.asarray(counts, dtype=np.int32)
+        self.levels = np.asarray(levels, dtype=np.int8)
+        self.dataset_sha256 = dataset_sha256
+        # Nested lists for scalar lookups: no numpy call on the per-request path.
+        self._nested = {name: self.medians[t].tolist() for t, name in enumerate(TARGETS)}
+
+    def estimate(self, name, age, bmi, pregnancies):
+        """One bin median for a single user; `name` is one of TARGETS."""
+        return self._nested[name][bisect.bisect_right(AGE_EDGES, age)][
+            bisect.bisect_right(BMI_EDGES, bmi)][bisect.bisect_right(PREGNANCY_EDGES, pregnancies)]
+
+    def lookup(self, name, age, bmi, pregnancies):
+        """Bin medians for arrays of inputs (broadcast together)."""
+        a, b, p = bin_indices(age, bmi, pregnancies)
+        return self.medians[TARGETS.index(name)][a, b, p]
+
+    # ---------------- building ----------------
+    @classmethod
+    def build(cls, X, dataset_sha256=None, min_count=MIN_COUNT):
+        """Medians with fallbacks from (N, 8) rows; zeros and NaN count as missing."""
+        shape = (len(AGE_EDGES) + 1, len(BMI_EDGES) + 1, len(PREGNANCY_EDGES) + 1)
+        medians = np.empty((len(TARGETS),) + shape)
+        counts = np.empty((len(TARGETS),) + shape, dtype=np.int32)
+        levels = np.empty((len(TARGETS),) + shape, dtype=np.int8)
+
+        bmi = X[:, _I["BMI"]]
+        a, b, p = bin_indices(X[:, _I["Age"]], bmi, X[:, _I["Pregnancies"]])
+        binned = (bmi > 0) & ~np.isnan(X[:, [_I["Age"], _I["Pregnancies"]]]).any(axis=1)
+        for t, name in enumerate(TARGETS):
+            values = X[:, _I[name]]
+            keep = binned & (values > 0)
+            v, ka, kb, kp = values[keep], a[keep], b[keep], p[keep]
+
+            full, n_full = _grouped_medians(v, np.ravel_multi_index((ka, kb, kp), shape), np.prod(shape))
+            age_bmi, n_age_bmi = _grouped_medians(v, np.ravel_multi_index((ka, kb), shape[:2]),
+                                                  shape[0] * shape[1])
+            by_bmi, n_bmi = _grouped_medians(v, kb, shape[1])
+            overall = float(np.median(values[(values > 0) & ~np.isnan(values)]))
+
+            full, n_full = full.reshape(shape), n_full.reshape(shape)
+            age_bmi = np.broadcast_to(age_bmi.reshape(shape[:2])[:, :, None], shape)
+            n_age_bmi = np.broadcast_to(n_age_bmi.reshape(shape[:2])[:, :, None], shape)
+            by_bmi = np.broadcast_to(by_bmi[None, :, None], shape)
+            n_bmi = np.broadcast_to(n_bmi[None, :, None], shape)
+
+            medians[t] = np.select([n_full >= min_count, n_age_bmi >= min_count, n_bmi >= min_count],
+                                   [full, age_bmi, by_bmi], overall)
+            levels[t] = np.select([n_full >= min_count, n_age_bmi >= min_count, n_bmi >= min_count],
+                                  [LEVEL_FULL, LEVEL_AGE_BMI, LEVEL_BMI], LEVEL_GLOBAL)
+            counts[t] = n_full
+        return cls(medians, counts, levels, dataset_sha256)
+
+    # ---------------- persistence ----------------
+    def save(self, path=TABLE_FILE):
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, targets=np.array(TARGETS), age_edges=np.array(AGE_EDGES, float),
+                            bmi_edges=np.array(BMI_EDGES, float),
+                            pregnancy_edges=np.array(PREGNANCY_EDGES, float),
+                            medians=self.medians, counts=self.counts, levels=self.levels,
+                            dataset_sha256=np.array(self.dataset_sha256 or ""))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=TABLE_FILE):
+        with np.load(path, allow_pickle=False) as data:
+            layout = (tuple(data["targets"].tolist()), tuple(data["age_edges"].tolist()),
+                      tuple(data["bmi_edges"].tolist()), tuple(data["pregnancy_edges"].tolist()))
+            if layout != (TARGETS, AGE_EDGES, BMI_EDGES, PREGNANCY_EDGES):
+                raise ValueError(f"{path} was built with different bins; rerun conditional_medians.py")
+            return cls(data["medians"], data["counts"], data["levels"], str(data["dataset_sha256"]) or None)
+
+
+# ============================== Process-wide table ==============================
+_lock = threading.Lock()
+_table = None
+
+
+def get_conditional_medians(path=TABLE_FILE):
+    """The saved table, or one built from the dataset in memory if there is none."""
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                try:
+                    _table = ConditionalMedians.load(path)
+                except (OSError, ValueError, KeyError):
+                    _table = ConditionalMedians.build(*load_dataset())
+    return _table
+
+
+# ============================== Offline check ==============================
+
+def cross_validate(X, folds=5, seed=0):
+    """Mean absolute error per target: {name: (medians, rule estimators, n)}.
+
+    Each fold's table is built without that fold's rows and scored on its
+    measured values; the rule estimators are the app's, with default flags.
+    """
+    import imputation
+
+    age, bmi, pregnancies = X[:, _I["Age"]], X[:, _I["BMI"]], X[:, _I["Pregnancies"]]
+    insulin = imputation.estimate_insulin(100, bmi, pregnancies)
+    systolic, diastolic = imputation.estimate_bp(age, bmi)
+    rules = {"SkinThickness": imputation.estimate_skin_thickness(bmi, age),
+             "Insulin": insulin,
+             "Glucose": imputation.estimate_glucose(age, bmi, insulin),
+             "BloodPressure": (systolic + diastolic) / 2}
+
+    fold = np.random.default_rng(seed).permutation(len(X)) % folds
+    errors = {name: [[], []] for name in TARGETS}
+    for k in range(folds):
+        table = ConditionalMedians.build(X[fold != k])
+        test = (fold == k) & (bmi > 0)
+        for name in TARGETS:
+            rows = test & (X[:, _I[name]] > 0)
+            actual = X[rows, _I[name]]
+            errors[name][0].append(np.abs(table.lookup(name, age[rows], bmi[rows], pregnancies[rows]) - actual))
+            errors[name][1].append(np.abs(rules[name][rows] - actual))
+    return {name: (float(np.concatenate(m).mean()), float(np.concatenate(r).mean()), len(np.concatenate(m)))
+            for name, (m, r) in errors.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the conditional-median estimator tables.")
+    parser.add_argument("--dataset", default=DATASET_FILE)
+    parser.add_argument("--output", default=TABLE_FILE)
+    parser.add_argument("--check", action="store_true",
+                        help="only report cross-validated error against the rule estimators")
+    args = parser.parse_args(argv)
+
+    X, sha256 = load_dataset(args.dataset)
+    if args.check:
+        print(f"{'target':<14} {'n':>5} {'MAE medians':>12} {'MAE rules':>10}")
+        for name, (medians_mae, rules_mae, n) in cross_validate(X).items():
+            print(f"{name:<14} {n:>5} {medians_mae:>12.2f} {rules_mae:>10.2f}")
+        return 0
+
+    table = ConditionalMedians.build(X, sha256)
+    table.save(args.output)
+    print(f"Saved {args.output} from {len(X)} rows ({sha256[:12]})")
+    for t, name in enumerate(TARGETS):
+        cells = np.bincount(table.levels[t].ravel(), minlength=4)
+        print(f"  {name:<14} cells by level full/age+bmi/bmi/global: {'/'.join(map(str, cells))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
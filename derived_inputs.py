@@ -0,0 +1,149 @@
+# derived_inputs.py
+"""The app's derived inputs as a small reactive graph.
+
+    bmi              <- bmi_known, weight, height
+    skin_thickness   <- glucose_known, bmi, age, pregnancies
+    insulin          <- insulin_known, glucose_known, bmi, age, pregnancies
+    glucose_estimate <- age, bmi, insulin, active_glucose
+    bp_estimate      <- age, bmi, smoker, active, stress
+
+The app keeps one graph per session in st.session_state and set()s each
+widget value on every rerun. A set() that changes a value marks everything
+downstream of it dirty; get() recomputes a dirty node (after its dirty
+dependencies) and otherwise returns the stored value. So a rerun only
+recomputes what the changed widget feeds, and estimates for sections that
+are not shown are not computed at all.
+
+`bmi_known` / `insulin_known` / `glucose_known` hold the user's own value,
+or None when it is to be calculated or estimated; `insulin` is whichever
+applies, since the glucose estimate uses the entered insulin when there is
+one.
+
+When the user entered their glucose, skin thickness and insulin are the
+median of their nearest dataset neighbours by glucose, BMI, age and
+pregnancies (knn_imputer.py). Otherwise, or when the neighbour index is not
+available, they are the dataset's medians for the user's age x BMI x
+pregnancies bin (conditional_medians.py). Both track the measured values
+more closely than the rule estimators; glucose and BP still come from the
+rules.
+"""
+import time
+
+import metrics
+from estimators import calculate_bmi, estimate_bp, estimate_glucose
+
+
+class InputGraph:
+    def __init__(self):
+        self._inputs = {}
+        self._nodes = {}          # name -> (dependencies, function)
+        self._values = {}
+        self._dirty = set()
+        self._dependents = {}     # name -> names that read it directly
+        self._stats = {}          # name -> {"computations": n, "last_seconds": s}
+
+    def add_input(self, name, value=None):
+        self._inputs[name] = value
+        self._dependents.setdefault(name, [])
+
+    def add_node(self, name, dependencies, function):
+        """Dependencies must already be in the graph, so it stays acyclic."""
+        missing = [dep for dep in dependencies if dep not in self._dependents]
+        if missing:
+            raise ValueError(f"{name} depends on unknown nodes: {', '.join(missing)}")
+        self._nodes[name] = (tuple(dependencies), function)
+        self._dependents[name] = []
+        for dep in dependencies:
+            self._dependents[dep].append(name)
+        self._dirty.add(name)
+        self._stats[name] = {"computations": 0, "last_seconds": None}
+
+    def set(self, name, value):
+        """Update an input; returns whether it changed (and invalidated anything)."""
+        old = self._inputs[name]
+        if type(old) is type(value) and old == value:
+            return False
+        self._inputs[name] = value
+        stack = list(self._dependents[name])
+        while stack:
+            node = stack.pop()
+            if node not in self._dirty:
+                self._dirty.add(node)
+                stack.extend(self._dependents[node])
+        return True
+
+    def get(self, name):
+        if name in self._inputs:
+            return self._inputs[name]
+        if name in self._dirty:
+            dependencies, function = self._nodes[name]
+            args = [self.get(dep) for dep in dependencies]
+            start = time.perf_counter()
+            self._values[name] = function(*args)
+            elapsed = time.perf_counter() - start
+            metrics.observe("estimate", elapsed)
+            self._stats[name]["computations"] += 1
+            self._stats[name]["last_seconds"] = elapsed
+            self._dirty.discard(name)
+        return self._values[name]
+
+    # ---------------- debugging ----------------
+    def order(self):
+        """Derived nodes in evaluation order (every node after its dependencies)."""
+        return list(self._nodes)
+
+    def describe(self):
+        """One row per node for the admin panel."""
+        rows = [{"node": name, "depends on": "", "value": repr(value), "state": "input",
+                 "computations": None, "last_ms": None} for name, value in self._inputs.items()]
+        for name, (dependencies, _) in self._nodes.items():
+            stats = self._stats[name]
+            if name in self._dirty:
+                state = "dirty" if stats["computations"] else "not computed"
+            else:
+                state = "clean"
+            rows.append({"node": name, "depends on": ", ".join(dependencies),
+                         "value": repr(self._values[name]) if name in self._values else "",
+                         "state": state, "computations": stats["computations"],
+                         "last_ms": (round(stats["last_seconds"] * 1000, 4)
+                                     if stats["last_seconds"] is not None else None)})
+        return rows
+
+
+def _bmi(bmi_known, weight, height):
+    return bmi_known if bmi_known is not None else calculate_bmi(weight, height)
+
+
+def _estimate(name, glucose_known, bmi, age, pregnancies):
+    # Imported here: both need numpy, which the app loads in the background.
+    if glucose_known:
+        from knn_imputer import knn_imputer_if_available
+        knn = knn_imputer_if_available()
+        if knn is not None:
+            return knn.estimate(name, glucose_known, bmi, age, pregnancies)
+    from conditional_medians import get_conditional_medians
+    return get_conditional_medians().estimate(name, age, bmi, pregnancies)
+
+
+def _skin_thickness(glucose_known, bmi, age, pregnancies):
+    return _estimate("SkinThickness", glucose_known, bmi, age, pregnancies)
+
+
+def _insulin(insulin_known, glucose_known, bmi, age, pregnancies):
+    if insulin_known is not None:
+        return insulin_known
+    return _estimate("Insulin", glucose_known, bmi, age, pregnancies)
+
+
+def build_input_graph():
+    """A fresh graph with the app's inputs and estimators, nothing computed yet."""
+    graph = InputGraph()
+    for name in ("age", "pregnancies", "bmi_known", "weight", "height", "insulin_known",
+                 "glucose_known", "smoker", "active", "stress", "active_glucose"):
+        graph.add_input(name)
+    graph.add_node("bmi", ("bmi_known", "weight", "height"), _bmi)
+    graph.add_node("skin_thickness", ("glucose_known", "bmi", "age", "pregnancies"), _skin_thickness)
+    graph.add_node("insulin", ("insulin_known", "glucose_known", "bmi", "age", "pregnancies"), _insulin)
+    graph.add_node("glucose_estimate", ("age", "bmi", "insulin", "active_glucose"), estimate_glucose)
+    graph.add_node("bp_estimate", ("age", "bmi", "smoker", "active", "stress"), estimate_bp)
+    return graph
@@ -0,0 +1,118 @@
+# estimators.py
+# Input helpers shared by the Streamlit app and the offline tools.
+from enum import IntEnum
+
+
+def calculate_bmi(weight_kg, height_cm):
+    height_m = height_cm / 100
+    return round(weight_kg / (height_m ** 2), 2) if height_m > 0 else 0
+
+
+def diabetes_pedigree_function(num_relatives, weights):
+    return round(sum(weights), 2) if num_relatives else 0.0
+
+
+class BPCategory(IntEnum):
+    """interpret_bp's categories as compact codes (see classify_bp)."""
+    LOW = 0
+    NORMAL = 1
+    ELEVATED = 2
+    STAGE_1 = 3
+    STAGE_2 = 4
+    CRISIS = 5
+    UNKNOWN = 6
+
+
+BP_LABELS = {
+    BPCategory.LOW: "Low (Hypotension)",
+    BPCategory.NORMAL: "Normal",
+    BPCategory.ELEVATED: "Elevated",
+    BPCategory.STAGE_1: "High (Stage 1)",
+    BPCategory.STAGE_2: "High (Stage 2)",
+    BPCategory.CRISIS: "Hypertensive Crisis",
+    BPCategory.UNKNOWN: "Unknown",
+}
+
+
+def interpret_bp(systolic, diastolic):
+    if systolic < 90 or diastolic < 60:
+        return "Low (Hypotension)"
+    elif 90 <= systolic < 120 and 60 <= diastolic < 80:
+        return "Normal"
+    elif 120 <= systolic < 130 and diastolic < 80:
+        return "Elevated"
+    elif 130 <= systolic < 140 or 80 <= diastolic < 90:
+        return "High (Stage 1)"
+    elif 140 <= systolic < 180 or 90 <= diastolic < 120:
+        return "High (Stage 2)"
+    elif systolic >= 180 or diastolic >= 120:
+        return "Hypertensive Crisis"
+    else:
+        return "Unknown"
+
+
+def classify_bp(systolic, diastolic):
+    """BPCategory codes (int8) for arrays of readings.
+
+    np.select takes the first true condition, so listing interpret_bp's
+    branches in the same order keeps its precedence where the ranges
+    overlap (e.g. 135/95 is Stage 1, not Stage 2). NaN readings fail every
+    test and come out UNKNOWN, as they do there.
+    """
+    # numpy is imported here so the scalar helpers above stay dependency-free.
+    import numpy as np
+
+    s = np.asarray(systolic, dtype=np.float64)
+    d = np.asarray(diastolic, dtype=np.float64)
+    conditions = [
+        (s < 90) | (d < 60),
+        (90 <= s) & (s < 120) & (60 <= d) & (d < 80),
+        (120 <= s) & (s < 130) & (d < 80),
+        ((130 <= s) & (s < 140)) | ((80 <= d) & (d < 90)),
+        ((140 <= s) & (s < 180)) | ((90 <= d) & (d < 120)),
+        (s >= 180) | (d >= 120),
+    ]
+    categories = [BPCategory.LOW, BPCategory.NORMAL, BPCategory.ELEVATED, BPCategory.STAGE_1,
+                  BPCategory.STAGE_2, BPCategory.CRISIS]
+    return np.select(conditions, [np.int8(c) for c in categories], np.int8(BPCategory.UNKNOWN))
+
+
+def estimate_bp(age, bmi, smoker=False, active=True, stress=False):
+    systolic = 100 + (0.5 * age) + (0.3 * bmi)
+    diastolic = 60 + (0.2 * age) + (0.2 * bmi)
+    if smoker: systolic += 5; diastolic += 3
+    if not active: systolic += 5; diastolic += 2
+    if stress: systolic += 4; diastolic += 3
+    return round(systolic, 1), round(diastolic, 1)
+
+
+def estimate_skin_thickness(bmi, age):
+    if bmi < 18.5:
+        return 10
+    elif 18.5 <= bmi < 25:
+        return 20
+    elif 25 <= bmi < 30:
+        return 25
+    else:
+        return 35
+
+
+def estimate_insulin(glucose, bmi, pregnancies):
+    base = 50
+    if glucose > 140:
+        base += 40
+    elif glucose > 100:
+        base += 20
+    if bmi > 30:
+        base += 30
+    base += pregnancies * 2
+    return round(base, 1)
+
+
+def estimate_glucose(age, bmi, insulin, active=True):
+    glucose = 85 + (0.6 * age) + (0.4 * bmi)
+    if insulin > 150:
+        glucose += 20
+    if not active:
+        glucose += 15
+    return round(glucose, 1)
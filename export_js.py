@@ -0,0 +1,146 @@
+# export_js.py
+"""Export the folded model as a small JavaScript module for in-browser scoring.
+
+    python export_js.py            # writes static/risk_model.js and checks parity
+
+templates/index.html loads the module to show the risk as the form is filled
+in, and posts the browser's result along with the inputs so the server can
+verify it. The parity check runs the generated file under Node.js against the
+Python predictor on every row of Dataset/diabetes.csv.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+from inference import FEATURES, FORM_FIELDS, get_predictor
+from model_loader import BASE_DIR
+
+JS_FILE = os.path.join(BASE_DIR, "static", "risk_model.js")
+DATASET_FILE = os.path.join(BASE_DIR, "Dataset", "diabetes.csv")
+
+# Browser and server results may differ in the last bits of the sum.
+PARITY_TOLERANCE = 1e-12
+
+TEMPLATE = """\
+// Generated by export_js.py for model {version}. Do not edit by hand.
+(function (root) {{
+  "use strict";
+
+  var model = {{
+    version: {version_json},
+    features: {features},
+    fields: {fields},
+    weights: {weights},
+    bias: {bias},
+    threshold: {threshold}
+  }};
+
+  // weights . values + bias, with the StandardScaler already folded in.
+  function logit(values) {{
+    var z = model.bias;
+    for (var i = 0; i < model.weights.length; i++) {{
+      z += model.weights[i] * values[i];
+    }}
+    return z;
+  }}
+
+  function predict(values) {{
+    var z = logit(values);
+    var p = z >= 0 ? 1 / (1 + Math.exp(-z)) : Math.exp(z) / (1 + Math.exp(z));
+    return {{ prediction: z > model.threshold ? 1 : 0, probability: p }};
+  }}
+
+  // Reads the index.html form; returns null until every field holds a number.
+  function predictForm(form) {{
+    var values = [];
+    for (var i = 0; i < model.fields.length; i++) {{
+      var input = form.elements[model.fields[i]];
+      var value = input ? parseFloat(input.value) : NaN;
+      if (isNaN(value)) {{
+        return null;
+      }}
+      values.push(value);
+    }}
+    return predict(values);
+  }}
+
+  model.predict = predict;
+  model.predictForm = predictForm;
+
+  if (typeof module !== "undefined" && module.exports) {{
+    module.exports = model;
+  }} else {{
+    root.DiabetesRiskModel = model;
+  }}
+}})(this);
+"""
+
+
+def render_module(predictor):
+    return TEMPLATE.format(
+        version=predictor.version,
+        version_json=json.dumps(predictor.version),
+        features=json.dumps(FEATURES),
+        fields=json.dumps(FORM_FIELDS),
+        # repr() is the shortest string that round-trips, and JS parses it to the same double.
+        weights="[" + ", ".join(repr(float(w)) for w in predictor.weights) + "]",
+        bias=repr(predictor.bias),
+        threshold=repr(predictor.threshold),
+    )
+
+
+def export_js(predictor, path=JS_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="\n") as f:
+        f.write(render_module(predictor))
+    return path
+
+
+def check_parity(predictor, path=JS_FILE, X=None):
+    """Max |p_js - p_python| and label mismatches over X (default: the dataset)."""
+    node = shutil.which("node") or shutil.which("nodejs")
+    if node is None:
+        raise RuntimeError("Node.js is needed to check the generated module")
+    if X is None:
+        X = np.loadtxt(DATASET_FILE, delimiter=",", skiprows=1, usecols=range(len(FEATURES)))
+
+    script = ("const m = require(process.argv[1]);"
+              "const rows = JSON.parse(require('fs').readFileSync(0, 'utf8'));"
+              "process.stdout.write(JSON.stringify(rows.map(r => m.predict(r))));")
+    result = subprocess.run([node, "-e", script, os.path.abspath(path)],
+                            input=json.dumps(X.tolist()), capture_output=True, text=True, check=True)
+    js = json.loads(result.stdout)
+
+    labels, proba = predictor.predict(X)
+    js_proba = np.array([r["probability"] for r in js])
+    js_labels = np.array([r["prediction"] for r in js])
+    return float(np.max(np.abs(js_proba - proba))), int(np.sum(js_labels != labels))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the model for client-side scoring.")
+    parser.add_argument("--out", default=JS_FILE)
+    parser.add_argument("--no-check", action="store_true", help="skip the Node.js parity check")
+    args = parser.parse_args(argv)
+
+    predictor = get_predictor()
+    path = export_js(predictor, args.out)
+    print(f"Wrote {path} for model {predictor.version}")
+    if args.no_check:
+        return 0
+
+    max_err, label_mismatches = check_parity(predictor, path)
+    print(f"Parity vs Python: max |dp| = {max_err:.2e}, label mismatches = {label_mismatches}")
+    if max_err > PARITY_TOLERANCE or label_mismatches:
+        print("Parity check FAILED", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# export_model.py
+"""Export Model/*.pkl as the numeric artifact used by the serving path.
+
+    python export_model.py
+
+Run after retraining in Notebook/Diabetic EDA.ipynb. Metrics are computed on
+the notebook's hold-out split (zeros replaced by column means, test_size=0.25,
+random_state=0), and the exported artifact is checked against sklearn before
+the command succeeds. Needs scikit-learn and pandas; serving does not.
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from artifact import ARTIFACT_NAME, export_artifact, load_artifact, pickled_sklearn_version, pickles_digest
+from inference import FEATURES, verify_against_sklearn
+from model_loader import BASE_DIR, MODEL_DIR, load_artifacts
+
+DATASET_FILE = os.path.join(BASE_DIR, "Dataset", "diabetes.csv")
+
+
+def holdout_metrics(model, scaler, dataset_path=DATASET_FILE):
+    """Accuracy/precision/recall/F1/AUC on the split used in the EDA notebook."""
+    data = pd.read_csv(dataset_path)
+    for column in ["BMI", "BloodPressure", "Glucose", "Insulin", "SkinThickness"]:
+        data[column] = data[column].replace(0, data[column].mean())
+    X, y = data[FEATURES], data["Outcome"]
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.25, random_state=0)
+
+    X_test_scaled = scaler.transform(X_test)
+    y_pred = model.predict(X_test_scaled)
+    y_score = model.predict_proba(X_test_scaled)[:, 1]
+    return {
+        "n_test": int(len(y_test)),
+        "accuracy": round(float(accuracy_score(y_test, y_pred)), 4),
+        "precision": round(float(precision_score(y_test, y_pred)), 4),
+        "recall": round(float(recall_score(y_test, y_pred)), 4),
+        "f1": round(float(f1_score(y_test, y_pred)), 4),
+        "roc_auc": round(float(roc_auc_score(y_test, y_score)), 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the pickled model as a numeric artifact.")
+    parser.add_argument("--out-dir", default=MODEL_DIR, help="directory for the .npy/.json pair")
+    parser.add_argument("--name", default=ARTIFACT_NAME, help="artifact base name")
+    args = parser.parse_args(argv)
+
+    model, scaler = load_artifacts()
+    manifest = export_artifact(model, scaler, args.out_dir, args.name,
+                               metrics=holdout_metrics(model, scaler), source_sha256=pickles_digest(),
+                               source_sklearn_version=pickled_sklearn_version())
+    predictor = load_artifact(os.path.join(args.out_dir, args.name + ".json"))
+    max_err = verify_against_sklearn(predictor, model, scaler)
+
+    print(f"Exported {args.name} ({manifest['sha256'][:12]}) to {args.out_dir}")
+    print(f"Metrics: {manifest['metrics']}")
+    print(f"Max |p - p_sklearn| on probe rows: {max_err:.2e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
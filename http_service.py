@@ -0,0 +1,761 @@
+# http_service.py
+"""Lightweight asyncio HTTP service for the prediction model.
+
+    python http_service.py --host 0.0.0.0 --port 8000
+
+Routes:
+    GET  /             templates/index.html
+    POST /predict      form post -> templates/result.html, JSON body -> JSON
+    POST /predict/bulk NDJSON records in, NDJSON results streamed back
+    GET  /static/...   files under static/
+    GET  /status       model registry, cache, batching and admission status (JSON)
+    GET  /metrics      per-stage latency histograms and counters (Prometheus)
+
+The model is loaded once per process through the registry and scored on the
+event loop; a prediction is a dot product, so there is nothing to offload to
+threads and one process handles many concurrent connections. Cache misses
+that arrive together are scored as one matrix by the micro-batcher.
+
+/predict goes through admission control: when too many predictions are
+already waiting, a request is answered from the prediction cache if it can
+be, and otherwise gets 503 with Retry-After straight away. Each group of
+/predict/bulk records is admitted the same way; a group that is turned away
+ends the stream with an error record, after the last line that was scored.
+
+Both endpoints score the row snapped to the prediction cache's grid
+(prediction_cache.RESOLUTION), so a record gets the same probability whichever
+endpoint it is sent to and whether or not it was cached. Snapping moves the
+probability by at most max_probability_error(weights) from the exact row's.
+"""
+import argparse
+import asyncio
+import json
+import math
+import mimetypes
+import os
+import sys
+import time
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import numpy as np
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+import metrics
+from admission import (DEFAULT_LATENCY_TARGET_SECONDS, DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_QUEUE,
+                       AdmissionController, Overloaded)
+from audit_log import get_audit_log, make_entry
+from inference import FEATURES, FORM_FIELDS
+from microbatch import DEFAULT_MAX_BATCH, DEFAULT_WINDOW_SECONDS, MicroBatcher
+from model_loader import BASE_DIR, loader_stats
+from prediction_cache import (RESOLUTION, canonical_key, get_prediction_cache, key_to_features,
+                              max_probability_error)
+from registry import get_registry
+
+_GRID = np.array([RESOLUTION[name] for name in FEATURES], dtype=np.float64)
+
+TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+MAX_LINE_BYTES = 16 * 1024
+KEEPALIVE_SECONDS = 15
+# A client that stops sending its body for this long gets 408 and is disconnected.
+BODY_TIMEOUT_SECONDS = 30
+
+# /predict/bulk scores this many records per matrix call, and sends what it
+# has if the client pauses for longer than BULK_FLUSH_SECONDS.
+BULK_BATCH = 1024
+BULK_FLUSH_SECONDS = 0.05
+
+# Sent with "busy" responses.
+RETRY_AFTER_SECONDS = 1
+
+# /status fields that only ever go up; /metrics exports them as counters.
+COUNTERS = {
+    "loader": {"hits", "misses", "loads", "load_seconds"},
+    "prediction_cache": {"hits", "misses", "evictions", "expirations", "invalidations", "stale_version"},
+    "microbatch": {"requests", "batches", "wait_seconds_total"},
+    "client_scoring": {"verified", "mismatched", "stale_version", "absent"},
+    "admission": {"admitted", "queued", "rejected", "rejected_queue_full", "rejected_latency",
+                  "rejected_timeout", "queue_wait_seconds_total", "served_from_cache", "busy"},
+    "audit_log": {"recorded", "written", "dropped", "fsyncs", "rotations", "write_errors"},
+}
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           408: "Request Timeout", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    def __init__(self, method, target, version, headers, reader, writer,
+                 body_timeout=BODY_TIMEOUT_SECONDS):
+        self.method = method
+        self.version = version
+        self.headers = headers
+        self.reader = reader
+        self.writer = writer
+        self.body_timeout = body_timeout
+        parts = urlsplit(target)
+        self.path = unquote(parts.path)
+        self.query = dict(parse_qsl(parts.query))
+        self._body_consumed = False
+        self._continue_sent = False
+
+    @property
+    def content_type(self):
+        return self.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    @property
+    def chunked(self):
+        return "chunked" in self.headers.get("transfer-encoding", "").lower()
+
+    @property
+    def content_length(self):
+        value = self.headers.get("content-length") or "0"
+        try:
+            length = int(value)
+        except ValueError:
+            raise HTTPError(400, "bad Content-Length")
+        if length < 0:
+            raise HTTPError(400, "bad Content-Length")
+        return length
+
+    async def _read(self, read):
+        """Await one body read, giving up after body_timeout seconds without data."""
+        try:
+            return await asyncio.wait_for(read, self.body_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(408, f"request body not received within {self.body_timeout:g} s")
+
+    async def send_continue(self):
+        """Answer `Expect: 100-continue`; must happen before any response headers."""
+        if not self._continue_sent and self.headers.get("expect", "").lower() == "100-continue":
+            self._continue_sent = True
+            self.writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await self.writer.drain()
+
+    async def iter_chunks(self, size=64 * 1024):
+        """Yield the request body in pieces as they arrive (Content-Length or chunked)."""
+        if not self._body_consumed:
+            await self.send_continue()
+        self._body_consumed = True
+        if self.chunked:
+            while True:
+                size_line = await self._read(self.reader.readline())
+                try:
+                    remaining = int(size_line.split(b";")[0].strip(), 16)
+                except ValueError:
+                    raise HTTPError(400, "malformed chunked body")
+                if remaining == 0:
+                    # Skip optional trailers up to the final blank line.
+                    while (await self._read(self.reader.readline())).strip():
+                        pass
+                    return
+                while remaining:
+                    data = await self._read(self.reader.read(min(remaining, size)))
+                    if not data:
+                        raise asyncio.IncompleteReadError(b"", remaining)
+                    remaining -= len(data)
+                    yield data
+                await self._read(self.reader.readexactly(2))
+        else:
+            remaining = self.content_length
+            while remaining:
+                data = await self._read(self.reader.read(min(remaining, size)))
+                if not data:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                remaining -= len(data)
+                yield data
+
+    async def iter_lines(self, max_line=MAX_LINE_BYTES):
+        """Yield body lines (without the newline) without buffering the whole body."""
+        pending = b""
+        async for data in self.iter_chunks():
+            lines = (pending + data).split(b"\n")
+            pending = lines.pop()
+            if len(pending) > max_line:
+                raise HTTPError(413, f"line longer than {max_line} bytes")
+            for line in lines:
+                yield line
+        if pending.strip():
+            yield pending
+
+    async def body(self, limit=MAX_BODY_BYTES):
+        """Read the whole request body into memory, up to `limit` bytes."""
+        if not self.chunked and self.content_length > limit:
+            raise HTTPError(413, f"request body larger than {limit} bytes")
+        parts, total = [], 0
+        async for data in self.iter_chunks():
+            total += len(data)
+            if total > limit:
+                raise HTTPError(413, f"request body larger than {limit} bytes")
+            parts.append(data)
+        return b"".join(parts)
+
+    async def discard_body(self):
+        if not self._body_consumed:
+            async for _ in self.iter_chunks():
+                pass
+
+
+class Response:
+    def __init__(self, body=b"", status=200, content_type="text/plain; charset=utf-8", headers=None):
+        self.body = body.encode() if isinstance(body, str) else body
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers or {}
+
+    @classmethod
+    def json(cls, payload, status=200, headers=None):
+        return cls(json.dumps(payload), status, "application/json", headers)
+
+    def head(self, keep_alive):
+        lines = [f"HTTP/1.1 {self.status} {REASONS.get(self.status, '')}",
+                 f"Content-Type: {self.content_type}",
+                 f"Content-Length: {len(self.body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in self.headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def send(self, writer, keep_alive):
+        writer.write(self.head(keep_alive) + self.body)
+        await writer.drain()
+
+
+class StreamingResponse(Response):
+    """Response whose body comes from an async iterator, sent with chunked encoding."""
+
+    def __init__(self, chunks, status=200, content_type="application/x-ndjson", headers=None):
+        super().__init__(b"", status, content_type, headers)
+        self.chunks = chunks
+
+    def head(self, keep_alive):
+        lines = [f"HTTP/1.1 {self.status} {REASONS.get(self.status, '')}",
+                 f"Content-Type: {self.content_type}",
+                 "Transfer-Encoding: chunked",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in self.headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def send(self, writer, keep_alive):
+        """Stream the body; returns False if it failed midway and the connection must close."""
+        writer.write(self.head(keep_alive))
+        ok = True
+        try:
+            async for data in self.chunks:
+                if data:
+                    writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    # Backpressure: don't produce more until the client has read this.
+                    await writer.drain()
+        except (HTTPError, ValueError, asyncio.IncompleteReadError) as exc:
+            # Headers are already out, so report the failure as a final record.
+            message = exc.message if isinstance(exc, HTTPError) else f"{type(exc).__name__}: {exc}"
+            data = (json.dumps({"error": message}) + "\n").encode()
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            ok = False
+        except Exception:
+            # Still end the chunked body properly; the details stay on the server.
+            data = b'{"error": "internal error"}\n'
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            ok = False
+        finally:
+            await self.chunks.aclose()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return ok
+
+
+# ============================== Input parsing ==============================
+
+def parse_features(fields):
+    """Feature row from a mapping keyed by dataset column names or form field names."""
+    row = []
+    for form_name, name in zip(FORM_FIELDS, FEATURES):
+        value = fields.get(name, fields.get(form_name))
+        if value is None or value == "":
+            raise HTTPError(400, f"missing field '{name}'")
+        if isinstance(value, bool):
+            # A JSON true/false would otherwise be scored as 1/0.
+            raise HTTPError(400, f"field '{name}' is not a number: {value!r}")
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"field '{name}' is not a number: {value!r}")
+        except OverflowError:
+            # A JSON integer too large for a float, such as 10**400.
+            raise HTTPError(400, f"field '{name}' is out of range")
+        if not math.isfinite(number):
+            # float() takes "NaN", "Infinity" and "1e400"; none of them can be scored.
+            raise HTTPError(400, f"field '{name}' is not a finite number: {value!r}")
+        if not math.isfinite(number * RESOLUTION[name]):
+            # Finite, but too large for the prediction cache's grid (canonical_key).
+            raise HTTPError(400, f"field '{name}' is out of range: {value!r}")
+        row.append(number)
+    return row
+
+
+def _reject_constant(name):
+    """json.loads hook: NaN, Infinity and -Infinity are not JSON; treat them as invalid."""
+    raise ValueError(f"invalid JSON constant {name}")
+
+
+def _result_line(result):
+    """One NDJSON output line. allow_nan=False: a NaN or Infinity would not be JSON.
+
+    The only client-supplied value echoed back is "id"; one that cannot be
+    written (such as 1e400, read as Infinity) is replaced with null.
+    """
+    try:
+        return json.dumps(result, allow_nan=False) + "\n"
+    except ValueError:
+        return json.dumps(dict(result, id=None), allow_nan=False) + "\n"
+
+
+def parse_estimated(value):
+    """Feature names from an "estimated" list (dataset or form names) for the audit log."""
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise HTTPError(400, "'estimated' must be a list of field names")
+    names = []
+    for item in value:
+        if item in FEATURES:
+            names.append(item)
+        elif item in FORM_FIELDS:
+            names.append(FEATURES[FORM_FIELDS.index(item)])
+        else:
+            raise HTTPError(400, f"unknown field in 'estimated': {item!r}")
+    return names
+
+
+# ============================== Application ==============================
+
+class PredictionService:
+    def __init__(self, registry=None, cache=None, batch_window=DEFAULT_WINDOW_SECONDS,
+                 max_batch=DEFAULT_MAX_BATCH, admission=None, audit=None, trust_user_header=False,
+                 body_timeout=BODY_TIMEOUT_SECONDS):
+        self.registry = registry or get_registry()
+        self.cache = cache or get_prediction_cache()
+        self.batcher = MicroBatcher(self.registry, batch_window, max_batch)
+        self.admission = admission or AdmissionController()
+        self.shed_stats = {"served_from_cache": 0, "busy": 0}
+        self.audit = audit or get_audit_log()
+        self.trust_user_header = trust_user_header
+        self.body_timeout = body_timeout
+        self.templates = Environment(loader=FileSystemLoader(TEMPLATE_DIR),
+                                     autoescape=select_autoescape(["html"]))
+        self.templates.globals["url_for"] = lambda endpoint, filename="": f"/{endpoint}/{filename}"
+        self.routes = {
+            ("GET", "/"): self.index,
+            ("POST", "/predict"): self.predict,
+            ("POST", "/predict/bulk"): self.predict_bulk,
+            ("GET", "/status"): self.status,
+            ("GET", "/metrics"): self.export_metrics,
+        }
+        # Form posts carry the browser's result (static/risk_model.js); see verify_client.
+        self.client_checks = {"verified": 0, "mismatched": 0, "stale_version": 0, "absent": 0}
+        self._client_tolerance = (None, 0.0)
+
+    def request_user(self, request):
+        """The X-User header if the service was told to trust it, else "" (anonymous).
+
+        The service does no authentication of its own. The header is only
+        meaningful behind a proxy that authenticates users and sets it,
+        overwriting whatever the client sent; started without
+        --trust-user-header, every prediction is logged anonymously.
+        """
+        if not self.trust_user_header:
+            return ""
+        return request.headers.get("x-user", "")
+
+    def render(self, name, **context):
+        with metrics.timed("render"):
+            html = self.templates.get_template(name).render(**context)
+        return Response(html, content_type="text/html; charset=utf-8")
+
+    async def score(self, row):
+        """(label, probability, model_version) via the cache, then the micro-batcher."""
+        key = canonical_key(row)
+        version = self.registry.active_version
+        cached = self.cache.get(key, version)
+        if cached is not None:
+            return (*cached, version)
+        label, probability, version = await self.batcher.submit(key_to_features(key))
+        self.cache.put(key, version, (label, probability))
+        return label, probability, version
+
+    async def score_admitted(self, row):
+        """score() behind admission control.
+
+        When the request is shed, returns a cached result (marked as such) if
+        there is one, otherwise None.
+        """
+        try:
+            async with self.admission.admit():
+                label, probability, version = await self.score(row)
+                return label, probability, version, False
+        except Overloaded:
+            version = self.registry.active_version
+            cached = self.cache.get(canonical_key(row), version)
+            if cached is None:
+                self.shed_stats["busy"] += 1
+                return None
+            self.shed_stats["served_from_cache"] += 1
+            return (*cached, version, True)
+
+    def verify_client(self, fields, probability, version):
+        """Compare the probability the browser showed with the one the server computed.
+
+        The server scores the cache-grid-snapped row, so the two may differ by
+        up to max_probability_error; a larger gap means the page is running
+        modified or out-of-date code. The server's result is what gets shown.
+        """
+        client_probability = fields.get("client_probability")
+        if not client_probability:
+            self.client_checks["absent"] += 1
+            return None
+        if fields.get("client_version") != version:
+            self.client_checks["stale_version"] += 1
+            return False
+        if self._client_tolerance[0] != version:
+            with self.registry.acquire() as predictor:
+                self._client_tolerance = (version, max_probability_error(predictor.weights) + 1e-9)
+        try:
+            ok = abs(float(client_probability) - probability) <= self._client_tolerance[1]
+        except ValueError:
+            ok = False
+        self.client_checks["verified" if ok else "mismatched"] += 1
+        return ok
+
+    # ---------------- handlers ----------------
+    async def index(self, request):
+        return self.render("index.html")
+
+    async def predict(self, request):
+        body = await request.body()
+        start = time.perf_counter()
+        if request.content_type == "application/json":
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(400, "request body is not valid JSON")
+            if not isinstance(payload, dict):
+                raise HTTPError(400, "expected a JSON object")
+            row = parse_features(payload)
+            estimated = parse_estimated(payload.get("estimated"))
+            result = await self.score_admitted(row)
+            if result is None:
+                return Response.json({"error": "server busy, retry later"}, 503,
+                                     {"Retry-After": str(RETRY_AFTER_SECONDS)})
+            label, probability, version, from_cache = result
+            self.audit.record(make_entry(row, probability, label, version, time.perf_counter() - start,
+                                         estimated, self.request_user(request), "http"))
+            payload = {"prediction": label, "probability": probability, "model_version": version}
+            if from_cache:
+                payload["served_from"] = "cache"
+            return Response.json(payload)
+
+        fields = dict(parse_qsl(body.decode("utf-8", "replace")))
+        row = parse_features(fields)
+        result = await self.score_admitted(row)
+        if result is None:
+            response = self.render("busy.html", retry_after=RETRY_AFTER_SECONDS)
+            response.status = 503
+            response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+            return response
+        label, probability, version, _ = result
+        self.audit.record(make_entry(row, probability, label, version, time.perf_counter() - start,
+                                     (), self.request_user(request), "form"))
+        self.verify_client(fields, probability, version)
+        return self.render("result.html", prediction=label, probability=round(probability * 100, 2))
+
+    async def predict_bulk(self, request):
+        """One JSON record per line in, one result per line out, as records are scored."""
+        # The body is read while the response streams, after our headers are out.
+        await request.send_continue()
+        return StreamingResponse(self._bulk_results(request))
+
+    async def _read_lines(self, request, queue):
+        try:
+            async for line in request.iter_lines():
+                await queue.put(line)
+            await queue.put(None)
+        except Exception as exc:
+            await queue.put(exc)
+
+    async def _bulk_results(self, request):
+        # The reader fills a bounded queue, so neither side buffers more than
+        # a couple of batches: slow clients on either end get backpressure.
+        queue = asyncio.Queue(maxsize=2 * BULK_BATCH)
+        reader = asyncio.create_task(self._read_lines(request, queue))
+        line_no = 0
+        try:
+            done = False
+            while not done:
+                group = [await queue.get()]
+                deadline = time.monotonic() + BULK_FLUSH_SECONDS
+                while len(group) < BULK_BATCH and group[-1] is not None \
+                        and not isinstance(group[-1], Exception):
+                    if queue.empty():
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        try:
+                            group.append(await asyncio.wait_for(queue.get(), timeout))
+                        except asyncio.TimeoutError:
+                            break
+                    else:
+                        group.append(queue.get_nowait())
+                if group[-1] is None or isinstance(group[-1], Exception):
+                    done = True
+                    last = group.pop()
+                if group:
+                    try:
+                        async with self.admission.admit():
+                            scored = self._score_lines(group, line_no, self.request_user(request))
+                    except Overloaded:
+                        self.shed_stats["busy"] += 1
+                        raise HTTPError(503, f"server busy, retry from line {line_no + 1}")
+                    # Sent outside admit(): a slow reader must not hold a slot.
+                    yield scored
+                    line_no += len(group)
+                if done and isinstance(last, Exception):
+                    raise last
+        finally:
+            reader.cancel()
+
+    def _score_lines(self, lines, first_line_no, user=""):
+        """Score a group of NDJSON lines as one matrix; returns the NDJSON output."""
+        results = [None] * len(lines)
+        rows, positions, ids, audit = [], [], [], []
+        for i, line in enumerate(lines):
+            if not line.strip():
+                continue
+            record_id = None
+            try:
+                record = json.loads(line, parse_constant=_reject_constant)
+                if not isinstance(record, dict):
+                    raise HTTPError(400, "expected a JSON object")
+                record_id = record.get("id")
+                row = parse_features(record)
+                estimated = parse_estimated(record.get("estimated"))
+            except HTTPError as exc:
+                message = exc.message
+            except (ValueError, RecursionError):
+                message = "invalid JSON"
+            except Exception:
+                # Whatever else one record can trip over, it must not cost the group.
+                message = "invalid record"
+            else:
+                message = None
+            if message is not None:
+                results[i] = {"line": first_line_no + i + 1, "id": record_id, "error": message}
+                continue
+            rows.append(row)
+            audit.append(estimated)
+            positions.append(i)
+            ids.append(record_id)
+
+        if rows:
+            start = time.perf_counter()
+            # On the cache grid, as score() does for /predict (key_to_features(canonical_key(row))).
+            snapped = np.rint(np.array(rows, dtype=np.float64) * _GRID) / _GRID
+            with self.registry.acquire() as predictor:
+                labels, proba = predictor.predict(snapped)
+                version = predictor.version
+            latency = time.perf_counter() - start
+            for i, record_id, label, probability in zip(positions, ids, labels.tolist(), proba.tolist()):
+                results[i] = {"line": first_line_no + i + 1, "id": record_id, "prediction": label,
+                              "probability": probability, "model_version": version}
+            for row, estimated, label, probability in zip(rows, audit, labels.tolist(), proba.tolist()):
+                self.audit.record(make_entry(row, probability, label, version, latency,
+                                             estimated, user, "bulk"))
+        return "".join(_result_line(result) for result in results if result is not None).encode()
+
+    async def status(self, request):
+        return Response.json({"model": self.registry.status(), "loader": loader_stats(),
+                              "prediction_cache": self.cache.stats(),
+                              "microbatch": self.batcher.stats(),
+                              "client_scoring": self.client_checks,
+                              "admission": dict(self.admission.stats(), **self.shed_stats),
+                              "audit_log": self.audit.stats()})
+
+    def status_metrics(self):
+        """The numeric /status fields in Prometheus form, one metric per field.
+
+        Fields in COUNTERS are counters named <field>_total; the rest are
+        gauges. The micro-batch sizes are a histogram.
+        """
+        sections = {"loader": loader_stats(), "prediction_cache": self.cache.stats(),
+                    "microbatch": self.batcher.stats(), "client_scoring": self.client_checks,
+                    "admission": dict(self.admission.stats(), **self.shed_stats),
+                    "audit_log": self.audit.stats()}
+        collected = []
+        for section, stats in sections.items():
+            for key, value in sorted(stats.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    if key in COUNTERS[section]:
+                        name = key if key.endswith("_total") else key + "_total"
+                        collected.append((f"diabetes_{section}_{name}", "counter",
+                                          f"/status {section}.{key}", [({}, value)]))
+                    else:
+                        collected.append((f"diabetes_{section}_{key}", "gauge",
+                                          f"/status {section}.{key}", [({}, value)]))
+        collected.append(("diabetes_microbatch_batch_size", "histogram",
+                          "Predictions per flushed micro-batch.",
+                          [({}, self.batcher.batch_size_histogram())]))
+        collected.append(("diabetes_model_info", "gauge", "Active model version.",
+                          [({"version": self.registry.active_version or ""}, 1)]))
+        return collected
+
+    async def export_metrics(self, request):
+        return Response(metrics.render_prometheus([self.status_metrics]),
+                        content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    async def static(self, request):
+        path = os.path.normpath(os.path.join(STATIC_DIR, request.path[len("/static/"):]))
+        if not path.startswith(STATIC_DIR + os.sep) or not os.path.isfile(path):
+            raise HTTPError(404, "not found")
+        with open(path, "rb") as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        return Response(body, content_type=content_type,
+                        headers={"Cache-Control": "public, max-age=3600"})
+
+    async def dispatch(self, request):
+        handler = self.routes.get((request.method, request.path))
+        if handler is None and request.method == "GET" and request.path.startswith("/static/"):
+            handler = self.static
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                raise HTTPError(405, f"{request.method} not allowed on {request.path}")
+            raise HTTPError(404, f"no route for {request.path}")
+        return await handler(request)
+
+    # ---------------- connection handling ----------------
+    async def _read_request(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_SECONDS)
+        except asyncio.LimitOverrunError:
+            raise HTTPError(400, "request header too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        return Request(method, target, version, headers, reader, writer, self.body_timeout)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader, writer)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except HTTPError as exc:
+                    await Response.json({"error": exc.message}, exc.status).send(writer, False)
+                    break
+
+                start = time.perf_counter()
+                try:
+                    response = await self.dispatch(request)
+                except HTTPError as exc:
+                    response = Response.json({"error": exc.message}, exc.status)
+                    request.headers["connection"] = "close"
+                except Exception as exc:
+                    response = Response.json({"error": f"{type(exc).__name__}: {exc}"}, 500)
+                    request.headers["connection"] = "close"
+                # Streamed responses read the request body while they are sent,
+                # so anything left unread is only skipped afterwards.
+                completed = await response.send(writer, request.keep_alive)
+                metrics.observe("request", time.perf_counter() - start)
+                if completed is False or not request.keep_alive:
+                    break
+                try:
+                    await request.discard_body()
+                except (HTTPError, asyncio.IncompleteReadError):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host="127.0.0.1", port=8000, service=None, sock=None):
+    service = service or PredictionService()
+    if sock is not None:
+        server = await asyncio.start_server(service.handle_connection, sock=sock,
+                                            limit=MAX_HEADER_BYTES)
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port,
+                                            limit=MAX_HEADER_BYTES, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+
+def add_service_arguments(parser):
+    """Batching and admission options, shared with prefork.py."""
+    parser.add_argument("--batch-window-ms", type=float, default=DEFAULT_WINDOW_SECONDS * 1000,
+                        help="how long to collect predictions into one batch (0 = same loop tick)")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH,
+                        help="score immediately once this many predictions are waiting")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="predictions scored at once; more wait in the queue")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help="waiting predictions before new ones are turned away")
+    parser.add_argument("--latency-target-ms", type=float,
+                        default=DEFAULT_LATENCY_TARGET_SECONDS * 1000,
+                        help="shed requests that would wait longer than this")
+    parser.add_argument("--trust-user-header", action="store_true",
+                        help="log the X-User header as the username; only behind a proxy that "
+                             "authenticates users and sets it")
+    parser.add_argument("--body-timeout", type=float, default=BODY_TIMEOUT_SECONDS,
+                        help="seconds to wait for more of a request body before answering 408")
+
+
+def service_options(args):
+    """PredictionService keyword arguments for the options above."""
+    return {"batch_window": args.batch_window_ms / 1000, "max_batch": args.max_batch,
+            "admission": AdmissionController(args.max_concurrency, args.max_queue,
+                                             args.latency_target_ms / 1000),
+            "trust_user_header": args.trust_user_header, "body_timeout": args.body_timeout}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve diabetes risk predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_service_arguments(parser)
+    args = parser.parse_args(argv)
+
+    service = PredictionService(**service_options(args))
+    print(f"Serving model {service.registry.active_version} on http://{args.host}:{args.port}",
+          file=sys.stderr)
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# import_report.py
+"""Per-module import cost of the app's cold start, from `python -X importtime`.
+
+    python import_report.py                 # top 25 modules by cumulative time
+    python import_report.py --json out.json # also save the full table
+    python import_report.py --baseline out.json  # compare with a saved run
+
+The modules are imported in order in one fresh interpreter, so the numbers
+are what a newly started server process pays; a module's cumulative time
+does not include dependencies already pulled in by an earlier one. By
+default they are app.py's top-level imports, read from the file, followed
+by what warmup.py loads in the background.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+# What warmup's background thread imports after the script's own imports, in order.
+WARMUP_MODULES = ["numpy", "inference", "artifact", "registry", "knn_imputer", "sklearn.neighbors"]
+
+
+def app_imports(path=APP_FILE):
+    """Modules app.py imports at top level, in order (not those imported on a button press)."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names.append(node.module)
+    return names
+
+
+def default_modules(path=APP_FILE):
+    """What the app and its background loader import, in the order they do it."""
+    modules = app_imports(path)
+    return modules + [name for name in WARMUP_MODULES if name not in modules]
+
+
+def measure(modules, cwd=None):
+    """Return {module: (self_us, cumulative_us)} for one cold import of `modules`."""
+    code = "; ".join(f"import {name}" for name in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=cwd or os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def top_level(timings, modules):
+    return {name: timings[name][1] for name in modules if name in timings}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report per-module cold import cost.")
+    parser.add_argument("modules", nargs="*",
+                        help="modules to import in order (default: app.py's imports, then warmup's)")
+    parser.add_argument("--top", type=int, default=25, help="rows to print")
+    parser.add_argument("--json", help="write the full table to this file")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    args = parser.parse_args(argv)
+    args.modules = args.modules or default_modules()
+
+    timings = measure(args.modules)
+    rows = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, (self_us, cumulative_us) in rows[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+    totals = top_level(timings, args.modules)
+    print("\nRequested modules (cumulative ms): " +
+          ", ".join(f"{name}={us / 1000:.1f}" for name, us in totals.items()))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print("\nChange vs baseline:")
+        for name, us in totals.items():
+            if name in baseline.get("modules", {}):
+                before = baseline["modules"][name][1]
+                print(f"  {name:<12} {before / 1000:8.1f} -> {us / 1000:8.1f} ms ({(us - before) / 1000:+.1f})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "requested": args.modules,
+                       "modules": timings}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
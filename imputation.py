@@ -0,0 +1,329 @@
+# imputation.py
+import numpy as np
+
+from inference import FEATURES
+
+# In Dataset/diabetes.csv a 0 in these columns means "not measured"
+# (the EDA notebook replaces them with the column mean before training).
+ZERO_AS_MISSING = ["Glucose", "BloodPressure", "SkinThickness", "Insulin", "BMI"]
+_ZERO_AS_MISSING_IDX = [FEATURES.index(name) for name in ZERO_AS_MISSING]
+
+
+def missing_mask(X):
+    """Boolean (N, 8) mask of values to impute: NaN anywhere, 0 in ZERO_AS_MISSING."""
+    mask = np.isnan(X)
+    mask[:, _ZERO_AS_MISSING_IDX] |= X[:, _ZERO_AS_MISSING_IDX] == 0
+    return mask
+
+
+def impute_with_means(X, means):
+    """Fill missing values in place with the per-feature training means."""
+    mask = missing_mask(X)
+    if mask.any():
+        rows, cols = np.nonzero(mask)
+        X[rows, cols] = np.asarray(means, dtype=np.float64)[cols]
+    return X
+
+
+# ============================== Array-native estimators ==============================
+# Vectorized counterparts of estimators.estimate_* and calculate_bmi. They take
+# scalars or arrays (broadcast together) and return float64 arrays that are
+# bit-for-bit equal to the scalar functions' results, including Python's
+# round(): see check_parity() below.
+
+def round_half_even(x, ndigits):
+    """Elementwise round(x, ndigits) with Python's exact-decimal semantics.
+
+    np.round scales by 10**ndigits and rounds, which matches Python except
+    when the scaled value lands within rounding error of a .5 tie; those few
+    elements are rounded with the builtin instead.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim == 0:
+        return np.float64(round(float(x), ndigits))
+    out = np.round(x, ndigits)
+    scaled = x * 10.0 ** ndigits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        out[near_tie] = [round(value, ndigits) for value in x[near_tie].tolist()]
+    return out
+
+
+def calculate_bmi(weight_kg, height_cm):
+    weight_kg, height_cm = np.broadcast_arrays(np.asarray(weight_kg, dtype=np.float64),
+                                               np.asarray(height_cm, dtype=np.float64))
+    height_m = height_cm / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bmi = round_half_even(weight_kg / (height_m ** 2), 2)
+    return np.where(height_m > 0, bmi, 0.0)
+
+
+def estimate_bp(age, bmi, smoker=False, active=True, stress=False):
+    """(systolic, diastolic) arrays."""
+    age = np.asarray(age, dtype=np.float64)
+    bmi = np.asarray(bmi, dtype=np.float64)
+    systolic = 100 + (0.5 * age) + (0.3 * bmi)
+    diastolic = 60 + (0.2 * age) + (0.2 * bmi)
+    # Adding 0.0 where a flag is off leaves the value unchanged, so the
+    # additions happen in the same order as in the scalar version.
+    smoker, inactive, stress = np.asarray(smoker, bool), ~np.asarray(active, bool), np.asarray(stress, bool)
+    systolic = systolic + np.where(smoker, 5.0, 0.0)
+    diastolic = diastolic + np.where(smoker, 3.0, 0.0)
+    systolic = systolic + np.where(inactive, 5.0, 0.0)
+    diastolic = diastolic + np.where(inactive, 2.0, 0.0)
+    systolic = systolic + np.where(stress, 4.0, 0.0)
+    diastolic = diastolic + np.where(stress, 3.0, 0.0)
+    return round_half_even(systolic, 1), round_half_even(diastolic, 1)
+
+
+def estimate_skin_thickness(bmi, age):
+    # Like the scalar version, only BMI matters. NaN fails every comparison
+    # and lands in the last branch there too.
+    bmi = np.asarray(bmi, dtype=np.float64)
+    return np.select([bmi < 18.5, bmi < 25, bmi < 30], [10.0, 20.0, 25.0], 35.0)
+
+
+def estimate_insulin(glucose, bmi, pregnancies):
+    glucose = np.asarray(glucose, dtype=np.float64)
+    bmi = np.asarray(bmi, dtype=np.float64)
+    base = 50 + np.select([glucose > 140, glucose > 100], [40.0, 20.0], 0.0)
+    base = base + np.where(bmi > 30, 30.0, 0.0)
+    base = base + np.asarray(pregnancies, dtype=np.float64) * 2
+    return round_half_even(base, 1)
+
+
+def estimate_glucose(age, bmi, insulin, active=True):
+    glucose = 85 + (0.6 * np.asarray(age, dtype=np.float64)) + (0.4 * np.asarray(bmi, dtype=np.float64))
+    glucose = glucose + np.where(np.asarray(insulin, dtype=np.float64) > 150, 20.0, 0.0)
+    glucose = glucose + np.where(~np.asarray(active, bool), 15.0, 0.0)
+    return round_half_even(glucose, 1)
+
+
+# ============================== Imputation stage ==============================
+# One definition of "fill in what the user did not enter", used by batch
+# scoring and by the Streamlit app's prediction step.
+STRATEGIES = ("means", "estimators", "medians", "knn")
+
+_I = {name: FEATURES.index(name) for name in FEATURES}
+# Nothing to estimate these from; they fall back to the training means.
+_NOT_ESTIMABLE = [_I["Pregnancies"], _I["BMI"], _I["DiabetesPedigreeFunction"], _I["Age"]]
+
+
+def _fill_not_estimable(X, mask, means):
+    fill = np.zeros_like(mask)
+    fill[:, _NOT_ESTIMABLE] = mask[:, _NOT_ESTIMABLE]
+    rows, cols = np.nonzero(fill)
+    X[rows, cols] = np.asarray(means, dtype=np.float64)[cols]
+
+
+def impute_with_estimators(X, smoker=False, active=True, stress=False, active_glucose=True,
+                           means=None, mask=None, table=None, knn=None):
+    """Fill missing values in place with the app's estimators.
+
+    Follows the app's order: skin thickness and insulin from BMI, age and
+    pregnancies (insulin with the app's assumed glucose of 100, or with
+    `table`, a conditional_medians.ConditionalMedians, from its bin medians
+    as the app does), then glucose from the possibly estimated insulin, then
+    BP as the mean of the estimated systolic and diastolic. The lifestyle
+    flags are scalars or per-row arrays. Missing pregnancies, BMI, DPF or
+    age are filled from `means` first.
+
+    With `knn`, a knn_imputer.KNNImputer, rows that have a glucose reading
+    take skin thickness and insulin from their nearest neighbours instead,
+    as the app does when glucose is entered.
+
+    By default "missing" is missing_mask(X), where a 0 in a dataset column
+    means not measured. Callers that know which cells to fill pass `mask`
+    instead, so an entered 0 is kept (the app does this).
+    """
+    if mask is None:
+        mask = missing_mask(X)
+    if not mask.any():
+        return X
+    if means is not None:
+        _fill_not_estimable(X, mask, means)
+
+    n = X.shape[0]
+    flags = {name: np.broadcast_to(np.asarray(value, bool), (n,))
+             for name, value in [("smoker", smoker), ("active", active), ("stress", stress),
+                                 ("active_glucose", active_glucose)]}
+    age, bmi, pregnancies = X[:, _I["Age"]], X[:, _I["BMI"]], X[:, _I["Pregnancies"]]
+    glucose = X[:, _I["Glucose"]]
+    # Rows whose glucose was entered (the neighbour search needs it).
+    with_glucose = (~mask[:, _I["Glucose"]] & (glucose > 0)) if knn is not None else np.zeros(n, bool)
+
+    rows = np.nonzero(mask[:, _I["SkinThickness"]] & ~with_glucose)[0]
+    if len(rows):
+        X[rows, _I["SkinThickness"]] = (
+            estimate_skin_thickness(bmi[rows], age[rows]) if table is None
+            else table.lookup("SkinThickness", age[rows], bmi[rows], pregnancies[rows]))
+    rows = np.nonzero(mask[:, _I["Insulin"]] & ~with_glucose)[0]
+    if len(rows):
+        X[rows, _I["Insulin"]] = (
+            estimate_insulin(100, bmi[rows], pregnancies[rows]) if table is None
+            else table.lookup("Insulin", age[rows], bmi[rows], pregnancies[rows]))
+    for name in ("SkinThickness", "Insulin"):
+        rows = np.nonzero(mask[:, _I[name]] & with_glucose)[0]
+        if len(rows):
+            X[rows, _I[name]] = knn.lookup(name, glucose[rows], bmi[rows], age[rows], pregnancies[rows])
+    rows = np.nonzero(mask[:, _I["Glucose"]])[0]
+    if len(rows):
+        X[rows, _I["Glucose"]] = estimate_glucose(age[rows], bmi[rows], X[rows, _I["Insulin"]],
+                                                  flags["active_glucose"][rows])
+    rows = np.nonzero(mask[:, _I["BloodPressure"]])[0]
+    if len(rows):
+        systolic, diastolic = estimate_bp(age[rows], bmi[rows], flags["smoker"][rows],
+                                          flags["active"][rows], flags["stress"][rows])
+        X[rows, _I["BloodPressure"]] = (systolic + diastolic) / 2
+    return X
+
+
+def impute_with_medians(X, means=None, table=None):
+    """Fill missing values in place with conditional_medians bin medians.
+
+    Skin thickness, insulin, glucose and BP each come from their age x BMI x
+    pregnancies bin in the dataset; missing pregnancies, BMI, DPF or age are
+    filled from `means` first, since the bins need them.
+    """
+    mask = missing_mask(X)
+    if not mask.any():
+        return X
+    if means is not None:
+        _fill_not_estimable(X, mask, means)
+    if table is None:
+        from conditional_medians import get_conditional_medians
+        table = get_conditional_medians()
+
+    age, bmi, pregnancies = X[:, _I["Age"]], X[:, _I["BMI"]], X[:, _I["Pregnancies"]]
+    for name in ("SkinThickness", "Insulin", "Glucose", "BloodPressure"):
+        rows = np.nonzero(mask[:, _I[name]])[0]
+        if len(rows):
+            X[rows, _I[name]] = table.lookup(name, age[rows], bmi[rows], pregnancies[rows])
+    return X
+
+
+def impute_with_knn(X, means=None, imputer=None, table=None):
+    """Fill missing values in place, insulin and skin thickness from knn_imputer.
+
+    Glucose is needed for the neighbour search, so a missing glucose (and BP)
+    comes from the conditional medians first; missing pregnancies, BMI, DPF
+    or age are filled from `means` before either.
+    """
+    mask = missing_mask(X)
+    if not mask.any():
+        return X
+    if means is not None:
+        _fill_not_estimable(X, mask, means)
+    if table is None:
+        from conditional_medians import get_conditional_medians
+        table = get_conditional_medians()
+    if imputer is None:
+        from knn_imputer import get_knn_imputer
+        imputer = get_knn_imputer()
+
+    glucose, bmi, age, pregnancies = (X[:, _I[name]] for name in ("Glucose", "BMI", "Age", "Pregnancies"))
+    for name in ("Glucose", "BloodPressure"):
+        rows = np.nonzero(mask[:, _I[name]])[0]
+        if len(rows):
+            X[rows, _I[name]] = table.lookup(name, age[rows], bmi[rows], pregnancies[rows])
+    for name in ("Insulin", "SkinThickness"):
+        rows = np.nonzero(mask[:, _I[name]])[0]
+        if len(rows):
+            X[rows, _I[name]] = imputer.lookup(name, glucose[rows], bmi[rows], age[rows], pregnancies[rows])
+    return X
+
+
+def impute(X, strategy="means", means=None, **flags):
+    """Fill missing values of X in place with one of STRATEGIES."""
+    if strategy == "means":
+        if means is None:
+            raise ValueError("the 'means' strategy needs the training means")
+        return impute_with_means(X, means)
+    if strategy == "estimators":
+        return impute_with_estimators(X, means=means, **flags)
+    if strategy == "medians":
+        return impute_with_medians(X, means=means)
+    if strategy == "knn":
+        return impute_with_knn(X, means=means)
+    raise ValueError(f"unknown imputation strategy {strategy!r}; expected one of {', '.join(STRATEGIES)}")
+
+
+# ============================== Parity check ==============================
+
+def _same(a, b):
+    """Bitwise equality, so -0.0 != 0.0 and NaN == NaN."""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    return a.view(np.int64) == b.view(np.int64)
+
+
+def check_parity(n=200_000, seed=0):
+    """Compare every vectorized estimator with its scalar original; returns mismatch counts.
+
+    Inputs mix random values, every branch threshold and values on the
+    0.05 / 0.005 grids where round() has to break ties.
+    """
+    import estimators
+
+    rng = np.random.default_rng(seed)
+    thresholds = np.array([18.5, 25, 30, 100, 140, 150])
+    ties = np.round(rng.integers(0, 40000, n) * 0.005, 3)
+    def sample(low, high):
+        values = rng.uniform(low, high, n)
+        pick = rng.integers(0, 4, n)
+        values = np.where(pick == 1, rng.choice(thresholds, n), values)
+        values = np.where(pick == 2, ties % (high - low) + low, values)
+        return np.where(pick == 3, np.round(values), values)
+
+    age, bmi, glucose, insulin = sample(1, 120), sample(10, 80), sample(0, 300), sample(0, 400)
+    pregnancies = rng.integers(0, 21, n).astype(np.float64)
+    weight, height = sample(10, 200), sample(0, 250)
+    smoker, active, stress = (rng.integers(0, 2, n).astype(bool) for _ in range(3))
+
+    mismatches = {}
+    vector = calculate_bmi(weight, height)
+    scalar = [estimators.calculate_bmi(w, h) for w, h in zip(weight.tolist(), height.tolist())]
+    mismatches["calculate_bmi"] = int((~_same(vector, scalar)).sum())
+
+    systolic, diastolic = estimate_bp(age, bmi, smoker, active, stress)
+    scalar = [estimators.estimate_bp(*args) for args in zip(age.tolist(), bmi.tolist(), smoker.tolist(),
+                                                             active.tolist(), stress.tolist())]
+    mismatches["estimate_bp"] = int((~_same(systolic, [s for s, _ in scalar])).sum()
+                                    + (~_same(diastolic, [d for _, d in scalar])).sum())
+
+    vector = estimate_skin_thickness(bmi, age)
+    scalar = [estimators.estimate_skin_thickness(b, a) for b, a in zip(bmi.tolist(), age.tolist())]
+    mismatches["estimate_skin_thickness"] = int((~_same(vector, scalar)).sum())
+
+    vector = estimate_insulin(glucose, bmi, pregnancies)
+    scalar = [estimators.estimate_insulin(*args) for args in zip(glucose.tolist(), bmi.tolist(),
+                                                                  pregnancies.tolist())]
+    mismatches["estimate_insulin"] = int((~_same(vector, scalar)).sum())
+
+    vector = estimate_glucose(age, bmi, insulin, active)
+    scalar = [estimators.estimate_glucose(*args) for args in zip(age.tolist(), bmi.tolist(),
+                                                                  insulin.tolist(), active.tolist())]
+    mismatches["estimate_glucose"] = int((~_same(vector, scalar)).sum())
+
+    # Every pair on a 0.5 mmHg grid over 0-300 / 0-200, plus the neighbours
+    # of each branch boundary and NaN.
+    edges = np.array([60.0, 80, 90, 120, 130, 140, 180])
+    edges = np.concatenate([edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf), [np.nan]])
+    s_values = np.concatenate([np.arange(0, 300.5, 0.5), edges])
+    d_values = np.concatenate([np.arange(0, 200.5, 0.5), edges])
+    s, d = (a.ravel() for a in np.meshgrid(s_values, d_values))
+    codes = estimators.classify_bp(s, d)
+    labels = {label: int(category) for category, label in estimators.BP_LABELS.items()}
+    scalar = np.array([labels[estimators.interpret_bp(x, y)] for x, y in zip(s.tolist(), d.tolist())])
+    mismatches["classify_bp"] = int((codes != scalar).sum())
+    return mismatches
+
+
+if __name__ == "__main__":
+    # python imputation.py  -> vectorized vs scalar estimators, bit for bit
+    import sys
+
+    results = check_parity()
+    for name, count in results.items():
+        print(f"{name:<26} {'ok' if count == 0 else f'{count} mismatches'}")
+    sys.exit(1 if any(results.values()) else 0)
@@ -0,0 +1,175 @@
+# inference.py
+import threading
+import time
+import warnings
+
+import numpy as np
+
+import metrics
+from model_loader import MODEL_FILE, SCALER_FILE, files_digest, load_artifacts
+
+FEATURES = ["Pregnancies", "Glucose", "BloodPressure", "SkinThickness",
+            "Insulin", "BMI", "DiabetesPedigreeFunction", "Age"]
+
+# Form fields in templates/index.html, in model feature order.
+FORM_FIELDS = ["pregnancies", "glucose", "blood_pressure", "skin_thickness",
+               "insulin", "bmi", "dpf", "age"]
+
+
+class FusedPredictor:
+    """StandardScaler + binary LogisticRegression folded into one linear model.
+
+    scaler.transform followed by model.decision_function is
+        coef . ((x - mean) / scale) + intercept
+    which is the same as weights . x + bias with
+        weights = coef / scale
+        bias    = intercept - coef . (mean / scale)
+    so a prediction is one dot product and a sigmoid, with no sklearn calls.
+    """
+
+    def __init__(self, weights, bias, threshold=0.0, means=None, version=None):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        # Label is 1 when the logit is above this (sklearn uses 0, i.e. p > 0.5).
+        self.threshold = float(threshold)
+        # Training feature means, kept for imputing missing inputs.
+        self.means = None if means is None else np.asarray(means, dtype=np.float64)
+        # Short checksum of the artifact the parameters came from.
+        self.version = version
+
+    @classmethod
+    def from_sklearn(cls, model, scaler):
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        if coef.shape[0] != 1 or len(model.classes_) != 2:
+            raise ValueError("FusedPredictor only supports binary logistic regression")
+        coef = coef[0]
+        n_features = coef.shape[0]
+
+        mean = getattr(scaler, "mean_", None)
+        scale = getattr(scaler, "scale_", None)
+        mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        weights = coef / scale
+        bias = float(model.intercept_[0]) - float(np.dot(coef, mean / scale))
+        return cls(weights, bias, means=mean)
+
+    @property
+    def n_features(self):
+        return self.weights.shape[0]
+
+    def logit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return X @ self.weights + self.bias
+
+    def predict(self, X):
+        """Return (labels, probabilities) for an (N, 8) array of raw features."""
+        start = time.perf_counter()
+        z = self.logit(X)
+        # Numerically stable sigmoid: 1 / (1 + exp(-z)) without overflow warnings.
+        proba = np.exp(-np.logaddexp(0.0, -z))
+        labels = (z > self.threshold).astype(np.int8)
+        metrics.observe("predict", time.perf_counter() - start)
+        return labels, proba
+
+    def predict_one(self, row):
+        """Score a single feature row; returns (label, probability) as Python scalars."""
+        labels, proba = self.predict(np.asarray(row, dtype=np.float64).reshape(1, -1))
+        return int(labels[0]), float(proba[0])
+
+
+def _probe_rows(scaler, n_features):
+    """A handful of rows spread around the training distribution."""
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    rng = np.random.default_rng(0)
+    offsets = rng.uniform(-3.0, 3.0, size=(64, n_features))
+    return np.vstack([mean, mean + offsets * scale])
+
+
+def verify_against_sklearn(predictor, model, scaler, X=None, atol=1e-9):
+    """Check the fused predictor against sklearn; raises RuntimeError on mismatch."""
+    if X is None:
+        X = _probe_rows(scaler, predictor.n_features)
+    X = np.asarray(X, dtype=np.float64)
+
+    with warnings.catch_warnings():
+        # The scaler was fitted on a DataFrame and warns about bare arrays.
+        warnings.simplefilter("ignore", UserWarning)
+        scaled = scaler.transform(X)
+    expected_proba = model.predict_proba(scaled)[:, 1]
+    expected_labels = model.predict(scaled)
+    labels, proba = predictor.predict(X)
+
+    max_err = float(np.max(np.abs(proba - expected_proba)))
+    if max_err > atol:
+        raise RuntimeError(f"fused probabilities differ from sklearn by {max_err:.3g}")
+    if not np.array_equal(labels, expected_labels):
+        raise RuntimeError("fused labels differ from sklearn predictions")
+    return max_err
+
+
+# ============================== Process-wide predictor ==============================
+_lock = threading.Lock()
+_predictor = None
+
+
+def build_predictor():
+    """Load a FusedPredictor, preferring the numeric artifact over the pickles.
+
+    The artifact path (see artifact.py) needs only numpy. Without it, or when
+    the pickles in Model/ are not the ones the artifact was exported from
+    (retrained files dropped in without rerunning export_model.py), we
+    unpickle the sklearn objects and check the folded parameters against
+    sklearn before use. A stale artifact is never served; if sklearn is not
+    installed the load fails instead.
+    """
+    from artifact import artifact_available, artifact_matches_pickles, load_artifact
+
+    if artifact_available() and artifact_matches_pickles():
+        return load_artifact()
+    model, scaler = load_artifacts()
+    predictor = FusedPredictor.from_sklearn(model, scaler)
+    predictor.version = "pkl-" + files_digest(MODEL_FILE, SCALER_FILE)[:12]
+    verify_against_sklearn(predictor, model, scaler)
+    return predictor
+
+
+def get_predictor():
+    """The process-wide FusedPredictor, built on first use."""
+    global _predictor
+    if _predictor is None:
+        with _lock:
+            if _predictor is None:
+                _predictor = build_predictor()
+    return _predictor
+
+
+# ============================== Batch API ==============================
+def _as_feature_matrix(X):
+    """(N, 8) float64 array from an array-like or a DataFrame in dataset layout."""
+    if hasattr(X, "columns"):
+        missing = [name for name in FEATURES if name not in X.columns]
+        if missing:
+            raise ValueError(f"missing feature columns: {', '.join(missing)}")
+        # Select by name so extra columns (e.g. Outcome) and column order don't matter.
+        X = X[FEATURES].to_numpy(dtype=np.float64, copy=False)
+    else:
+        X = np.asarray(X, dtype=np.float64)
+    if X.ndim != 2 or X.shape[1] != len(FEATURES):
+        raise ValueError(f"expected an (N, {len(FEATURES)}) feature matrix, got shape {X.shape}")
+    return X
+
+
+def predict_batch(X, predictor=None):
+    """Score many patient rows at once; returns (labels, probabilities) arrays.
+
+    X is an (N, 8) array or a DataFrame with the columns of Dataset/diabetes.csv.
+    Uses the same process-wide artifacts as the Streamlit app unless a
+    predictor is passed in.
+    """
+    if predictor is None:
+        predictor = get_predictor()
+    return predictor.predict(_as_feature_matrix(X))
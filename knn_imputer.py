@@ -0,0 +1,226 @@
+# knn_imputer.py
+"""Nearest-neighbour estimates of insulin and skin thickness.
+
+    python knn_imputer.py            # rebuild Model/knn_imputer.pickle
+    python knn_imputer.py --check    # cross-validated error vs the other estimators
+
+Insulin and skin thickness are missing (zero) in about half and a third of
+Dataset/diabetes.csv, and the rule estimators never look at glucose. Here
+each of them is the median over the K nearest dataset rows in which it was
+measured, with distance over glucose, BMI, age and pregnancies, each
+divided by its standard deviation.
+
+The neighbours come from one sklearn KDTree per target, pickled together
+with the target values. get_knn_imputer() loads the pickle; it only builds
+(and saves) a new one when the file is missing or was made from a
+different dataset or scikit-learn version. The pickle is built locally
+and not committed.
+
+The app uses it for a user who entered their glucose (derived_inputs.py,
+and impute_with_estimators(knn=...) at prediction time); a single
+estimate() is a fraction of a millisecond. Without a glucose reading it
+has nothing more to go on than the bin medians, which the app uses then.
+Batch scoring uses it with --impute knn.
+"""
+import argparse
+import os
+import pickle
+import sys
+import threading
+
+import numpy as np
+
+from conditional_medians import DATASET_FILE, load_dataset
+from inference import FEATURES
+from model_loader import MODEL_DIR, files_digest
+
+# Not .pkl: the model registry reloads on any .pkl change in Model/.
+INDEX_FILE = os.path.join(MODEL_DIR, "knn_imputer.pickle")
+FORMAT_VERSION = 1
+
+TARGETS = ("Insulin", "SkinThickness")
+QUERY_FEATURES = ("Glucose", "BMI", "Age", "Pregnancies")
+DEFAULT_K = 20
+
+# What unpickling a missing, truncated or incompatible index can raise.
+LOAD_ERRORS = (OSError, EOFError, ValueError, KeyError, AttributeError, ImportError, TypeError,
+               pickle.UnpicklingError)
+
+_I = {name: FEATURES.index(name) for name in FEATURES}
+_QUERY_IDX = [_I[name] for name in QUERY_FEATURES]
+
+
+def _sklearn_version():
+    import sklearn
+    return sklearn.__version__
+
+
+class KNNImputer:
+    def __init__(self, trees, values, scale, k=DEFAULT_K, dataset_sha256=None, sklearn_version=None):
+        self.trees = trees                  # {target: KDTree over scaled QUERY_FEATURES}
+        self.values = values                # {target: measured values, in tree order}
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.k = k
+        self.dataset_sha256 = dataset_sha256
+        self.sklearn_version = sklearn_version
+
+    def estimate(self, name, glucose, bmi, age, pregnancies):
+        """Median of the k nearest measured values for one user; `name` is one of TARGETS."""
+        point = np.array([[glucose, bmi, age, pregnancies]], dtype=np.float64) / self.scale
+        idx = self.trees[name].query(point, k=self.k, return_distance=False)
+        return float(np.median(self.values[name][idx[0]]))
+
+    def lookup(self, name, glucose, bmi, age, pregnancies):
+        """Estimates for arrays of inputs (broadcast together), one tree query for all rows."""
+        points = np.column_stack(np.broadcast_arrays(*(np.asarray(x, dtype=np.float64)
+                                                       for x in (glucose, bmi, age, pregnancies))))
+        if not len(points):
+            return np.empty(0)
+        idx = self.trees[name].query(points / self.scale, k=self.k, return_distance=False)
+        return np.median(self.values[name][idx], axis=1)
+
+    # ---------------- building ----------------
+    @classmethod
+    def build(cls, X, dataset_sha256=None, k=DEFAULT_K):
+        """Trees over rows with glucose, BMI and the target measured (non-zero)."""
+        from sklearn.neighbors import KDTree
+
+        usable = (X[:, _I["Glucose"]] > 0) & (X[:, _I["BMI"]] > 0)
+        usable &= ~np.isnan(X[:, _QUERY_IDX]).any(axis=1)
+        scale = X[usable][:, _QUERY_IDX].std(axis=0)
+        trees, values = {}, {}
+        for name in TARGETS:
+            rows = usable & (X[:, _I[name]] > 0)
+            trees[name] = KDTree(X[rows][:, _QUERY_IDX] / scale)
+            values[name] = X[rows, _I[name]].copy()
+        return cls(trees, values, scale, k, dataset_sha256, _sklearn_version())
+
+    # ---------------- persistence ----------------
+    def save(self, path=INDEX_FILE):
+        state = {"format": FORMAT_VERSION, "trees": self.trees, "values": self.values,
+                 "scale": self.scale, "k": self.k, "dataset_sha256": self.dataset_sha256,
+                 "sklearn_version": self.sklearn_version}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{path} has format {state.get('format')}, expected {FORMAT_VERSION}")
+        return cls(state["trees"], state["values"], state["scale"], state["k"],
+                   state["dataset_sha256"], state["sklearn_version"])
+
+
+# ============================== Process-wide index ==============================
+_lock = threading.Lock()
+_imputer = None
+_unavailable = False
+
+
+def get_knn_imputer(path=INDEX_FILE, dataset_path=DATASET_FILE):
+    """The saved index if it is current; otherwise build it once and save it.
+
+    Only the dataset's bytes are hashed to check the saved index; the CSV is
+    parsed when a rebuild is needed. An index that cannot be unpickled is
+    rebuilt.
+    """
+    global _imputer
+    if _imputer is None:
+        with _lock:
+            if _imputer is None:
+                sha256 = files_digest(dataset_path)
+                try:
+                    saved = KNNImputer.load(path)
+                except LOAD_ERRORS:
+                    saved = None
+                if (saved is not None and saved.dataset_sha256 == sha256
+                        and saved.sklearn_version == _sklearn_version()):
+                    _imputer = saved
+                else:
+                    X, sha256 = load_dataset(dataset_path)
+                    imputer = KNNImputer.build(X, sha256)
+                    try:
+                        imputer.save(path)
+                    except OSError:
+                        pass  # read-only deploys still get the in-memory index
+                    _imputer = imputer
+    return _imputer
+
+
+def knn_imputer_if_available():
+    """get_knn_imputer(), or None when scikit-learn or the dataset is missing
+    or the index cannot be loaded or built.
+
+    For the app, which then stays on the conditional medians. A failure is
+    remembered, so it is not retried on every estimate.
+    """
+    global _unavailable
+    if _unavailable:
+        return None
+    try:
+        return get_knn_imputer()
+    except LOAD_ERRORS:
+        _unavailable = True
+        return None
+
+
+# ============================== Offline check ==============================
+
+def cross_validate(X, folds=5, seed=0, k=DEFAULT_K):
+    """Mean absolute error per target: {name: (knn, conditional medians, rule estimators, n)}.
+
+    Scored on rows where glucose, BMI and the target were measured, each
+    fold with estimators built without it.
+    """
+    import imputation
+    from conditional_medians import ConditionalMedians
+
+    glucose, bmi, age, pregnancies = (X[:, i] for i in _QUERY_IDX)
+    rules = {"Insulin": imputation.estimate_insulin(100, bmi, pregnancies),
+             "SkinThickness": imputation.estimate_skin_thickness(bmi, age)}
+    fold = np.random.default_rng(seed).permutation(len(X)) % folds
+    errors = {name: ([], [], []) for name in TARGETS}
+    for f in range(folds):
+        knn = KNNImputer.build(X[fold != f], k=k)
+        medians = ConditionalMedians.build(X[fold != f])
+        for name in TARGETS:
+            rows = (fold == f) & (glucose > 0) & (bmi > 0) & (X[:, _I[name]] > 0)
+            actual = X[rows, _I[name]]
+            args = (glucose[rows], bmi[rows], age[rows], pregnancies[rows])
+            errors[name][0].append(np.abs(knn.lookup(name, *args) - actual))
+            errors[name][1].append(np.abs(medians.lookup(name, bmi=bmi[rows], age=age[rows],
+                                                         pregnancies=pregnancies[rows]) - actual))
+            errors[name][2].append(np.abs(rules[name][rows] - actual))
+    return {name: tuple(float(np.concatenate(e).mean()) for e in errs) + (len(np.concatenate(errs[0])),)
+            for name, errs in errors.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the nearest-neighbour insulin/skin thickness index.")
+    parser.add_argument("--dataset", default=DATASET_FILE)
+    parser.add_argument("--output", default=INDEX_FILE)
+    parser.add_argument("-k", type=int, default=DEFAULT_K, help=f"neighbours per estimate (default {DEFAULT_K})")
+    parser.add_argument("--check", action="store_true",
+                        help="only report cross-validated error against the other estimators")
+    args = parser.parse_args(argv)
+
+    X, sha256 = load_dataset(args.dataset)
+    if args.check:
+        print(f"{'target':<14} {'n':>5} {'MAE knn':>8} {'MAE medians':>12} {'MAE rules':>10}")
+        for name, (knn_mae, medians_mae, rules_mae, n) in cross_validate(X, k=args.k).items():
+            print(f"{name:<14} {n:>5} {knn_mae:>8.2f} {medians_mae:>12.2f} {rules_mae:>10.2f}")
+        return 0
+
+    imputer = KNNImputer.build(X, sha256, args.k)
+    imputer.save(args.output)
+    sizes = ", ".join(f"{name} {len(imputer.values[name])}" for name in TARGETS)
+    print(f"Saved {args.output} (k={imputer.k}; measured rows: {sizes})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# metrics.py
+"""Per-stage latency histograms, exported in Prometheus text format.
+
+    with metrics.timed("estimate"):
+        ...
+
+Every stage gets a fixed-bucket histogram (10 us to 10 s, three buckets per
+decade); observing a value is a bisect and three increments under a lock,
+about a microsecond. The process-wide histograms are served as
+diabetes_stage_seconds{stage="..."} from http_service's /metrics and shown
+in the Streamlit admin panel; the HTTP service appends its own counters
+(cache, admission, audit log, ...) through render_prometheus(collectors).
+
+Stages recorded:
+    artifact_load   registry reload (model files -> validated predictor)
+    estimate        derived_inputs recomputations, and imputation at prediction time
+    predict         FusedPredictor.predict (scaling is folded into the weights)
+    render          Jinja template / Streamlit result rendering
+    request         one HTTP request, read to response
+    rerun           one Streamlit script run
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Bucket upper bounds in seconds: 10 us, 25 us, 50 us, 100 us, ... 5 s, 10 s.
+BUCKETS = tuple(m * 10.0 ** e for e in range(-5, 1) for m in (1.0, 2.5, 5.0)) + (10.0,)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)    # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q):
+        """Estimate by linear interpolation inside the bucket holding the q-th value."""
+        counts, _, count = self.snapshot()
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                low = self.buckets[i - 1] if i > 0 else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return low + (high - low) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+# ============================== Process-wide registry ==============================
+_lock = threading.Lock()
+_stages = {}
+
+
+def stage(name):
+    """The histogram for a stage, created on first use."""
+    histogram = _stages.get(name)
+    if histogram is None:
+        with _lock:
+            histogram = _stages.setdefault(name, Histogram())
+    return histogram
+
+
+def observe(name, seconds):
+    stage(name).observe(seconds)
+
+
+@contextmanager
+def timed(name):
+    histogram = stage(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start)
+
+
+def stage_summary():
+    """One dict per stage with count and mean/p50/p95/p99 in milliseconds."""
+    with _lock:
+        stages = sorted(_stages.items())
+    rows = []
+    for name, histogram in stages:
+        _, total, count = histogram.snapshot()
+        rows.append({"stage": name, "count": count,
+                     "mean_ms": total / count * 1000 if count else 0.0,
+                     "p50_ms": histogram.quantile(0.50) * 1000,
+                     "p95_ms": histogram.quantile(0.95) * 1000,
+                     "p99_ms": histogram.quantile(0.99) * 1000,
+                     "total_s": total})
+    return rows
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _histogram_lines(metric, labels, buckets, counts, total, count):
+    """Cumulative _bucket samples, then _sum and _count; `counts` are per bucket."""
+    lines = []
+    cumulative = 0
+    for bound, n in zip(buckets, counts):
+        cumulative += n
+        lines.append(f"{metric}_bucket{_format_labels(dict(labels, le=f'{bound:g}'))} {cumulative}")
+    lines.append(f"{metric}_bucket{_format_labels(dict(labels, le='+Inf'))} {count}")
+    lines.append(f"{metric}_sum{_format_labels(labels)} {total!r}")
+    lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+    return lines
+
+
+def render_prometheus(collectors=()):
+    """All stages, plus each collector's metrics, in the Prometheus text format.
+
+    A collector returns [(metric name, type, help, [(labels dict, value), ...]), ...].
+    For a "histogram" the value is (bucket bounds, count per bucket, sum, count).
+    """
+    lines = ["# HELP diabetes_stage_seconds Time spent in each request stage.",
+             "# TYPE diabetes_stage_seconds histogram"]
+    with _lock:
+        stages = sorted(_stages.items())
+    for name, histogram in stages:
+        counts, total, count = histogram.snapshot()
+        lines += _histogram_lines("diabetes_stage_seconds", {"stage": name}, histogram.buckets, counts,
+                                  total, count)
+
+    for collector in collectors:
+        for metric, kind, help_text, samples in collector():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for labels, value in samples:
+                if kind == "histogram":
+                    lines += _histogram_lines(metric, labels, *value)
+                else:
+                    lines.append(f"{metric}{_format_labels(labels)} {float(value)!r}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Drop all recorded stages."""
+    with _lock:
+        _stages.clear()
@@ -0,0 +1,103 @@
+# microbatch.py
+"""Coalesce concurrent single-row predictions into one matrix scoring call.
+
+Requests that arrive within `window_seconds` of the first pending one (or
+until `max_batch` rows are waiting) are stacked into an (N, 8) array, scored
+with one FusedPredictor.predict call, and the results are handed back to each
+waiting coroutine. Runs on the asyncio event loop; no extra threads.
+"""
+import asyncio
+import time
+
+import numpy as np
+
+DEFAULT_WINDOW_SECONDS = 0.002
+DEFAULT_MAX_BATCH = 64
+
+
+class MicroBatcher:
+    def __init__(self, registry, window_seconds=DEFAULT_WINDOW_SECONDS, max_batch=DEFAULT_MAX_BATCH):
+        self.registry = registry
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        # Batch-size histogram buckets: 1, 2, 4, ... up to max_batch.
+        self._size_buckets = [1 << i for i in range(max(1, max_batch).bit_length())]
+        if self._size_buckets[-1] < max_batch:
+            self._size_buckets.append(max_batch)
+        self._stats = {"requests": 0, "batches": 0, "max_queue_depth": 0,
+                       "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+                       "batch_sizes": [0] * len(self._size_buckets)}
+
+    async def submit(self, row):
+        """Score one feature row; returns (label, probability, model_version)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future, time.perf_counter()))
+        self._stats["requests"] += 1
+        depth = len(self._pending)
+        if depth > self._stats["max_queue_depth"]:
+            self._stats["max_queue_depth"] = depth
+
+        if depth >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            if self.window_seconds > 0:
+                self._timer = loop.call_later(self.window_seconds, self._flush)
+            else:
+                # Still batches everything that arrived in the same loop iteration.
+                self._timer = loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        waits = [now - enqueued for _, _, enqueued in batch]
+        self._stats["batches"] += 1
+        self._stats["wait_seconds_total"] += sum(waits)
+        self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], max(waits))
+        for i, bound in enumerate(self._size_buckets):
+            if len(batch) <= bound:
+                self._stats["batch_sizes"][i] += 1
+                break
+
+        try:
+            X = np.array([row for row, _, _ in batch], dtype=np.float64)
+            with self.registry.acquire() as predictor:
+                labels, proba = predictor.predict(X)
+                version = predictor.version
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future, _), label, probability in zip(batch, labels.tolist(), proba.tolist()):
+            # The caller may have gone away (cancelled) while it waited.
+            if not future.done():
+                future.set_result((label, probability, version))
+
+    @property
+    def queue_depth(self):
+        return len(self._pending)
+
+    def batch_size_histogram(self):
+        """(bucket bounds, batches per bucket, requests flushed, batches), as metrics.py renders."""
+        requests = self._stats["requests"] - len(self._pending)
+        return list(self._size_buckets), list(self._stats["batch_sizes"]), requests, self._stats["batches"]
+
+    def stats(self):
+        stats = dict(self._stats, queue_depth=len(self._pending),
+                     window_seconds=self.window_seconds, max_batch=self.max_batch)
+        stats["batch_sizes"] = {f"le_{bound}": count for bound, count
+                                in zip(self._size_buckets, self._stats["batch_sizes"])}
+        requests = self._stats["requests"] - len(self._pending)
+        stats["wait_seconds_mean"] = self._stats["wait_seconds_total"] / requests if requests else 0.0
+        stats["mean_batch_size"] = requests / self._stats["batches"] if self._stats["batches"] else 0.0
+        return stats
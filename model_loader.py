@@ -0,0 +1,79 @@
+# model_loader.py
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "Model")
+MODEL_FILE = os.path.join(MODEL_DIR, "ModelForPrediction.pkl")
+SCALER_FILE = os.path.join(MODEL_DIR, "Standard_Scaler.pkl")
+
+# Python keeps imported modules in sys.modules for the life of the process,
+# so everything below is shared by every Streamlit session and every rerun.
+_lock = threading.Lock()
+_cache = {}
+_stats = {"loads": 0, "hits": 0, "misses": 0, "load_seconds": 0.0, "last_load_seconds": 0.0}
+
+
+def _unpickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def files_digest(*paths):
+    """sha256 over the contents of the given files, in order."""
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def load_artifacts(model_path=MODEL_FILE, scaler_path=SCALER_FILE):
+    """Return (model, scaler), unpickling them at most once per process.
+
+    The returned objects are shared between sessions and must be treated as
+    read-only. Raises FileNotFoundError if either file is missing.
+    """
+    # Keyed on mtime/size too, so files replaced on disk are picked up.
+    key = tuple((os.path.abspath(p), os.stat(p).st_mtime_ns, os.stat(p).st_size)
+                for p in (model_path, scaler_path))
+    artifacts = _cache.get(key)
+    if artifacts is not None:
+        _stats["hits"] += 1
+        return artifacts
+
+    with _lock:
+        # Another thread may have finished loading while we waited.
+        artifacts = _cache.get(key)
+        if artifacts is not None:
+            _stats["hits"] += 1
+            return artifacts
+
+        _stats["misses"] += 1
+        start = time.perf_counter()
+        model = _unpickle(model_path)
+        scaler = _unpickle(scaler_path)
+        elapsed = time.perf_counter() - start
+
+        artifacts = (model, scaler)
+        # Drop superseded versions of the same files.
+        for stale in [k for k in _cache if [e[0] for e in k] == [e[0] for e in key]]:
+            del _cache[stale]
+        _cache[key] = artifacts
+        _stats["loads"] += 1
+        _stats["load_seconds"] += elapsed
+        _stats["last_load_seconds"] = elapsed
+        return artifacts
+
+
+def loader_stats():
+    """Snapshot of the loader counters (loads, cache hits/misses, load time)."""
+    return dict(_stats)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
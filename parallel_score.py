@@ -0,0 +1,168 @@
+# parallel_score.py
+"""Multi-process batch scoring.
+
+The model parameters are published once in a shared-memory block; every
+worker attaches to it by name instead of unpickling Model/*.pkl itself.
+Work is split into contiguous blocks and results are written back in input
+order, so the output is identical to the single-process scorer.
+"""
+import io
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from inference import FEATURES, FusedPredictor, get_predictor
+
+# ============================== Shared memory helpers ==============================
+
+def _attach(name):
+    """Attach to a block created by the driver process."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: pool workers share the driver's resource tracker, so
+        # the extra registration is harmless and the driver still unlinks.
+        return shared_memory.SharedMemory(name=name)
+
+
+def _pack_params(predictor):
+    """Copy weights, bias, threshold and means into a new shared-memory block."""
+    n = predictor.n_features
+    means = predictor.means if predictor.means is not None else np.full(n, np.nan)
+    params = np.concatenate([predictor.weights, [predictor.bias, predictor.threshold], means])
+    shm = shared_memory.SharedMemory(create=True, size=params.nbytes)
+    np.ndarray(params.shape, dtype=np.float64, buffer=shm.buf)[:] = params
+    return shm, n
+
+
+def _unpack_params(buf, n):
+    params = np.ndarray((2 * n + 2,), dtype=np.float64, buffer=buf)
+    means = params[n + 2:]
+    return FusedPredictor(params[:n], params[n], params[n + 1],
+                          means=None if np.isnan(means).all() else means)
+
+
+# ============================== Worker side ==============================
+_worker = {}
+
+
+def _init_worker(params_name, n_features):
+    shm = _attach(params_name)
+    _worker["params_shm"] = shm
+    _worker["predictor"] = _unpack_params(shm.buf, n_features)
+    _worker["blocks"] = {}
+
+
+def _block(name):
+    shm = _worker["blocks"].get(name)
+    if shm is None:
+        shm = _worker["blocks"][name] = _attach(name)
+    return shm
+
+
+def _score_rows(x_name, labels_name, proba_name, n_rows, start, stop):
+    """Score rows [start, stop) of a shared input matrix into shared outputs."""
+    n = len(FEATURES)
+    X = np.ndarray((n_rows, n), dtype=np.float64, buffer=_block(x_name).buf)
+    labels = np.ndarray((n_rows,), dtype=np.int8, buffer=_block(labels_name).buf)
+    proba = np.ndarray((n_rows,), dtype=np.float64, buffer=_block(proba_name).buf)
+    labels[start:stop], proba[start:stop] = _worker["predictor"].predict(X[start:stop])
+    return stop - start
+
+
+def _score_csv_block(header, text, write_header, imputation="means"):
+    """Parse, impute and score a block of CSV lines; returns the output CSV text."""
+    from batch_score import score_chunk
+
+    dtypes = {name: np.float64 for name in FEATURES}
+    chunk = pd.read_csv(io.StringIO(header + text), dtype=dtypes)
+    scored = score_chunk(chunk, _worker["predictor"], imputation)
+    return scored.to_csv(index=False, header=write_header), len(scored)
+
+
+# ============================== Driver side ==============================
+
+def _default_workers():
+    return os.cpu_count() or 1
+
+
+def predict_batch_parallel(X, workers=None, block_rows=250_000, predictor=None):
+    """Parallel version of inference.predict_batch for large in-memory arrays.
+
+    The input and both outputs live in shared memory, so workers read and write
+    their slice in place and nothing but (start, stop) crosses process bounds.
+    """
+    if predictor is None:
+        predictor = get_predictor()
+    X = np.asarray(X, dtype=np.float64)
+    n_rows = X.shape[0]
+    workers = workers or _default_workers()
+
+    params_shm, n = _pack_params(predictor)
+    blocks = [shared_memory.SharedMemory(create=True, size=max(size, 1))
+              for size in (X.nbytes, n_rows, n_rows * 8)]
+    x_shm, labels_shm, proba_shm = blocks
+    try:
+        np.ndarray(X.shape, dtype=np.float64, buffer=x_shm.buf)[:] = X
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(params_shm.name, n)) as pool:
+            futures = [pool.submit(_score_rows, x_shm.name, labels_shm.name, proba_shm.name,
+                                   n_rows, start, min(start + block_rows, n_rows))
+                       for start in range(0, n_rows, block_rows)]
+            for future in futures:
+                future.result()
+        labels = np.ndarray((n_rows,), dtype=np.int8, buffer=labels_shm.buf).copy()
+        proba = np.ndarray((n_rows,), dtype=np.float64, buffer=proba_shm.buf).copy()
+        return labels, proba
+    finally:
+        for shm in [params_shm] + blocks:
+            shm.close()
+            shm.unlink()
+
+
+def score_csv_parallel(input_path, output_path, workers=None, chunksize=100_000, predictor=None,
+                       imputation="means"):
+    """Parallel version of batch_score.score_csv with the same output.
+
+    The driver only slices the input into blocks of lines and writes results
+    back in order; parsing, imputation, scoring and formatting happen in the
+    workers. At most two blocks per worker are in flight, which keeps memory
+    bounded for inputs larger than RAM. Fields must not contain embedded
+    newlines, which holds for the numeric diabetes layout.
+    """
+    if predictor is None:
+        predictor = get_predictor()
+    workers = workers or _default_workers()
+
+    params_shm, n = _pack_params(predictor)
+    rows = 0
+    try:
+        with open(input_path, newline="") as src, open(output_path, "w", newline="") as out, \
+                ProcessPoolExecutor(workers, initializer=_init_worker,
+                                    initargs=(params_shm.name, n)) as pool:
+            header = src.readline()
+            missing = [name for name in FEATURES if name not in header.strip().split(",")]
+            if missing:
+                raise ValueError(f"{input_path}: missing columns {', '.join(missing)}")
+
+            pending = deque()
+            for i in itertools.count():
+                lines = list(itertools.islice(src, chunksize))
+                if lines:
+                    pending.append(pool.submit(_score_csv_block, header, "".join(lines), i == 0,
+                                               imputation))
+                while pending and (len(pending) >= 2 * workers or not lines):
+                    text, count = pending.popleft().result()
+                    out.write(text)
+                    rows += count
+                if not lines:
+                    break
+    finally:
+        params_shm.close()
+        params_shm.unlink()
+    return rows
@@ -0,0 +1,160 @@
+# prediction_cache.py
+"""LRU + TTL memo cache in front of the scoring call.
+
+Keys are the feature vector snapped to a per-feature grid, so the many users
+who submit the same defaults (or the same estimated values) share one entry;
+entries belong to one model version and are dropped when a new version
+arrives. Requests still in flight on a replaced version during a hot reload
+neither read nor fill the cache, so they cannot wipe the new version's
+entries; a version that has been replaced is not cached again in this process.
+The prediction is computed on the snapped vector, which keeps results
+independent of which user filled the entry first.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from inference import FEATURES
+
+# Grid points per unit of each feature (10 = 0.1 steps). At least as fine as
+# Dataset/diabetes.csv records each feature (DPF has three decimals) and as
+# the app's estimates, so those rows are scored exactly, not snapped.
+RESOLUTION = {
+    "Pregnancies": 1,
+    "Glucose": 10,
+    "BloodPressure": 20,
+    "SkinThickness": 100,
+    "Insulin": 10,
+    "BMI": 100,
+    "DiabetesPedigreeFunction": 1000,
+    "Age": 1,
+}
+_RESOLUTION = [RESOLUTION[name] for name in FEATURES]
+
+DEFAULT_CAPACITY = int(os.environ.get("PREDICTION_CACHE_SIZE", 10_000))
+DEFAULT_TTL_SECONDS = float(os.environ.get("PREDICTION_CACHE_TTL", 3600))
+
+
+def canonical_key(features):
+    """Feature vector as a tuple of integer grid indices (hashable, -0.0 safe).
+
+    Raises ValueError for NaN, and for values too large to put on the grid.
+    """
+    if len(features) != len(_RESOLUTION):
+        raise ValueError(f"expected {len(_RESOLUTION)} features, got {len(features)}")
+    try:
+        return tuple(int(round(float(x) * res)) for x, res in zip(features, _RESOLUTION))
+    except OverflowError:
+        raise ValueError(f"feature values out of range: {list(features)!r}") from None
+
+
+def key_to_features(key):
+    # Division gives the double nearest the decimal grid value (2400 / 100 == 24.0).
+    return [index / res for index, res in zip(key, _RESOLUTION)]
+
+
+def max_probability_error(weights):
+    """Bound on |p(row) - p(snapped row)| for a linear model with these weights.
+
+    Snapping moves each feature by at most half a grid step, and the sigmoid's
+    slope never exceeds 1/4.
+    """
+    return 0.25 * sum(abs(float(w)) * 0.5 / res for w, res in zip(weights, _RESOLUTION))
+
+
+class PredictionCache:
+    def __init__(self, capacity=DEFAULT_CAPACITY, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+        self._retired = set()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0,
+                       "stale_version": 0}
+
+    def _check_version(self, version):
+        """Whether `version` may use the cache; called with the lock held.
+
+        A version not seen before is the new model and makes every entry
+        stale. One that was replaced earlier belongs to a request still in
+        flight on the old model.
+        """
+        if version == self._version:
+            return True
+        if version in self._retired:
+            self._stats["stale_version"] += 1
+            return False
+        if self._entries:
+            self._stats["invalidations"] += 1
+            self._entries.clear()
+        if self._version is not None:
+            self._retired.add(self._version)
+        self._version = version
+        return True
+
+    def get(self, key, version):
+        with self._lock:
+            if not self._check_version(version):
+                self._stats["misses"] += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            value, expires = entry
+            if expires <= self._clock():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, key, version, value):
+        with self._lock:
+            if not self._check_version(version):
+                return
+            self._entries[key] = (value, self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def predict(self, predictor, features):
+        """Cached predictor.predict_one on the canonicalized features."""
+        key = canonical_key(features)
+        value = self.get(key, predictor.version)
+        if value is None:
+            value = predictor.predict_one(key_to_features(key))
+            self.put(key, predictor.version, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries), capacity=self.capacity,
+                         ttl_seconds=self.ttl_seconds, version=self._version)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# ============================== Process-wide cache ==============================
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache()
+    return _cache
@@ -0,0 +1,198 @@
+# prefork.py
+"""Pre-fork launcher for http_service: load once, fork N workers.
+
+    python prefork.py --workers 4 --port 8000
+
+The master process imports numpy, jinja2 and the service modules, loads the
+model and compiles the templates, then calls gc.freeze() and forks; each
+worker serves the same listening socket. What the workers share
+copy-on-write is almost all interpreter state: the imported modules'
+code, classes and numpy's extension data. The model itself is a few hundred
+bytes of weights. Automatic garbage collection is off in the master while
+it loads, so nothing is collected (and its pages written) between loading
+and forking; gc.freeze() then keeps the workers' collector from touching
+the inherited objects and un-sharing their pages.
+
+The master restarts workers that die and prints each process's resident
+memory (RSS, PSS, shared and private pages from /proc/<pid>/smaps_rollup) so
+the sharing can be checked: with N workers the PSS of each is close to its
+private size plus 1/(N+1) of the shared pages.
+"""
+import argparse
+import asyncio
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from audit_log import close_audit_log
+from http_service import PredictionService, add_service_arguments, serve, service_options
+from registry import ModelRegistry
+
+TEMPLATES = ("index.html", "result.html", "busy.html")
+
+
+# ============================== Memory report ==============================
+
+def memory_usage(pid):
+    """RSS/PSS/shared/private bytes for pid, or None where smaps_rollup is unavailable."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        return None
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def report_memory(processes, out=sys.stderr):
+    """Print one line per (role, pid) plus the PSS total."""
+    mib = 1024 * 1024
+    print(f"{'process':<12}{'pid':>8}{'rss MiB':>10}{'pss MiB':>10}{'shared MiB':>12}{'private MiB':>13}",
+          file=out)
+    total_pss = 0
+    for role, pid in processes:
+        usage = memory_usage(pid)
+        if usage is None:
+            print(f"{role:<12}{pid:>8}  (memory usage unavailable)", file=out)
+            continue
+        total_pss += usage["pss"]
+        print(f"{role:<12}{pid:>8}{usage['rss'] / mib:>10.1f}{usage['pss'] / mib:>10.1f}"
+              f"{usage['shared'] / mib:>12.1f}{usage['private'] / mib:>13.1f}", file=out)
+    print(f"{'total pss':<20}{total_pss / mib:>10.1f}", file=out)
+    out.flush()
+
+
+# ============================== Master ==============================
+
+def preload(options):
+    """Everything the workers should inherit instead of loading themselves."""
+    # The registry is loaded but not started: its watcher thread would not
+    # survive fork(), so each worker starts its own.
+    registry = ModelRegistry()
+    registry.reload()
+    service = PredictionService(registry=registry, **options)
+    for name in TEMPLATES:
+        service.templates.get_template(name)
+    return service
+
+
+def run_worker(sock, service):
+    """Child process body; never returns."""
+    code = 0
+    try:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)    # the master handles Ctrl+C
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        gc.enable()
+        service.registry.start()
+        asyncio.run(serve(service=service, sock=sock))
+    except SystemExit as exc:
+        code = exc.code or 0
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+        code = 1
+    finally:
+        # Skip the master's atexit handlers and buffered-file flushes.
+        close_audit_log()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def spawn(sock, service):
+    pid = os.fork()
+    if pid == 0:
+        run_worker(sock, service)
+    return pid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve predictions from N pre-forked workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    add_service_arguments(parser)
+    parser.add_argument("--report-after", type=float, default=2.0,
+                        help="seconds after startup to print per-process memory")
+    parser.add_argument("--report-interval", type=float, default=0.0,
+                        help="print memory again every N seconds (0 = only once)")
+    parser.add_argument("--no-freeze", action="store_true",
+                        help="skip gc.freeze(), for comparing memory sharing")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        print("prefork.py needs os.fork(); use http_service.py on this platform", file=sys.stderr)
+        return 2
+
+    gc.disable()
+    start = time.perf_counter()
+    service = preload(service_options(args))
+    sock = socket.create_server((args.host, args.port), backlog=1024)
+    sock.setblocking(False)
+    print(f"Loaded model {service.registry.active_version} in {time.perf_counter() - start:.2f}s; "
+          f"forking {args.workers} workers on http://{args.host}:{args.port}", file=sys.stderr)
+
+    if not args.no_freeze:
+        gc.freeze()
+    workers = {}
+    for _ in range(args.workers):
+        pid = spawn(sock, service)
+        workers[pid] = time.monotonic()
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    next_report = time.monotonic() + args.report_after
+    while not stopping:
+        time.sleep(0.2)
+        while workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = workers.pop(pid, None)
+            if started is None or stopping:
+                continue
+            print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting",
+                  file=sys.stderr)
+            if time.monotonic() - started < 1.0:
+                time.sleep(1.0)    # don't spin on a worker that dies at startup
+            workers[spawn(sock, service)] = time.monotonic()
+        if next_report is not None and time.monotonic() >= next_report:
+            report_memory([("master", os.getpid())] + [("worker", pid) for pid in workers])
+            next_report = time.monotonic() + args.report_interval if args.report_interval > 0 else None
+
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+# registry.py
+"""Hot-reloadable model registry.
+
+A background thread polls Model/ for changed artifact files. A new version is
+loaded and validated on that thread, then swapped in atomically for every
+session. Callers hold a version for the duration of a prediction through
+acquire(); a replaced version is kept until its in-flight count drains to zero.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+import metrics
+from inference import FEATURES, build_predictor
+from model_loader import MODEL_DIR
+
+WATCHED_SUFFIXES = (".pkl", ".npy", ".json")
+DEFAULT_POLL_SECONDS = 2.0
+
+
+class ModelVersion:
+    def __init__(self, predictor, fingerprint):
+        self.predictor = predictor
+        self.version = predictor.version
+        self.fingerprint = fingerprint
+        self.loaded_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.inflight = 0
+
+
+def _validate(predictor):
+    """Cheap sanity checks before a new version may serve traffic."""
+    if predictor.n_features != len(FEATURES):
+        raise ValueError(f"model expects {predictor.n_features} features, app sends {len(FEATURES)}")
+    if not (np.all(np.isfinite(predictor.weights)) and np.isfinite(predictor.bias)):
+        raise ValueError("model parameters contain NaN or inf")
+    probe = np.vstack([np.zeros(len(FEATURES)), predictor.means if predictor.means is not None
+                       else np.ones(len(FEATURES))])
+    _, proba = predictor.predict(probe)
+    if not np.all((proba >= 0) & (proba <= 1)):
+        raise ValueError("model produced probabilities outside [0, 1]")
+
+
+class ModelRegistry:
+    def __init__(self, model_dir=MODEL_DIR, poll_seconds=DEFAULT_POLL_SECONDS, loader=build_predictor):
+        self.model_dir = model_dir
+        self.poll_seconds = poll_seconds
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._current = None
+        self._retiring = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._failed_fingerprint = None
+        self._stats = {"reloads": 0, "failures": 0, "last_reload_seconds": None,
+                       "last_error": None, "last_check": None}
+
+    # ---------------- watching ----------------
+    def _fingerprint(self):
+        entries = []
+        for name in sorted(os.listdir(self.model_dir)):
+            if name.endswith(WATCHED_SUFFIXES):
+                st = os.stat(os.path.join(self.model_dir, name))
+                entries.append((name, st.st_mtime_ns, st.st_size))
+        return tuple(entries)
+
+    def start(self):
+        """Load the current version (if not loaded yet) and start the watcher thread."""
+        if self._current is None:
+            self.reload()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.reload_if_changed()
+            except Exception:
+                # reload() already recorded the failure; keep serving the old version.
+                pass
+
+    def reload_if_changed(self):
+        self._stats["last_check"] = time.time()
+        current = self._current
+        fingerprint = self._fingerprint()
+        if fingerprint == self._failed_fingerprint:
+            # Same broken files as last time; wait for them to change again.
+            return False
+        if current is None or fingerprint != current.fingerprint:
+            return self.reload()
+        return False
+
+    def reload(self):
+        """Load, validate and swap in the artifacts currently on disk.
+
+        Raises on failure, leaving the active version untouched.
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            fingerprint = self._fingerprint()
+            try:
+                predictor = self._loader()
+                _validate(predictor)
+            except Exception as exc:
+                self._failed_fingerprint = fingerprint
+                self._stats["failures"] += 1
+                self._stats["last_error"] = f"{type(exc).__name__}: {exc}"
+                raise
+            new = ModelVersion(predictor, fingerprint)
+            with self._lock:
+                old, self._current = self._current, new
+                if old is not None and old.inflight:
+                    self._retiring.append(old)
+            self._stats["reloads"] += 1
+            self._stats["last_reload_seconds"] = time.perf_counter() - start
+            metrics.observe("artifact_load", self._stats["last_reload_seconds"])
+            self._failed_fingerprint = None
+            self._stats["last_error"] = None
+            return True
+
+    # ---------------- serving ----------------
+    @contextmanager
+    def acquire(self):
+        """Pin the active version for one prediction: `with registry.acquire() as predictor:`."""
+        with self._lock:
+            version = self._current
+            if version is None:
+                raise RuntimeError("model registry has no loaded version")
+            version.inflight += 1
+        try:
+            yield version.predictor
+        finally:
+            with self._lock:
+                version.inflight -= 1
+                if version.inflight == 0 and version in self._retiring:
+                    self._retiring.remove(version)
+
+    @property
+    def active_version(self):
+        current = self._current
+        return current.version if current is not None else None
+
+    def status(self):
+        with self._lock:
+            current = self._current
+            status = {
+                "active_version": current.version if current else None,
+                "loaded_at": current.loaded_at if current else None,
+                "inflight": current.inflight if current else 0,
+                "draining": [{"version": v.version, "inflight": v.inflight} for v in self._retiring],
+                "watching": self._thread is not None and self._thread.is_alive(),
+                "poll_seconds": self.poll_seconds,
+            }
+        status.update(self._stats)
+        return status
+
+
+# ============================== Process-wide registry ==============================
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """The process-wide registry, loaded and watching on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry().start()
+    return _registry
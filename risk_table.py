@@ -0,0 +1,283 @@
+# risk_table.py
+"""Precomputed risk for the fully-estimated input path.
+
+When skin thickness, insulin, glucose and BP are all estimated, every model
+feature is a function of age, BMI, pregnancies, DPF and the lifestyle flags:
+
+    skin     = conditional median of SkinThickness for the (age, BMI, pregnancies) bin
+    insulin  = conditional median of Insulin for that bin
+    glucose  = estimate_glucose(age, bmi, insulin, active_glucose)
+    BP       = mean(estimate_bp(age, bmi, smoker, active, stress))
+
+Since the model is linear in its features, the logit splits into a dense
+(age, BMI) table holding everything that depends on the rounded estimates
+(glucose as if insulin were <= 150), a small per-bin table holding the skin
+thickness and insulin terms plus glucose's +20 when the bin's insulin is
+over 150, exact linear terms for pregnancies and DPF, and a constant offset
+per flag. A lookup is two array indexes and a sigmoid; no model call.
+
+The table is tied to both the model version and the conditional-medians
+build (see table_version()). The flag offsets and the +20 skip the 0.1
+rounding of the shifted BP/glucose; build() measures the resulting error
+against the real estimate -> model path over every (age, BMI) cell and flag
+combination (about 3 s), and stores it with the table.
+
+The grid is evaluated with imputation.py's array estimators, which are
+bit-for-bit equal to the scalar ones; the table itself takes about 0.2 s.
+The table is therefore an approximation of the model (about 2e-4 in
+probability for the shipped model): a table whose measured error exceeds
+MAX_ABS_ERROR is never served, whether it was built offline or rebuilt
+in-process after a model change.
+"""
+import bisect
+import math
+import os
+import sys
+import threading
+
+import numpy as np
+
+import conditional_medians
+from conditional_medians import get_conditional_medians
+from imputation import estimate_bp, estimate_glucose
+from inference import FEATURES
+from model_loader import MODEL_DIR
+
+TABLE_FILE = os.path.join(MODEL_DIR, "risk_table.npz")
+
+AGE_MIN, AGE_MAX = 1, 120
+BMI_MIN, BMI_MAX, BMI_STEPS_PER_UNIT = 10.0, 80.0, 100
+PREGNANCIES_MAX = 20
+# Largest |p_table - p_model| a table may have and still be served.
+MAX_ABS_ERROR = 1e-3
+
+_IDX = {name: FEATURES.index(name) for name in FEATURES}
+
+
+def table_version(predictor, medians=None):
+    """Key a table is valid for: the model version and the medians' dataset."""
+    medians = medians or get_conditional_medians()
+    return f"{predictor.version}/{(medians.dataset_sha256 or 'unknown')[:12]}"
+
+
+def estimated_features(age, bmi, pregnancies, dpf, smoker=False, active=True, stress=False,
+                       active_glucose=True, medians=None):
+    """(N, 8) rows app.py builds when every optional vital is estimated.
+
+    Arguments are scalars or arrays, broadcast together.
+    """
+    medians = medians or get_conditional_medians()
+    skin = medians.lookup("SkinThickness", age, bmi, pregnancies)
+    insulin = medians.lookup("Insulin", age, bmi, pregnancies)
+    glucose = estimate_glucose(age, bmi, insulin, active_glucose)
+    systolic, diastolic = estimate_bp(age, bmi, smoker, active, stress)
+    blood_pressure = (systolic + diastolic) / 2
+    columns = np.broadcast_arrays(*(np.asarray(c, dtype=np.float64) for c in
+                                    (pregnancies, glucose, blood_pressure, skin, insulin, bmi, dpf, age)))
+    return np.column_stack([c.ravel() for c in columns])
+
+
+class RiskTable:
+    def __init__(self, logits, bin_logits, offsets, version, max_abs_error=None):
+        self.logits = logits
+        # bin_logits: (age bin, BMI bin, pregnancy bin) as in conditional_medians
+        self.bin_logits = np.asarray(bin_logits, dtype=np.float64)
+        self._bin_logits = self.bin_logits.tolist()
+        # offsets: [per pregnancy, per DPF unit, smoker, inactive, stress, inactive (glucose)]
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+        self.version = version
+        self.max_abs_error = max_abs_error
+
+    @staticmethod
+    def _bmi_index(bmi):
+        scaled = bmi * BMI_STEPS_PER_UNIT
+        index = int(round(scaled))
+        # Only BMIs on the 0.01 grid are in the table; anything else falls back.
+        if abs(scaled - index) > 1e-6:
+            return None
+        index -= int(BMI_MIN * BMI_STEPS_PER_UNIT)
+        return index if 0 <= index < (BMI_MAX - BMI_MIN) * BMI_STEPS_PER_UNIT + 1 else None
+
+    def logit(self, age, bmi, pregnancies, dpf, smoker=False, active=True, stress=False,
+              active_glucose=True):
+        """Table logit, or None when the inputs are outside the precomputed domain."""
+        if age != int(age) or not AGE_MIN <= age <= AGE_MAX:
+            return None
+        if pregnancies != int(pregnancies) or not 0 <= pregnancies <= PREGNANCIES_MAX:
+            return None
+        bmi_index = self._bmi_index(bmi)
+        if bmi_index is None:
+            return None
+        o = self.offsets
+        per_bin = self._bin_logits[bisect.bisect_right(conditional_medians.AGE_EDGES, age)][
+            bisect.bisect_right(conditional_medians.BMI_EDGES, bmi)][
+            bisect.bisect_right(conditional_medians.PREGNANCY_EDGES, pregnancies)]
+        return (float(self.logits[int(age) - AGE_MIN, bmi_index]) + per_bin
+                + o[0] * pregnancies + o[1] * dpf
+                + (o[2] if smoker else 0.0) + (o[3] if not active else 0.0)
+                + (o[4] if stress else 0.0) + (o[5] if not active_glucose else 0.0))
+
+    def lookup(self, *args, **kwargs):
+        """(label, probability) like predict_one, or None outside the domain."""
+        z = self.logit(*args, **kwargs)
+        if z is None:
+            return None
+        # Same threshold as FusedPredictor.predict (logit > 0).
+        probability = 1.0 / (1.0 + math.exp(-z)) if z >= 0 else math.exp(z) / (1.0 + math.exp(z))
+        return int(z > 0.0), probability
+
+    # ---------------- building ----------------
+    @staticmethod
+    def _grid():
+        """Every (age, BMI) cell as flat arrays, age-major like the table."""
+        ages = np.arange(AGE_MIN, AGE_MAX + 1, dtype=np.float64)
+        # Integer / 100, exactly as _bmi_index's grid values are written.
+        bmis = np.arange(int(BMI_MIN * BMI_STEPS_PER_UNIT), int(BMI_MAX * BMI_STEPS_PER_UNIT) + 1) \
+            / BMI_STEPS_PER_UNIT
+        age, bmi = np.meshgrid(ages, bmis, indexing="ij")
+        return age.ravel(), bmi.ravel(), (len(ages), len(bmis))
+
+    @classmethod
+    def build(cls, predictor, check=True, medians=None):
+        """Evaluate the estimators over the (age, BMI) grid and fold in the model."""
+        medians = medians or get_conditional_medians()
+        w = predictor.weights
+        age, bmi, shape = cls._grid()
+        rows = estimated_features(age, bmi, 0, 0.0, medians=medians)
+        # The per-bin terms go in bin_logits: take skin thickness and insulin
+        # out, and glucose as if insulin were <= 150.
+        rows[:, _IDX["SkinThickness"]] = 0.0
+        rows[:, _IDX["Insulin"]] = 0.0
+        rows[:, _IDX["Glucose"]] = estimate_glucose(age, bmi, 0.0)
+        logits = predictor.logit(rows).reshape(shape).astype(np.float32)
+
+        skin = medians.medians[conditional_medians.TARGETS.index("SkinThickness")]
+        insulin = medians.medians[conditional_medians.TARGETS.index("Insulin")]
+        bin_logits = (w[_IDX["SkinThickness"]] * skin + w[_IDX["Insulin"]] * insulin
+                      + np.where(insulin > 150, w[_IDX["Glucose"]] * 20, 0.0))
+
+        offsets = [
+            w[_IDX["Pregnancies"]],
+            w[_IDX["DiabetesPedigreeFunction"]],
+            w[_IDX["BloodPressure"]] * (5 + 3) / 2,            # smoker: systolic +5, diastolic +3
+            w[_IDX["BloodPressure"]] * (5 + 2) / 2,            # inactive: +5 / +2
+            w[_IDX["BloodPressure"]] * (4 + 3) / 2,            # stress: +4 / +3
+            w[_IDX["Glucose"]] * 15,                            # inactive: glucose +15
+        ]
+        table = cls(logits, bin_logits, offsets, table_version(predictor, medians))
+        if check:
+            table.max_abs_error = table._measure_error(predictor, medians)
+        return table
+
+    def _measure_error(self, predictor, medians):
+        """Largest |p_table - p_model| over every (age, BMI) cell and flag combination.
+
+        Pregnancies and DPF, whose terms are exactly linear, cycle through
+        0-20 and 0-2.5 across the cells.
+        """
+        age, bmi, shape = self._grid()
+        cells = np.arange(len(age))
+        pregnancies = (cells % (PREGNANCIES_MAX + 1)).astype(np.float64)
+        dpf = (cells * 37 % 251) / 100
+        base = (self.logits.astype(np.float64).ravel()
+                + self.bin_logits[conditional_medians.bin_indices(age, bmi, pregnancies)]
+                + self.offsets[0] * pregnancies + self.offsets[1] * dpf)
+        worst = 0.0
+        for flags in range(16):
+            smoker, active, stress, active_glucose = (bool(flags >> bit & 1) for bit in range(4))
+            _, expected = predictor.predict(estimated_features(age, bmi, pregnancies, dpf, smoker, active,
+                                                               stress, active_glucose, medians))
+            z = base + sum(o for o, on in zip(self.offsets[2:], (smoker, not active, stress,
+                                                                 not active_glucose)) if on)
+            got = np.exp(-np.logaddexp(0.0, -z))
+            worst = max(worst, float(np.max(np.abs(got - expected))))
+        return worst
+
+    # ---------------- persistence ----------------
+    def save(self, path=TABLE_FILE):
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, logits=self.logits, bin_logits=self.bin_logits, offsets=self.offsets,
+                 version=np.array(self.version or ""),
+                 max_abs_error=np.array(np.nan if self.max_abs_error is None else self.max_abs_error))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=TABLE_FILE):
+        with np.load(path, allow_pickle=False) as data:
+            max_abs_error = float(data["max_abs_error"])
+            return cls(data["logits"], data["bin_logits"], data["offsets"], str(data["version"]) or None,
+                       None if np.isnan(max_abs_error) else max_abs_error)
+
+
+# ============================== Process-wide table ==============================
+_lock = threading.Lock()
+_table = None
+_building = None
+_rejected = None  # version whose table failed the error check
+
+
+def _acceptable(table):
+    return table.max_abs_error is not None and table.max_abs_error <= MAX_ABS_ERROR
+
+
+def _rebuild(predictor, path):
+    global _table, _building, _rejected
+    try:
+        # Callers use the model until this finishes, so the seconds the
+        # error check takes do not hold up serving.
+        table = RiskTable.build(predictor)
+        if not _acceptable(table):
+            _rejected = table.version
+            return
+        try:
+            table.save(path)
+        except OSError:
+            pass  # read-only deploys still get the in-memory table
+        _table = table
+    finally:
+        with _lock:
+            _building = None
+
+
+def get_risk_table(predictor, path=TABLE_FILE):
+    """The table for table_version(predictor), or None while it is being (re)built.
+
+    A table saved for the same model and medians is loaded from disk; otherwise it
+    is rebuilt and checked on a background thread, and callers fall back to the
+    model until it is ready. Lookups are approximate: within the table's
+    max_abs_error, which is at most MAX_ABS_ERROR. None is also returned for
+    good when the table for this version is less accurate than that.
+    """
+    global _table, _building
+    version = table_version(predictor)
+    table = _table
+    if table is not None and table.version == version:
+        return table
+    with _lock:
+        if _building is not None or _rejected == version:
+            return None
+        if os.path.exists(path):
+            try:
+                saved = RiskTable.load(path)
+            except (OSError, ValueError, KeyError):
+                saved = None
+            if saved is not None and saved.version == version and _acceptable(saved):
+                _table = saved
+                return saved
+        _building = threading.Thread(target=_rebuild, args=(predictor, path),
+                                     name="risk-table-build", daemon=True)
+        _building.start()
+    return None
+
+
+if __name__ == "__main__":
+    # Offline build: python risk_table.py
+    from inference import get_predictor
+
+    table = RiskTable.build(get_predictor())
+    if not _acceptable(table):
+        sys.exit(f"max |p_table - p_model| = {table.max_abs_error:.2e} exceeds {MAX_ABS_ERROR:.0e}; "
+                 f"table not saved")
+    table.save()
+    print(f"Saved {TABLE_FILE} for model {table.version} "
+          f"(max |p_table - p_model| = {table.max_abs_error:.2e})")
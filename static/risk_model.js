@@ -0,0 +1,51 @@
+// Generated by export_js.py for model 5bebd040efaa. Do not edit by hand.
+(function (root) {
+  "use strict";
+
+  var model = {
+    version: "5bebd040efaa",
+    features: ["Pregnancies", "Glucose", "BloodPressure", "SkinThickness", "Insulin", "BMI", "DiabetesPedigreeFunction", "Age"],
+    fields: ["pregnancies", "glucose", "blood_pressure", "skin_thickness", "insulin", "bmi", "dpf", "age"],
+    weights: [0.09287603037407213, 0.037029574612532826, -0.016513784740702548, -0.0031203903521124406, -0.0010397417699676528, 0.10055564085402952, 0.8565279140366866, 0.01972725408617887],
+    bias: -8.616374483616239,
+    threshold: 0.0
+  };
+
+  // weights . values + bias, with the StandardScaler already folded in.
+  function logit(values) {
+    var z = model.bias;
+    for (var i = 0; i < model.weights.length; i++) {
+      z += model.weights[i] * values[i];
+    }
+    return z;
+  }
+
+  function predict(values) {
+    var z = logit(values);
+    var p = z >= 0 ? 1 / (1 + Math.exp(-z)) : Math.exp(z) / (1 + Math.exp(z));
+    return { prediction: z > model.threshold ? 1 : 0, probability: p };
+  }
+
+  // Reads the index.html form; returns null until every field holds a number.
+  function predictForm(form) {
+    var values = [];
+    for (var i = 0; i < model.fields.length; i++) {
+      var input = form.elements[model.fields[i]];
+      var value = input ? parseFloat(input.value) : NaN;
+      if (isNaN(value)) {
+        return null;
+      }
+      values.push(value);
+    }
+    return predict(values);
+  }
+
+  model.predict = predict;
+  model.predictForm = predictForm;
+
+  if (typeof module !== "undefined" && module.exports) {
+    module.exports = model;
+  } else {
+    root.DiabetesRiskModel = model;
+  }
+})(this);
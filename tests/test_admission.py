@@ -0,0 +1,85 @@
+"""Admission control: slots, the wait queue and shedding.
+
+    python -m pytest -q tests/test_admission.py
+"""
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Overloaded
+
+
+def test_admits_up_to_max_concurrency_without_queueing():
+    async def run():
+        admission = AdmissionController(max_concurrency=2, max_queue=0)
+        async with admission.admit():
+            async with admission.admit():
+                assert admission.inflight == 2
+                with pytest.raises(Overloaded) as error:
+                    await admission.acquire()
+                assert error.value.reason == "queue full"
+        return admission.stats()
+    stats = asyncio.run(run())
+    assert stats["admitted"] == 2 and stats["rejected_queue_full"] == 1 and stats["inflight"] == 0
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    async def run():
+        admission = AdmissionController(max_concurrency=1, max_queue=4, latency_target=1.0)
+        order = []
+
+        async def request(name, hold):
+            async with admission.admit():
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        await asyncio.gather(request("a", 0.02), request("b", 0), request("c", 0))
+        return order, admission.stats()
+    order, stats = asyncio.run(run())
+    assert order == ["a", "b", "c"]
+    assert stats["queued"] == 2 and stats["admitted"] == 3 and stats["rejected"] == 0
+    assert stats["queue_wait_seconds_total"] > 0 and stats["inflight"] == 0
+
+
+def test_sheds_when_the_expected_wait_exceeds_the_target():
+    async def run():
+        admission = AdmissionController(max_concurrency=1, max_queue=100, latency_target=0.1)
+        admission._service_time = 0.06  # two queued requests would wait 0.12 s
+        async with admission.admit():
+            waiter = asyncio.ensure_future(admission.acquire())
+            await asyncio.sleep(0)
+            with pytest.raises(Overloaded) as error:
+                await admission.acquire()
+            assert error.value.reason == "latency target"
+        await waiter
+        admission.release()
+        return admission.stats()
+    stats = asyncio.run(run())
+    assert stats["rejected_latency"] == 1 and stats["admitted"] == 2
+
+
+def test_queued_request_times_out_after_the_latency_target():
+    async def run():
+        admission = AdmissionController(max_concurrency=1, max_queue=10, latency_target=0.02)
+        async with admission.admit():
+            with pytest.raises(Overloaded) as error:
+                await admission.acquire()
+            assert error.value.reason == "queue timeout"
+            assert admission.queue_depth == 0
+        return admission.stats()
+    stats = asyncio.run(run())
+    assert stats["rejected_timeout"] == 1 and stats["inflight"] == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        admission = AdmissionController(max_concurrency=1, max_queue=10, latency_target=1.0)
+        async with admission.admit():
+            waiter = asyncio.ensure_future(admission.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            assert admission.queue_depth == 0
+        return admission.inflight
+    assert asyncio.run(run()) == 0
@@ -0,0 +1,71 @@
+"""The buffered audit log: group-committed writes, rotation and overflow.
+
+    python -m pytest -q tests/test_audit_log.py
+"""
+import glob
+import json
+import os
+import time
+
+from audit_log import ACTIVE_SUFFIX, AuditLog, make_entry, segment_files
+
+ROW = [1, 100, 70, 20, 80, 25.0, 0.5, 30]
+
+
+def _entries(directory):
+    lines = []
+    for path in segment_files(directory):
+        with open(path) as f:
+            lines += [json.loads(line) for line in f]
+    return lines
+
+
+def test_entries_are_written_and_fsynced(tmp_path):
+    log = AuditLog(directory=str(tmp_path), flush_seconds=0.01)
+    for i in range(10):
+        log.record(make_entry(ROW, i / 10, 0, "v1", 0.001, ["Insulin"], "alice", "http"))
+    log.flush()
+    stats = log.stats()
+    assert stats["written"] == 10 and stats["fsyncs"] >= 1 and stats["segment"].endswith(ACTIVE_SUFFIX)
+    log.close()
+    entries = _entries(str(tmp_path))
+    assert [entry["probability"] for entry in entries] == [i / 10 for i in range(10)]
+    assert entries[0]["user"] == "alice" and entries[0]["estimated"] == ["Insulin"]
+    assert not glob.glob(os.path.join(str(tmp_path), "*" + ACTIVE_SUFFIX))
+
+
+def test_segments_rotate_at_max_bytes(tmp_path):
+    rotated = []
+    log = AuditLog(directory=str(tmp_path), flush_seconds=0.01, max_bytes=1, on_rotate=[rotated.append])
+    for i in range(3):
+        log.record(make_entry(ROW, 0.5, 0, "v1", 0.001))
+        log.flush()
+    log.close()
+    assert len(segment_files(str(tmp_path))) == 3
+    assert sorted(rotated) == segment_files(str(tmp_path))
+    assert log.stats()["rotations"] == 3 and len(_entries(str(tmp_path))) == 3
+
+
+def test_full_buffer_drops_the_oldest_entries(tmp_path):
+    log = AuditLog(directory=str(tmp_path), capacity=4, flush_seconds=60)
+    log._pid = os.getpid()  # no writer thread: everything stays buffered
+    for i in range(6):
+        log.record(make_entry(ROW, i / 10, 0, "v1", 0.001))
+    stats = log.stats()
+    assert stats["dropped"] == 2 and stats["pending"] == 4
+    assert [entry["probability"] for entry in log._buffer] == [0.2, 0.3, 0.4, 0.5]
+
+
+def test_stale_active_segment_is_finished_by_the_next_writer(tmp_path):
+    stale = tmp_path / ("predictions-20200101T000000000000Z-1" + ACTIVE_SUFFIX)
+    stale.write_text(json.dumps(make_entry(ROW, 0.5, 0, "v1", 0.001)) + "\n")
+    old = time.time() - 7200
+    os.utime(stale, (old, old))
+    rotated = []
+    log = AuditLog(directory=str(tmp_path), flush_seconds=0.01, max_age_seconds=60,
+                   on_rotate=[rotated.append])
+    log.record(make_entry(ROW, 0.1, 0, "v1", 0.001))
+    log.close()
+    names = [os.path.basename(path) for path in segment_files(str(tmp_path))]
+    assert "predictions-20200101T000000000000Z-1.jsonl" in names and len(names) == 2
+    assert len(rotated) == 2
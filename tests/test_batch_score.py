@@ -0,0 +1,20 @@
+"""Chunked CSV scoring.
+
+    python -m pytest -q tests/test_batch_score.py
+"""
+import numpy as np
+
+from batch_score import imputed_labels
+from inference import FEATURES
+
+
+def test_imputed_labels_match_the_per_row_join():
+    mask = np.random.default_rng(0).random((5000, len(FEATURES))) < 0.3
+    expected = [";".join(name for name, missing in zip(FEATURES, row) if missing) for row in mask.tolist()]
+    assert imputed_labels(mask).tolist() == expected
+
+
+def test_imputed_labels_edge_cases():
+    assert imputed_labels(np.zeros((0, len(FEATURES)), bool)).tolist() == []
+    assert imputed_labels(np.zeros((2, len(FEATURES)), bool)).tolist() == ["", ""]
+    assert imputed_labels(np.ones((1, len(FEATURES)), bool)).tolist() == [";".join(FEATURES)]
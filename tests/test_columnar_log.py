@@ -0,0 +1,78 @@
+"""Columnar compaction of the audit log and the queries over it.
+
+    python -m pytest -q tests/test_columnar_log.py
+"""
+import json
+
+import numpy as np
+import pytest
+
+from audit_log import make_entry
+from columnar_log import ColumnarLog, compact, load_index
+from inference import FEATURES
+
+T0 = 1_700_000_000.0
+
+
+def _write_segment(directory, name, entries, torn=False):
+    path = directory / f"predictions-{name}.jsonl"
+    text = "".join(json.dumps(entry) + "\n" for entry in entries)
+    path.write_text(text + ('{"ts": 1, "inpu' if torn else ""))
+    return path
+
+
+def _entry(ts, age, probability, user="", estimated=()):
+    entry = make_entry([1, 100, 70, 20, 80, 25.0, 0.5, age], probability, int(probability > 0.5),
+                       "v1", 0.002, estimated, user, "http")
+    entry["ts"] = ts
+    return entry
+
+
+@pytest.fixture
+def logs(tmp_path):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    rng = np.random.default_rng(0)
+    entries = [_entry(T0 + i, int(rng.integers(20, 80)), float(rng.random()), f"user{i % 3}",
+                      ["Insulin"] if i % 2 else []) for i in range(200)]
+    # Out of ts order within a segment, and one torn last line.
+    _write_segment(log_dir, "a", entries[:100][::-1], torn=True)
+    _write_segment(log_dir, "b", entries[100:])
+    return log_dir, tmp_path / "columnar", entries
+
+
+def test_compact_records_parts_once(logs):
+    log_dir, columnar, _ = logs
+    added = compact(str(log_dir), str(columnar))
+    assert [(part["rows"], part["skipped"]) for part in added] == [(100, 1), (100, 0)]
+    assert added[0]["ts_min"] == T0 and added[1]["ts_max"] == T0 + 199
+    assert compact(str(log_dir), str(columnar)) == []
+    assert len(load_index(str(columnar))["parts"]) == 2
+
+
+def test_columns_match_the_jsonl_entries(logs):
+    log_dir, columnar, entries = logs
+    compact(str(log_dir), str(columnar))
+    data = ColumnarLog(str(columnar)).columns(["ts", "probability", "Age", "user", "estimated"])
+    assert data["ts"].tolist() == [entry["ts"] for entry in entries]
+    assert data["probability"].tolist() == [entry["probability"] for entry in entries]
+    assert data["Age"].tolist() == [entry["inputs"]["Age"] for entry in entries]
+    assert data["user"].tolist() == [entry["user"] for entry in entries]
+    insulin_bit = 1 << FEATURES.index("Insulin")
+    assert data["estimated"].tolist() == [insulin_bit if entry["estimated"] else 0 for entry in entries]
+
+
+def test_time_window_and_age_bands(logs):
+    log_dir, columnar, entries = logs
+    compact(str(log_dir), str(columnar))
+    log = ColumnarLog(str(columnar))
+    start, end = T0 + 150, T0 + 175
+    assert len(list(log.parts(start, end))) == 1
+    window = [entry for entry in entries if start <= entry["ts"] < end]
+    assert log.columns(["ts"], start, end)["ts"].tolist() == [entry["ts"] for entry in window]
+
+    bands = log.mean_risk_by_age_band(start, end, bands=(0, 50, 200))
+    for low, high, count, mean in bands:
+        inside = [entry["probability"] for entry in window if low <= entry["inputs"]["Age"] < high]
+        assert count == len(inside)
+        assert mean == pytest.approx(np.mean(inside), rel=1e-12)
@@ -0,0 +1,62 @@
+# test_derived_inputs.py
+"""The app's input graph against the imputation stage used at prediction time.
+
+    python -m pytest -q tests/test_derived_inputs.py
+"""
+import numpy as np
+import pytest
+
+from conditional_medians import get_conditional_medians
+from derived_inputs import build_input_graph
+from imputation import impute_with_estimators
+from inference import FEATURES
+
+_I = {name: FEATURES.index(name) for name in FEATURES}
+
+
+@pytest.fixture(scope="module")
+def knn():
+    pytest.importorskip("sklearn")
+    from knn_imputer import get_knn_imputer
+    return get_knn_imputer()
+
+
+def _graph(**inputs):
+    graph = build_input_graph()
+    for name, value in inputs.items():
+        graph.set(name, value)
+    return graph
+
+
+@pytest.mark.parametrize("glucose", [None, 0.0, 85.0, 150.5, 240.0])
+def test_graph_matches_impute_with_estimators(knn, glucose):
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        age, pregnancies = int(rng.integers(1, 121)), int(rng.integers(0, 21))
+        bmi = float(np.round(rng.uniform(10, 60), 1))
+        graph = _graph(age=age, pregnancies=pregnancies, bmi_known=bmi, glucose_known=glucose,
+                       active_glucose=True)
+        row = np.array([[pregnancies, np.nan if glucose is None else glucose, 72, np.nan, np.nan,
+                         bmi, 0.5, age]])
+        impute_with_estimators(row, mask=np.isnan(row), table=get_conditional_medians(), knn=knn)
+        assert row[0, _I["SkinThickness"]] == graph.get("skin_thickness")
+        assert row[0, _I["Insulin"]] == graph.get("insulin")
+        if glucose is None:
+            assert row[0, _I["Glucose"]] == graph.get("glucose_estimate")
+
+
+def test_entered_glucose_uses_the_neighbours(knn):
+    graph = _graph(age=45, pregnancies=2, bmi_known=31.0, glucose_known=180.0)
+    assert graph.get("insulin") == knn.estimate("Insulin", 180.0, 31.0, 45, 2)
+    assert graph.get("skin_thickness") == knn.estimate("SkinThickness", 180.0, 31.0, 45, 2)
+    graph.set("glucose_known", None)
+    assert graph.get("insulin") == get_conditional_medians().estimate("Insulin", 45, 31.0, 2)
+
+
+def test_glucose_change_only_recomputes_its_dependents(knn):
+    graph = _graph(age=45, pregnancies=2, bmi_known=31.0, glucose_known=100.0)
+    graph.get("insulin")
+    graph.set("glucose_known", 160.0)
+    states = {row["node"]: row["state"] for row in graph.describe()}
+    assert states["insulin"] == "dirty" and states["skin_thickness"] == "not computed"
+    assert states["bmi"] == "clean"
@@ -0,0 +1,81 @@
+# test_estimators.py
+"""Array estimators against the scalar code they stand in for.
+
+    python -m pytest -q
+"""
+import math
+
+import numpy as np
+import pytest
+
+import estimators
+import imputation
+from estimators import BP_LABELS, BPCategory, classify_bp, interpret_bp
+
+CODES = {label: int(category) for category, label in BP_LABELS.items()}
+
+
+# ============================== classify_bp ==============================
+
+def _bp_grid():
+    # A 1 mmHg grid, plus each branch boundary, its float neighbours and NaN.
+    edges = np.array([60.0, 80, 90, 120, 130, 140, 180])
+    edges = np.concatenate([edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf), [np.nan]])
+    s_values = np.concatenate([np.arange(0, 301.0), edges])
+    d_values = np.concatenate([np.arange(0, 201.0), edges])
+    return (a.ravel() for a in np.meshgrid(s_values, d_values))
+
+
+def test_classify_bp_matches_interpret_bp():
+    s, d = _bp_grid()
+    expected = np.array([CODES[interpret_bp(x, y)] for x, y in zip(s.tolist(), d.tolist())])
+    codes = classify_bp(s, d)
+    assert codes.dtype == np.int8
+    mismatches = np.nonzero(codes != expected)[0]
+    assert not len(mismatches), [(s[i], d[i]) for i in mismatches[:5]]
+
+
+@pytest.mark.parametrize("systolic, diastolic, category", [
+    (85, 70, BPCategory.LOW),
+    (110, 70, BPCategory.NORMAL),
+    (125, 75, BPCategory.ELEVATED),
+    (135, 95, BPCategory.STAGE_1),   # overlapping ranges: the earlier branch wins
+    (150, 85, BPCategory.STAGE_1),
+    (150, 95, BPCategory.STAGE_2),
+    (185, 100, BPCategory.STAGE_2),
+    (185, 125, BPCategory.CRISIS),
+    (math.nan, 70, BPCategory.UNKNOWN),
+])
+def test_classify_bp_single_readings(systolic, diastolic, category):
+    assert classify_bp(systolic, diastolic) == category
+    assert BP_LABELS[category] == interpret_bp(systolic, diastolic)
+
+
+def test_classify_bp_broadcasts():
+    codes = classify_bp([110, 150], 70)
+    assert codes.tolist() == [BPCategory.NORMAL, BPCategory.STAGE_2]
+
+
+# ============================== Vectorized estimators ==============================
+
+@pytest.fixture(scope="module")
+def parity():
+    return imputation.check_parity(n=20_000)
+
+
+@pytest.mark.parametrize("name", ["calculate_bmi", "estimate_bp", "estimate_skin_thickness",
+                                  "estimate_insulin", "estimate_glucose", "classify_bp"])
+def test_array_estimators_match_scalar(parity, name):
+    assert parity[name] == 0
+
+
+def test_round_half_even_matches_builtin_on_ties():
+    # Values whose scaled form lands next to .5, where np.round and round() disagree.
+    x = np.array([0.125, 0.375, 2.675, 1.005, 0.285, 100.25, -0.125, 1e-7])
+    assert imputation.round_half_even(x, 2).tolist() == [round(v, 2) for v in x.tolist()]
+
+
+def test_array_estimators_accept_scalars():
+    assert float(imputation.estimate_insulin(120, 32.0, 3)) == estimators.estimate_insulin(120, 32.0, 3)
+    systolic, diastolic = imputation.estimate_bp(45, 27.5, True, False, True)
+    assert (float(systolic), float(diastolic)) == estimators.estimate_bp(45, 27.5, True, False, True)
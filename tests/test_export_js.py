@@ -0,0 +1,43 @@
+# test_export_js.py
+"""The generated JavaScript module against the Python predictor, under Node.js.
+
+    python -m pytest -q tests/test_export_js.py
+"""
+import json
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from export_js import DATASET_FILE, PARITY_TOLERANCE, check_parity, export_js
+from inference import FEATURES, FORM_FIELDS, build_predictor
+
+NODE = shutil.which("node") or shutil.which("nodejs")
+pytestmark = pytest.mark.skipif(NODE is None, reason="Node.js is not installed")
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    return build_predictor()
+
+
+@pytest.fixture(scope="module")
+def module_path(predictor, tmp_path_factory):
+    return export_js(predictor, str(tmp_path_factory.mktemp("js") / "risk_model.js"))
+
+
+def test_js_module_matches_python(predictor, module_path):
+    X = np.loadtxt(DATASET_FILE, delimiter=",", skiprows=1, usecols=range(len(FEATURES)))
+    max_err, label_mismatches = check_parity(predictor, module_path, X)
+    assert max_err <= PARITY_TOLERANCE
+    assert label_mismatches == 0
+
+
+def test_js_module_describes_the_model(predictor, module_path):
+    script = ("const m = require(process.argv[1]);"
+              "process.stdout.write(JSON.stringify({version: m.version, features: m.features,"
+              " fields: m.fields}));")
+    result = subprocess.run([NODE, "-e", script, module_path], capture_output=True, text=True, check=True)
+    model = json.loads(result.stdout)
+    assert model == {"version": predictor.version, "features": FEATURES, "fields": FORM_FIELDS}
@@ -0,0 +1,249 @@
+"""Request parsing and the connection loop of the asyncio HTTP service.
+
+    python -m pytest -q tests/test_http_service.py
+"""
+import asyncio
+import json
+
+import pytest
+
+import metrics
+from admission import AdmissionController
+from audit_log import AuditLog
+from http_service import HTTPError, PredictionService, Request, StreamingResponse
+
+
+def _body(raw_body, limit=1024, body_timeout=1.0, **headers):
+    """Request.body() for a request with these headers whose client sent `raw_body`."""
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw_body)
+        request = Request("POST", "/predict", "HTTP/1.1",
+                          {name.replace("_", "-"): value for name, value in headers.items()},
+                          reader, None, body_timeout)
+        return await request.body(limit)
+    return asyncio.run(read())
+
+
+def test_body_reads_content_length():
+    assert _body(b'{"a": 1}extra', content_length="8") == b'{"a": 1}'
+
+
+def test_body_reads_chunked():
+    raw = b"4\r\nabcd\r\n3;ext=1\r\nefg\r\n0\r\nTrailer: x\r\n\r\n"
+    assert _body(raw, transfer_encoding="chunked") == b"abcdefg"
+
+
+@pytest.mark.parametrize("value", ["abc", "-5", "1.5", "0x10"])
+def test_bad_content_length_is_a_400(value):
+    with pytest.raises(HTTPError) as error:
+        _body(b"", content_length=value)
+    assert (error.value.status, error.value.message) == (400, "bad Content-Length")
+
+
+def test_oversized_body_is_a_413():
+    with pytest.raises(HTTPError) as error:
+        _body(b"x" * 20, limit=10, content_length="20")
+    assert error.value.status == 413
+
+
+def test_stalled_body_times_out():
+    with pytest.raises(HTTPError) as error:
+        _body(b"{", body_timeout=0.05, content_length="10")
+    assert error.value.status == 408
+
+
+async def _exchange(service, raw):
+    server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+    async with server:
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return response
+
+
+@pytest.fixture
+def service(tmp_path):
+    audit = AuditLog(directory=str(tmp_path))
+    yield PredictionService(audit=audit, body_timeout=0.1)
+    audit.close()
+
+
+def test_malformed_content_length_answers_400_without_internals(service):
+    raw = (b"POST /predict HTTP/1.1\r\nContent-Type: application/json\r\n"
+           b"Content-Length: twelve\r\n\r\n")
+    head, _, body = asyncio.run(_exchange(service, raw)).partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 400 ")
+    assert json.loads(body) == {"error": "bad Content-Length"}
+
+
+def test_stalled_client_is_disconnected(service):
+    raw = (b"POST /predict HTTP/1.1\r\nContent-Type: application/json\r\n"
+           b"Content-Length: 100\r\n\r\n{")
+    response = asyncio.run(_exchange(service, raw))
+    assert response.startswith(b"HTTP/1.1 408 ")
+
+
+def test_metrics_export_counters_and_the_batch_size_histogram(service):
+    async def score_twice():
+        await asyncio.gather(service.score([1, 100, 70, 20, 80, 30, 0.5, 40]),
+                             service.score([2, 100, 70, 20, 80, 30, 0.5, 40]))
+    asyncio.run(score_twice())
+    lines = metrics.render_prometheus([service.status_metrics]).splitlines()
+    types = dict(line.split()[2:4] for line in lines if line.startswith("# TYPE"))
+    for name in ["diabetes_prediction_cache_hits_total", "diabetes_admission_rejected_queue_full_total",
+                 "diabetes_admission_queue_wait_seconds_total", "diabetes_audit_log_dropped_total",
+                 "diabetes_microbatch_requests_total"]:
+        assert types[name] == "counter"
+    assert types["diabetes_prediction_cache_size"] == "gauge"
+    assert types["diabetes_microbatch_batch_size"] == "histogram"
+    buckets = [int(line.split()[-1]) for line in lines if line.startswith("diabetes_microbatch_batch_size_bucket")]
+    assert buckets == sorted(buckets) and buckets[-1] == 1  # both rows in one batch
+    assert "diabetes_microbatch_batch_size_sum 2" in lines
+    assert "diabetes_microbatch_batch_size_count 1" in lines
+
+
+def _post(service, path, body, content_type="application/json"):
+    raw = (f"POST {path} HTTP/1.1\r\nContent-Type: {content_type}\r\n"
+           f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode() + body
+    head, _, payload = asyncio.run(_exchange(service, raw)).partition(b"\r\n\r\n")
+    if b"chunked" in head.lower():
+        chunks, rest = [], payload
+        while True:
+            size, _, rest = rest.partition(b"\r\n")
+            if not int(size, 16):
+                break
+            chunks.append(rest[:int(size, 16)])
+            rest = rest[int(size, 16) + 2:]
+        payload = b"".join(chunks)
+    return head, payload
+
+
+def test_bulk_and_single_predictions_agree(service):
+    records = [{"Pregnancies": 2, "Glucose": 148.37, "BloodPressure": 72.013, "SkinThickness": 35.004,
+                "Insulin": 94.25, "BMI": 33.6049, "DiabetesPedigreeFunction": 0.6274, "Age": 50},
+               {"Pregnancies": 0, "Glucose": 89.96, "BloodPressure": 66, "SkinThickness": 23.3333,
+                "Insulin": 94.05, "BMI": 28.1, "DiabetesPedigreeFunction": 0.1675, "Age": 21}]
+    _, bulk = _post(service, "/predict/bulk", b"".join(json.dumps(r).encode() + b"\n" for r in records),
+                    "application/x-ndjson")
+    bulk = [json.loads(line) for line in bulk.splitlines()]
+    for record, result in zip(records, bulk):
+        _, single = _post(service, "/predict", json.dumps(record).encode())
+        assert json.loads(single)["probability"] == result["probability"]
+
+
+def test_bulk_is_shed_when_overloaded(tmp_path):
+    audit = AuditLog(directory=str(tmp_path))
+    service = PredictionService(audit=audit, admission=AdmissionController(max_concurrency=0, max_queue=0))
+    record = {"Pregnancies": 1, "Glucose": 100, "BloodPressure": 70, "SkinThickness": 20,
+              "Insulin": 80, "BMI": 25, "DiabetesPedigreeFunction": 0.5, "Age": 30}
+    _, body = _post(service, "/predict/bulk", json.dumps(record).encode() + b"\n", "application/x-ndjson")
+    audit.close()
+    assert [json.loads(line) for line in body.splitlines()] == [{"error": "server busy, retry from line 1"}]
+    assert service.shed_stats["busy"] == 1
+
+
+RECORD = {"Pregnancies": 2, "Glucose": 148, "BloodPressure": 72, "SkinThickness": 35, "Insulin": 94,
+          "BMI": 33.6, "DiabetesPedigreeFunction": 0.627, "Age": 50}
+FORM = {"pregnancies": "2", "glucose": "148", "blood_pressure": "72", "skin_thickness": "35",
+        "insulin": "94", "bmi": "33.6", "dpf": "0.627", "age": "50"}
+
+
+def test_json_predict(service):
+    head, body = _post(service, "/predict", json.dumps(RECORD).encode())
+    assert head.startswith(b"HTTP/1.1 200 ")
+    result = json.loads(body)
+    assert result["prediction"] in (0, 1) and 0 <= result["probability"] <= 1
+    assert result["model_version"] == service.registry.active_version
+
+
+@pytest.mark.parametrize("field, value, message", [
+    ("Age", None, "missing field 'Age'"),
+    ("Age", "old", "field 'Age' is not a number: 'old'"),
+    ("Age", True, "field 'Age' is not a number: True"),
+    ("Age", 10 ** 400, "field 'Age' is out of range"),
+    ("Glucose", 1e308, "field 'Glucose' is out of range: 1e+308"),
+])
+def test_json_predict_rejects_bad_fields(service, field, value, message):
+    record = dict(RECORD)
+    if value is None:
+        del record[field]
+    else:
+        record[field] = value
+    head, body = _post(service, "/predict", json.dumps(record).encode())
+    assert head.startswith(b"HTTP/1.1 400 ")
+    assert json.loads(body) == {"error": message}
+
+
+@pytest.mark.parametrize("body, message", [
+    (b"{not json", "request body is not valid JSON"),
+    (b"[1, 2]", "expected a JSON object"),
+    (json.dumps(dict(RECORD, Age=float("nan"))).encode(), "field 'Age' is not a finite number: nan"),
+])
+def test_json_predict_rejects_bad_bodies(service, body, message):
+    head, payload = _post(service, "/predict", body)
+    assert head.startswith(b"HTTP/1.1 400 ")
+    assert json.loads(payload) == {"error": message}
+
+
+def test_form_predict_renders_the_result(service):
+    body = "&".join(f"{name}={value}" for name, value in FORM.items()).encode()
+    head, page = _post(service, "/predict", body, "application/x-www-form-urlencoded")
+    assert head.startswith(b"HTTP/1.1 200 ") and b"text/html" in head
+    assert b"Risk Probability:" in page
+
+
+def test_form_predict_rejects_a_bad_field(service):
+    body = "&".join(f"{name}={'abc' if name == 'bmi' else value}" for name, value in FORM.items()).encode()
+    head, payload = _post(service, "/predict", body, "application/x-www-form-urlencoded")
+    assert head.startswith(b"HTTP/1.1 400 ")
+    assert json.loads(payload) == {"error": "field 'BMI' is not a number: 'abc'"}
+
+
+def test_bulk_reports_bad_records_per_line(service):
+    lines = [json.dumps(dict(RECORD, id="ok-1")),
+             "{not json",
+             json.dumps(dict(RECORD, Glucose="NaN", id="nan")),
+             json.dumps(dict(RECORD, id="inf")).replace('"Age": 50', '"Age": Infinity'),
+             json.dumps(dict(RECORD, id="huge")).replace('"Age": 50', '"Age": ' + "9" * 400),
+             json.dumps(dict(RECORD, Age=True, id="bool")),
+             "",
+             "[1, 2]",
+             json.dumps(dict(RECORD, id="ok-2")).replace('"ok-2"', "1e400")]
+    _, body = _post(service, "/predict/bulk", "\n".join(lines).encode() + b"\n", "application/x-ndjson")
+    results = [json.loads(line) for line in body.splitlines()]
+    assert [(result["line"], result["id"], result.get("error")) for result in results] == [
+        (1, "ok-1", None),
+        (2, None, "invalid JSON"),
+        (3, "nan", "field 'Glucose' is not a finite number: 'NaN'"),
+        (4, None, "invalid JSON"),
+        (5, "huge", "field 'Age' is out of range"),
+        (6, "bool", "field 'Age' is not a number: True"),
+        (8, None, "expected a JSON object"),
+        (9, None, None),
+    ]
+    assert results[0]["probability"] == results[-1]["probability"]
+
+
+def test_streaming_response_always_ends_the_body():
+    class Writer:
+        def __init__(self):
+            self.data = b""
+
+        def write(self, data):
+            self.data += data
+
+        async def drain(self):
+            pass
+
+    async def chunks():
+        yield b'{"line": 1}\n'
+        raise RuntimeError("secret detail")
+
+    writer = Writer()
+    assert asyncio.run(StreamingResponse(chunks()).send(writer, True)) is False
+    assert writer.data.endswith(b'{"error": "internal error"}\n\r\n0\r\n\r\n')
+    assert b"secret detail" not in writer.data
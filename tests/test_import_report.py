@@ -0,0 +1,22 @@
+"""The cold-start import report's module list.
+
+    python -m pytest -q tests/test_import_report.py
+"""
+from import_report import WARMUP_MODULES, app_imports, default_modules
+
+
+def test_default_modules_follow_app_imports(tmp_path):
+    app = tmp_path / "app.py"
+    app.write_text("import os\nimport streamlit as st\nfrom derived_inputs import build_input_graph\n"
+                   "import numpy\n\nif st.button('x'):\n    import audit_log\n")
+    assert app_imports(str(app)) == ["os", "streamlit", "derived_inputs", "numpy"]
+    modules = default_modules(str(app))
+    assert modules[:4] == ["os", "streamlit", "derived_inputs", "numpy"]
+    assert modules[4:] == [name for name in WARMUP_MODULES if name != "numpy"]
+
+
+def test_default_modules_cover_the_real_app():
+    modules = default_modules()
+    for name in ["streamlit", "metrics", "warmup", "derived_inputs", "estimators", "knn_imputer",
+                 "sklearn.neighbors"]:
+        assert name in modules
@@ -0,0 +1,67 @@
+# test_inference.py
+"""The fused predictor against the sklearn model and scaler it replaces.
+
+    python -m pytest -q tests/test_inference.py
+"""
+import pickle
+
+import numpy as np
+import pytest
+
+from artifact import export_artifact, pickled_sklearn_version
+from inference import FEATURES, FusedPredictor, build_predictor, verify_against_sklearn
+
+
+@pytest.fixture(scope="module")
+def sklearn_pair():
+    pytest.importorskip("sklearn")
+    from model_loader import load_artifacts
+    return load_artifacts()
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    from export_js import DATASET_FILE
+    return np.loadtxt(DATASET_FILE, delimiter=",", skiprows=1, usecols=range(len(FEATURES)))
+
+
+def test_fused_predictor_matches_sklearn(sklearn_pair, dataset):
+    model, scaler = sklearn_pair
+    predictor = FusedPredictor.from_sklearn(model, scaler)
+    assert verify_against_sklearn(predictor, model, scaler) <= 1e-9
+    assert verify_against_sklearn(predictor, model, scaler, dataset) <= 1e-9
+
+
+def test_served_predictor_matches_sklearn(sklearn_pair, dataset):
+    model, scaler = sklearn_pair
+    assert verify_against_sklearn(build_predictor(), model, scaler, dataset) <= 1e-9
+
+
+def test_verify_against_sklearn_rejects_a_wrong_predictor(sklearn_pair):
+    model, scaler = sklearn_pair
+    predictor = FusedPredictor.from_sklearn(model, scaler)
+    shifted = FusedPredictor(predictor.weights, predictor.bias + 0.01, means=predictor.means)
+    with pytest.raises(RuntimeError):
+        verify_against_sklearn(shifted, model, scaler)
+
+
+def test_predict_one_matches_predict(sklearn_pair, dataset):
+    predictor = FusedPredictor.from_sklearn(*sklearn_pair)
+    labels, proba = predictor.predict(dataset[:5])
+    for row, label, p in zip(dataset[:5], labels, proba):
+        one_label, one_p = predictor.predict_one(row)
+        # A single-row dot product may sum in a different order than the matrix product.
+        assert one_label == label and one_p == pytest.approx(p, rel=1e-12, abs=0)
+
+
+def test_manifest_records_the_sklearn_that_wrote_the_pickles(sklearn_pair, tmp_path):
+    import sklearn
+    model, scaler = sklearn_pair
+    path = str(tmp_path / "model.pkl")
+    with open(path, "wb") as f:
+        pickle.dump(model, f)
+    assert pickled_sklearn_version(path) == sklearn.__version__
+    source = pickled_sklearn_version()  # Model/ModelForPrediction.pkl
+    manifest = export_artifact(model, scaler, str(tmp_path), source_sklearn_version=source)
+    assert manifest["source_sklearn_version"] == source == "1.2.2"
+    assert manifest["export_sklearn_version"] == sklearn.__version__
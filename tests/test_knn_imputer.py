@@ -0,0 +1,60 @@
+"""Loading, rebuilding and falling back from the nearest-neighbour index.
+
+    python -m pytest -q tests/test_knn_imputer.py
+"""
+import pickle
+
+import pytest
+
+import knn_imputer
+from knn_imputer import KNNImputer, get_knn_imputer, knn_imputer_if_available
+
+pytest.importorskip("sklearn")
+
+
+@pytest.fixture
+def fresh_state(monkeypatch):
+    # The index is process-wide; start each test without it.
+    monkeypatch.setattr(knn_imputer, "_imputer", None)
+    monkeypatch.setattr(knn_imputer, "_unavailable", False)
+
+
+@pytest.fixture
+def saved_path(fresh_state, tmp_path):
+    path = str(tmp_path / "knn_imputer.pickle")
+    get_knn_imputer(path)
+    knn_imputer._imputer = None
+    return path
+
+
+def test_current_index_is_loaded_without_parsing_the_dataset(saved_path, monkeypatch):
+    def no_parse(*args, **kwargs):
+        raise AssertionError("dataset parsed although the saved index is current")
+    monkeypatch.setattr(knn_imputer, "load_dataset", no_parse)
+    imputer = get_knn_imputer(saved_path)
+    assert imputer.estimate("Insulin", 150.0, 32.0, 45, 2) > 0
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:len(data) // 2],                               # truncated: EOFError
+    lambda data: b"not a pickle",                                     # UnpicklingError
+    lambda data: pickle.dumps({"format": knn_imputer.FORMAT_VERSION}),  # KeyError
+    lambda data: pickle.dumps([1, 2, 3]),                             # AttributeError
+])
+def test_unreadable_index_is_rebuilt(saved_path, damage):
+    with open(saved_path, "rb") as f:
+        data = f.read()
+    with open(saved_path, "wb") as f:
+        f.write(damage(data))
+    imputer = get_knn_imputer(saved_path)
+    assert imputer.estimate("SkinThickness", 150.0, 32.0, 45, 2) > 0
+    assert KNNImputer.load(saved_path).dataset_sha256 == imputer.dataset_sha256
+
+
+@pytest.mark.parametrize("error", [EOFError, AttributeError, pickle.UnpicklingError, ImportError])
+def test_failures_fall_back_to_the_medians(fresh_state, monkeypatch, error):
+    def fail(*args, **kwargs):
+        raise error("broken")
+    monkeypatch.setattr(knn_imputer, "get_knn_imputer", fail)
+    assert knn_imputer_if_available() is None
+    assert knn_imputer._unavailable
@@ -0,0 +1,61 @@
+"""The micro-batcher against scoring each row on its own.
+
+    python -m pytest -q tests/test_microbatch.py
+"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from inference import build_predictor
+from microbatch import MicroBatcher
+from registry import ModelRegistry
+
+ROWS = [[i % 5, 90 + i, 70, 20, 80, 25 + i / 10, 0.5, 30 + i] for i in range(10)]
+
+
+@pytest.fixture(scope="module")
+def registry():
+    registry = ModelRegistry(loader=build_predictor)
+    registry.reload()
+    return registry
+
+
+def _submit_all(batcher, rows):
+    async def run():
+        return await asyncio.gather(*(batcher.submit(row) for row in rows))
+    return asyncio.run(run())
+
+
+def test_concurrent_rows_are_scored_as_one_batch(registry):
+    batcher = MicroBatcher(registry, window_seconds=0.01, max_batch=64)
+    results = _submit_all(batcher, ROWS)
+    with registry.acquire() as predictor:
+        labels, proba = predictor.predict(np.array(ROWS))
+    assert [r[:2] for r in results] == list(zip(labels.tolist(), proba.tolist()))
+    assert {r[2] for r in results} == {registry.active_version}
+    stats = batcher.stats()
+    assert stats["batches"] == 1 and stats["requests"] == len(ROWS) and stats["batch_sizes"]["le_16"] == 1
+
+
+def test_max_batch_flushes_without_waiting_for_the_window(registry):
+    batcher = MicroBatcher(registry, window_seconds=60, max_batch=4)
+    results = _submit_all(batcher, ROWS[:8])
+    assert len(results) == 8
+    assert batcher.stats()["batches"] == 2 and batcher.queue_depth == 0
+
+
+def test_zero_window_batches_one_loop_iteration(registry):
+    batcher = MicroBatcher(registry, window_seconds=0, max_batch=64)
+    _submit_all(batcher, ROWS)
+    assert batcher.stats()["batches"] == 1
+
+
+def test_scoring_error_reaches_every_waiter(registry):
+    batcher = MicroBatcher(registry, window_seconds=0.001)
+
+    async def run():
+        return await asyncio.gather(batcher.submit([1, 2, 3]), batcher.submit([1, 2, 3]),
+                                    return_exceptions=True)
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
@@ -0,0 +1,33 @@
+"""Multi-process scoring against the single-process scorer.
+
+    python -m pytest -q tests/test_parallel_score.py
+"""
+import numpy as np
+import pytest
+
+from batch_score import score_csv
+from export_js import DATASET_FILE
+from inference import FEATURES, build_predictor
+from parallel_score import predict_batch_parallel, score_csv_parallel
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    return build_predictor()
+
+
+def test_predict_batch_parallel_matches_predict(predictor):
+    X = np.loadtxt(DATASET_FILE, delimiter=",", skiprows=1, usecols=range(len(FEATURES)))
+    labels, proba = predict_batch_parallel(X, workers=2, block_rows=100, predictor=predictor)
+    expected_labels, expected_proba = predictor.predict(X)
+    assert np.array_equal(labels, expected_labels)
+    assert np.array_equal(proba, expected_proba)
+
+
+@pytest.mark.parametrize("imputation", ["means", "estimators"])
+def test_score_csv_parallel_output_is_byte_identical(predictor, tmp_path, imputation):
+    serial, parallel = tmp_path / "serial.csv", tmp_path / "parallel.csv"
+    rows = score_csv(DATASET_FILE, str(serial), chunksize=100, predictor=predictor, imputation=imputation)
+    assert score_csv_parallel(DATASET_FILE, str(parallel), workers=2, chunksize=100,
+                              predictor=predictor, imputation=imputation) == rows
+    assert parallel.read_bytes() == serial.read_bytes()
@@ -0,0 +1,98 @@
+"""The prediction memo cache: grid keys, LRU/TTL and model versions.
+
+    python -m pytest -q tests/test_prediction_cache.py
+"""
+import numpy as np
+import pytest
+
+from export_js import DATASET_FILE
+from inference import FEATURES, build_predictor
+from prediction_cache import PredictionCache, canonical_key, key_to_features, max_probability_error
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_canonical_key_snaps_to_the_grid():
+    row = [2, 148.04, 72.01, 35.004, 94.0, 33.6, 0.627, 50]
+    key = canonical_key(row)
+    assert key == canonical_key([2.0, 148.0, 72.0, 35.0, 94.0, 33.6, 0.627, 50.0])
+    assert key_to_features(key) == [2.0, 148.0, 72.0, 35.0, 94.0, 33.6, 0.627, 50.0]
+    assert canonical_key([-0.0] * len(FEATURES)) == canonical_key([0.0] * len(FEATURES))
+
+
+def test_dataset_rows_are_on_the_grid():
+    X = np.loadtxt(DATASET_FILE, delimiter=",", skiprows=1, usecols=range(len(FEATURES)))
+    assert all(key_to_features(canonical_key(row)) == row for row in X.tolist())
+
+
+@pytest.mark.parametrize("bad", [float("nan"), float("inf"), 1e308])
+def test_canonical_key_rejects_values_off_the_grid(bad):
+    # 1e308 is finite, but not once it is scaled to Glucose's 0.1 grid.
+    row = [1.0] * len(FEATURES)
+    row[FEATURES.index("Glucose")] = bad
+    with pytest.raises(ValueError):
+        canonical_key(row)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(capacity=2)
+    cache.put((1,), "v1", "a")
+    cache.put((2,), "v1", "b")
+    assert cache.get((1,), "v1") == "a"
+    cache.put((3,), "v1", "c")
+    assert cache.get((2,), "v1") is None
+    assert cache.get((1,), "v1") == "a" and cache.get((3,), "v1") == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = PredictionCache(ttl_seconds=10, clock=clock)
+    cache.put((1,), "v1", "a")
+    clock.now = 9.9
+    assert cache.get((1,), "v1") == "a"
+    clock.now = 10.0
+    assert cache.get((1,), "v1") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["hit_rate"] == 0.5
+
+
+def test_predict_scores_the_snapped_row_within_the_error_bound():
+    predictor = build_predictor()
+    cache = PredictionCache()
+    row = [2, 148.04, 72.01, 35.004, 94.03, 33.604, 0.6274, 50]
+    label, probability = cache.predict(predictor, row)
+    assert (label, probability) == predictor.predict_one(key_to_features(canonical_key(row)))
+    assert cache.predict(predictor, row) == (label, probability)
+    assert cache.stats()["hits"] == 1
+    _, exact = predictor.predict_one(row)
+    assert abs(probability - exact) <= max_probability_error(predictor.weights)
+
+
+def test_new_version_invalidates_old_entries():
+    cache = PredictionCache()
+    cache.put((1,), "v1", (0, 0.1))
+    assert cache.get((1,), "v2") is None
+    assert cache.stats()["invalidations"] == 1
+    cache.put((1,), "v2", (1, 0.9))
+    assert cache.get((1,), "v2") == (1, 0.9)
+
+
+def test_in_flight_requests_on_the_old_version_do_not_wipe_the_new_one():
+    cache = PredictionCache()
+    cache.put((1,), "v1", (0, 0.1))
+    cache.put((2,), "v2", (1, 0.9))
+    # Requests still pinned to v1 during the reload.
+    for _ in range(3):
+        assert cache.get((2,), "v1") is None
+        cache.put((3,), "v1", (0, 0.2))
+    assert cache.get((2,), "v2") == (1, 0.9)
+    assert cache.get((3,), "v2") is None
+    stats = cache.stats()
+    assert stats["invalidations"] == 1 and stats["version"] == "v2" and stats["stale_version"] == 6
@@ -0,0 +1,81 @@
+"""Hot reload and draining in the model registry.
+
+    python -m pytest -q tests/test_registry.py
+"""
+import os
+
+import numpy as np
+import pytest
+
+from inference import FEATURES, FusedPredictor
+from registry import ModelRegistry
+
+
+def _predictor(version, bias=0.0):
+    return FusedPredictor(np.full(len(FEATURES), 0.01), bias, version=version)
+
+
+class Loader:
+    """Returns the predictor for whatever model.json says, like build_predictor reads Model/."""
+
+    def __init__(self, model_dir):
+        self.path = os.path.join(model_dir, "model.json")
+
+    def write(self, version, mtime):
+        with open(self.path, "w") as f:
+            f.write(version)
+        os.utime(self.path, ns=(mtime, mtime))
+
+    def __call__(self):
+        with open(self.path) as f:
+            version = f.read()
+        if version == "broken":
+            return _predictor(version, bias=np.nan)
+        return _predictor(version)
+
+
+@pytest.fixture
+def loader(tmp_path):
+    loader = Loader(str(tmp_path))
+    loader.write("v1", 1_000_000_000)
+    return loader
+
+
+@pytest.fixture
+def registry(tmp_path, loader):
+    registry = ModelRegistry(model_dir=str(tmp_path), loader=loader)
+    registry.reload()
+    return registry
+
+
+def test_reloads_only_when_the_files_change(registry, loader):
+    assert registry.active_version == "v1"
+    assert registry.reload_if_changed() is False
+    loader.write("v2", 2_000_000_000)
+    assert registry.reload_if_changed() is True
+    assert registry.active_version == "v2"
+    assert registry.status()["reloads"] == 2
+
+
+def test_replaced_version_drains_before_it_is_dropped(registry, loader):
+    with registry.acquire() as old:
+        loader.write("v2", 2_000_000_000)
+        registry.reload_if_changed()
+        assert old.version == "v1"
+        assert registry.status()["draining"] == [{"version": "v1", "inflight": 1}]
+        with registry.acquire() as new:
+            assert new.version == "v2"
+    assert registry.status()["draining"] == []
+
+
+def test_invalid_model_keeps_the_old_version_and_is_not_retried(registry, loader):
+    loader.write("broken", 2_000_000_000)
+    with pytest.raises(ValueError):
+        registry.reload_if_changed()
+    assert registry.active_version == "v1"
+    assert registry.reload_if_changed() is False  # same broken files
+    status = registry.status()
+    assert status["failures"] == 1 and "NaN" in status["last_error"]
+    loader.write("v3", 3_000_000_000)
+    assert registry.reload_if_changed() is True
+    assert registry.active_version == "v3" and registry.status()["last_error"] is None
@@ -0,0 +1,123 @@
+"""The precomputed risk table against the estimate -> model path it replaces.
+
+    python -m pytest -q tests/test_risk_table.py
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+import audit_log
+import knn_imputer
+import risk_table
+from audit_log import AuditLog
+from conditional_medians import get_conditional_medians
+from imputation import impute_with_estimators
+from inference import build_predictor
+from risk_table import MAX_ABS_ERROR, RiskTable, get_risk_table
+
+ESTIMATED = ("Glucose", "BloodPressure", "SkinThickness", "Insulin")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    return build_predictor()
+
+
+@pytest.fixture(scope="module")
+def table(predictor):
+    return RiskTable.build(predictor)
+
+
+@pytest.fixture
+def fresh_state(monkeypatch):
+    # get_risk_table keeps one table per process; start each test without it.
+    monkeypatch.setattr(risk_table, "_table", None)
+    monkeypatch.setattr(risk_table, "_building", None)
+    monkeypatch.setattr(risk_table, "_rejected", None)
+
+
+def _wait_for_build():
+    building = risk_table._building
+    if building is not None:
+        building.join()
+
+
+def test_table_error_is_within_bound(table):
+    assert table.max_abs_error <= MAX_ABS_ERROR
+
+
+@pytest.mark.parametrize("flags", [(False, True, False, True), (True, False, True, False)])
+def test_fully_estimated_lookup_matches_the_app_path(predictor, table, flags):
+    smoker, active, stress, active_glucose = flags
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        age, pregnancies = int(rng.integers(1, 121)), int(rng.integers(0, 21))
+        bmi, dpf = round(float(rng.uniform(15, 50)), 2), round(float(rng.uniform(0, 2.5)), 3)
+        # What app.py scores when skin, insulin, glucose and BP are all estimated.
+        row = np.array([[pregnancies, np.nan, np.nan, np.nan, np.nan, bmi, dpf, age]])
+        impute_with_estimators(row, smoker, active, stress, active_glucose, mask=np.isnan(row),
+                               table=get_conditional_medians())
+        label, probability = predictor.predict(row)
+        result = table.lookup(age, bmi, pregnancies, dpf, smoker, active, stress, active_glucose)
+        assert result is not None
+        assert abs(result[1] - probability[0]) <= table.max_abs_error + 1e-12
+        if abs(probability[0] - 0.5) > table.max_abs_error:
+            assert result[0] == label[0]
+
+
+def test_lookup_outside_the_domain_falls_back(table):
+    assert table.lookup(30.5, 25.0, 0, 0.5) is None
+    assert table.lookup(30, 25.005, 0, 0.5) is None
+    assert table.lookup(30, 25.0, 21, 0.5) is None
+
+
+def test_get_risk_table_rebuilds_checks_and_saves(predictor, fresh_state, tmp_path):
+    path = str(tmp_path / "risk_table.npz")
+    assert get_risk_table(predictor, path) is None  # building in the background
+    _wait_for_build()
+    table = get_risk_table(predictor, path)
+    assert table is not None and table.max_abs_error <= MAX_ABS_ERROR
+    saved = RiskTable.load(path)
+    assert saved.version == table.version and saved.max_abs_error == table.max_abs_error
+
+
+def test_inaccurate_table_is_never_served(predictor, fresh_state, monkeypatch, tmp_path):
+    monkeypatch.setattr(risk_table, "MAX_ABS_ERROR", 0.0)
+    path = str(tmp_path / "risk_table.npz")
+    get_risk_table(predictor, path)
+    _wait_for_build()
+    assert get_risk_table(predictor, path) is None
+    assert risk_table._building is None  # not rebuilt on every request
+    assert not os.path.exists(path)
+
+
+def test_app_scores_the_row_exactly_with_everything_estimated(predictor, monkeypatch, tmp_path):
+    testing = pytest.importorskip("streamlit.testing.v1")
+    monkeypatch.chdir(ROOT)
+    # AUDIT_LOG_DIR is read at import, so swap in a log under tmp_path; and
+    # keep the neighbour index from being built into Model/.
+    log = AuditLog(directory=str(tmp_path))
+    monkeypatch.setattr(audit_log, "_log", log)
+    monkeypatch.setattr(knn_imputer, "_imputer", None)
+    monkeypatch.setattr(knn_imputer, "_unavailable", True)
+    at = testing.AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60).run()
+    answers = {
+        "Do you know your Skin Thickness?": "No",
+        "Do you know your Insulin level?": "No",
+        "Do you know your Glucose level?": "No",
+        "Do you know your BP?": "No, calculate it",
+    }
+    for radio in at.radio:
+        if radio.label in answers:
+            radio.set_value(answers[radio.label])
+    at.run()
+    assert not at.exception
+    next(button for button in at.button if "Predict" in button.label).click().run()
+    assert not at.exception
+    log.close()
+    entry, = [json.loads(line) for path in audit_log.segment_files(str(tmp_path)) for line in open(path)]
+    _, probability = predictor.predict(np.array([list(entry["inputs"].values())]))
+    assert f"Risk Score: {round(probability[0] * 100, 2)}%" in [element.value for element in at.success]
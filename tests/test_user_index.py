@@ -0,0 +1,55 @@
+"""The (user, timestamp) index over audit log segments.
+
+    python -m pytest -q tests/test_user_index.py
+"""
+import json
+import os
+
+import pytest
+
+from audit_log import ACTIVE_SUFFIX, make_entry
+from user_index import UserIndex
+
+T0 = 1_700_000_000.0
+
+
+def _line(ts, user, probability=0.5):
+    entry = make_entry([1, 100, 70, 20, 80, 25.0, 0.5, 30], probability, 0, "v1", 0.001, (), user, "http")
+    entry["ts"] = ts
+    return (json.dumps(entry) + "\n").encode()
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = UserIndex(str(tmp_path / "index.sqlite3"), str(tmp_path))
+    yield index
+    index.close()
+
+
+def test_lookup_by_user_and_time_range(tmp_path, index):
+    lines = [_line(T0 + i, ["alice", "bob", ""][i % 3], i / 30) for i in range(30)]
+    (tmp_path / "predictions-a.jsonl").write_bytes(b"".join(lines))
+    assert index.update() == 20  # anonymous entries are not indexed
+    entries = index.lookup("alice", T0 + 6, T0 + 15)
+    assert [entry["ts"] for entry in entries] == [T0 + 6, T0 + 9, T0 + 12]
+    assert [entry["probability"] for entry in entries] == [6 / 30, 9 / 30, 12 / 30]
+    assert len(index.lookup("bob", limit=4)) == 4
+    assert index.lookup("") == [] and index.lookup("carol") == []
+
+
+def test_active_segment_is_indexed_incrementally_across_rotation(tmp_path, index):
+    active = tmp_path / ("predictions-b" + ACTIVE_SUFFIX)
+    # The last line is still being written.
+    active.write_bytes(_line(T0, "alice") + _line(T0 + 1, "alice")[:20])
+    assert index.update() == 1
+    with open(active, "ab") as f:
+        f.write(_line(T0 + 1, "alice")[20:] + _line(T0 + 2, "alice"))
+    assert index.update() == 2
+    finished = tmp_path / "predictions-b.jsonl"
+    os.replace(active, finished)
+    with open(finished, "ab") as f:
+        f.write(_line(T0 + 3, "alice"))
+    assert index.update() == 1
+    assert index.update() == 0  # finished segments are not read again
+    assert [entry["ts"] for entry in index.lookup("alice")] == [T0, T0 + 1, T0 + 2, T0 + 3]
+    assert index.stats() == {"entries": 4, "segments": 1, "finished_segments": 1}
@@ -0,0 +1,54 @@
+"""Background model loading and retrying after a failed load.
+
+    python -m pytest -q tests/test_warmup.py
+"""
+import threading
+
+import pytest
+
+import knn_imputer
+import registry
+import warmup
+
+
+@pytest.fixture
+def fresh_state(monkeypatch):
+    # The load runs once per process; start each test before it.
+    monkeypatch.setattr(warmup, "_done", threading.Event())
+    monkeypatch.setattr(warmup, "_thread", None)
+    monkeypatch.setattr(warmup, "_state", {"registry": None, "error": None, "load_seconds": None})
+    monkeypatch.setattr(knn_imputer, "knn_imputer_if_available", lambda: None)
+
+
+def _join():
+    warmup._thread.join()
+
+
+def test_failed_load_is_retried_on_the_next_start(fresh_state, monkeypatch):
+    outcomes = [FileNotFoundError("Model/diabetes_model.pkl"), "loaded"]
+
+    def get_registry():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    monkeypatch.setattr(registry, "get_registry", get_registry)
+
+    warmup.start()
+    _join()
+    assert isinstance(warmup.failed(), FileNotFoundError) and not warmup.is_ready()
+
+    warmup.start()  # a later rerun of the page
+    _join()
+    assert warmup.failed() is None and warmup.is_ready()
+    assert warmup.wait(0) == "loaded"
+
+
+def test_successful_load_is_not_repeated(fresh_state, monkeypatch):
+    calls = []
+    monkeypatch.setattr(registry, "get_registry", lambda: calls.append(1) or "loaded")
+    warmup.start()
+    _join()
+    first = warmup._thread
+    warmup.start()
+    assert warmup._thread is first and len(calls) == 1
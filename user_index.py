@@ -0,0 +1,227 @@
+# user_index.py
+"""Persistent (username, timestamp) index over the prediction audit log.
+
+    python user_index.py update                          # index new log lines
+    python user_index.py lookup alice --since 2026-10-01 --until 2026-10-08
+
+The index is a SQLite table keyed by (user, ts) that points at the byte
+offset and length of each entry in its JSONL segment, so a user's history
+over any time range is one B-tree range scan plus a seek per entry; the log
+itself is never scanned. Anonymous predictions are not indexed.
+
+The index only covers trusted callers. Its usernames come from the HTTP
+service's X-User header, which is recorded only when the service runs
+with --trust-user-header behind a proxy that authenticates users and sets
+that header. Nothing here checks who the user is. The Streamlit app has no
+login, so its predictions are anonymous.
+
+Indexing is incremental: each segment's indexed byte count is stored, and a
+run only reads what was appended since. Segments are tracked by name without
+the .active suffix, so an active segment can be indexed while it is written
+and continues where it left off after rotation. The process-wide audit log
+hands every finished segment to index_in_background().
+"""
+import argparse
+import glob
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone
+
+from audit_log import ACTIVE_SUFFIX, LOG_DIR, SEGMENT_PREFIX, SEGMENT_SUFFIX
+
+INDEX_FILE = os.path.join(LOG_DIR, "user_index.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    user TEXT NOT NULL,
+    ts REAL NOT NULL,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (user, ts, segment, offset)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS segments (
+    segment TEXT PRIMARY KEY,
+    indexed_bytes INTEGER NOT NULL,
+    finished INTEGER NOT NULL
+);
+"""
+
+
+def _segment_name(path):
+    name = os.path.basename(path)
+    for suffix in (ACTIVE_SUFFIX, SEGMENT_SUFFIX):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    raise ValueError(f"not an audit log segment: {path}")
+
+
+class UserIndex:
+    def __init__(self, path=INDEX_FILE, log_dir=LOG_DIR):
+        self.path = path
+        self.log_dir = log_dir
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Several processes may index at once; SQLite serializes the writers.
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._db.close()
+
+    # ---------------- maintenance ----------------
+    def index_segment(self, path):
+        """Index lines appended to one segment since the last call; returns how many."""
+        segment = _segment_name(path)
+        finished = path.endswith(SEGMENT_SUFFIX) and not path.endswith(ACTIVE_SUFFIX)
+        with self._lock:
+            row = self._db.execute("SELECT indexed_bytes, finished FROM segments WHERE segment = ?",
+                                   (segment,)).fetchone()
+            start, was_finished = row if row else (0, 0)
+            if was_finished:
+                return 0
+            entries = []
+            offset = start
+            with open(path, "rb") as f:
+                f.seek(start)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break    # still being written; picked up next time
+                    try:
+                        entry = json.loads(line)
+                        user, ts = entry.get("user"), float(entry["ts"])
+                    except (ValueError, KeyError, TypeError):
+                        user = None
+                    if user:
+                        entries.append((user, ts, segment, offset, len(line)))
+                    offset += len(line)
+            with self._db:
+                self._db.executemany("INSERT OR IGNORE INTO predictions VALUES (?, ?, ?, ?, ?)", entries)
+                self._db.execute("INSERT OR REPLACE INTO segments VALUES (?, ?, ?)",
+                                 (segment, offset, int(finished)))
+            return len(entries)
+
+    def update(self):
+        """Index everything new across finished and active segments."""
+        paths = glob.glob(os.path.join(self.log_dir, SEGMENT_PREFIX + "*" + SEGMENT_SUFFIX))
+        paths += glob.glob(os.path.join(self.log_dir, SEGMENT_PREFIX + "*" + ACTIVE_SUFFIX))
+        added = 0
+        for path in sorted(paths):
+            try:
+                added += self.index_segment(path)
+            except FileNotFoundError:
+                pass    # rotated between glob and open; the .jsonl is in the list or next run
+        return added
+
+    # ---------------- queries ----------------
+    def locate(self, user, start=None, end=None, limit=None):
+        """(ts, segment, offset, length) for user's entries in [start, end), oldest first."""
+        sql = "SELECT ts, segment, offset, length FROM predictions WHERE user = ?"
+        params = [user]
+        if start is not None:
+            sql += " AND ts >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND ts < ?"
+            params.append(end)
+        sql += " ORDER BY ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def lookup(self, user, start=None, end=None, limit=None):
+        """The audit entries themselves, read from the segments by offset."""
+        entries = []
+        handles = {}
+        try:
+            for _, segment, offset, length in self.locate(user, start, end, limit):
+                f = handles.get(segment)
+                if f is None:
+                    base = os.path.join(self.log_dir, segment)
+                    path = base + SEGMENT_SUFFIX
+                    if not os.path.exists(path):
+                        path = base + ACTIVE_SUFFIX
+                    f = handles[segment] = open(path, "rb")
+                f.seek(offset)
+                entries.append(json.loads(f.read(length)))
+        finally:
+            for f in handles.values():
+                f.close()
+        return entries
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+            segments, finished = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(finished), 0) FROM segments").fetchone()
+        return {"entries": rows, "segments": segments, "finished_segments": finished}
+
+
+# ============================== Background indexing ==============================
+_pending = queue.Queue()
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def _index_pending():
+    index = UserIndex()
+    while True:
+        path = _pending.get()
+        try:
+            index.index_segment(path)
+        except (OSError, ValueError, sqlite3.Error):
+            pass    # `user_index.py update` catches up on anything missed
+
+
+def index_in_background(path):
+    """AuditLog.on_rotate callback: index the finished segment off the writer thread."""
+    global _worker_pid
+    if _worker_pid != os.getpid():
+        with _worker_lock:
+            if _worker_pid != os.getpid():
+                threading.Thread(target=_index_pending, name="user-index", daemon=True).start()
+                _worker_pid = os.getpid()
+    _pending.put(path)
+
+
+def _parse_time(value):
+    """ISO date/time (UTC unless it says otherwise) or a Unix timestamp."""
+    try:
+        return float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index and look up predictions by user and time.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("update", help="index log lines written since the last update")
+    lookup = sub.add_parser("lookup", help="print a user's predictions as JSON lines")
+    lookup.add_argument("user")
+    lookup.add_argument("--since", type=_parse_time, help="ISO time or Unix timestamp")
+    lookup.add_argument("--until", type=_parse_time, help="ISO time or Unix timestamp (exclusive)")
+    lookup.add_argument("--limit", type=int)
+    args = parser.parse_args(argv)
+
+    index = UserIndex()
+    if args.command == "update":
+        added = index.update()
+        print(f"Indexed {added} new entries; {index.stats()}")
+        return 0
+    for entry in index.lookup(args.user, args.since, args.until, args.limit):
+        print(json.dumps(entry))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
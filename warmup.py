@@ -0,0 +1,69 @@
+# warmup.py
+"""Load the model registry on a background thread so the page can render first.
+
+Importing numpy (and, on the pickle fallback path, scikit-learn) plus loading
+the artifacts is most of the app's cold-start cost. start() kicks that off
+without blocking the script; wait() blocks only when a prediction needs it.
+"""
+import threading
+import time
+
+_lock = threading.Lock()
+_done = threading.Event()
+_thread = None
+_state = {"registry": None, "error": None, "load_seconds": None}
+
+
+def _load():
+    start_time = time.perf_counter()
+    try:
+        # Heavy imports happen here, off the script thread.
+        from registry import get_registry
+        registry = get_registry()
+    except Exception as exc:
+        _state["error"] = exc
+    else:
+        _state["registry"], _state["error"] = registry, None
+    finally:
+        _state["load_seconds"] = time.perf_counter() - start_time
+        _done.set()
+    # Then the neighbour index the glucose-aware estimates use (it imports
+    # scikit-learn); without it the app falls back to the bin medians.
+    from knn_imputer import knn_imputer_if_available
+    knn_imputer_if_available()
+
+
+def start():
+    """Start loading once per process, and again after a load that failed.
+
+    A failed load keeps reporting its error until a retry succeeds, so each
+    rerun of the page retries while the broken artifacts are being fixed.
+    """
+    global _thread
+    if _thread is None or _state["error"] is not None:
+        with _lock:
+            if _thread is None or (_state["error"] is not None and not _thread.is_alive()):
+                _thread = threading.Thread(target=_load, name="model-warmup", daemon=True)
+                _thread.start()
+
+
+def is_ready():
+    return _done.is_set() and _state["error"] is None
+
+
+def failed():
+    return _state["error"] if _done.is_set() else None
+
+
+def wait(timeout=None):
+    """Return the loaded registry, re-raising whatever the background load raised."""
+    start()
+    if not _done.wait(timeout):
+        raise TimeoutError("model is still loading")
+    if _state["error"] is not None:
+        raise _state["error"]
+    return _state["registry"]
+
+
+def load_seconds():
+    return _state["load_seconds"]